@@ -61,6 +61,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "impersonate.middleware.ImpersonateMiddleware",
     "puzzles.messaging.log_request_middleware",
+    "puzzles.timing.timing_middleware",
     "puzzles.context.context_middleware",
     "puzzles.puzzlehandlers.reverse_proxy_middleware",
     "puzzles.views.accept_ranges_middleware",
@@ -170,6 +171,12 @@ VICTORY_WEBHOOK_URL = os.environ.get("VICTORY_WEBHOOK_URL", "")
 
 SILK_ENABLED = False
 DEBUG_TOOLBAR_ENABLED = False
+# Time the request-scoped context caches; see puzzles/timing.py.
+CONTEXT_TIMING_ENABLED = os.getenv("CONTEXT_TIMING_ENABLED", "").lower() in (
+    "true",
+    "1",
+    "t",
+)
 DISCORD_ENABLED = os.getenv("DISCORD_ENABLED", "").lower() in ("true", "1", "t")
 FORCE_LOCAL_EMAIL = False
 FORCE_LOCAL_DISCORD = False
@@ -90,7 +90,20 @@ urlpatterns = [
     path("bridge", views.bridge, name="bridge"),
     path("bigboard", views.bigboard, name="bigboard"),
     path("bigboard/unhidden", views.bigboard_unhidden, name="bigboard-unhidden"),
+    path("bigboard/grid", views.bigboard_grid, name="bigboard-grid"),
+    path(
+        "bigboard/unhidden/grid",
+        views.bigboard_unhidden_grid,
+        name="bigboard-unhidden-grid",
+    ),
+    path("bigboard.json", views.bigboard_data, name="bigboard-data"),
+    path(
+        "bigboard/unhidden.json",
+        views.bigboard_unhidden_data,
+        name="bigboard-unhidden-data",
+    ),
     path("biggraph", views.biggraph, name="biggraph"),
+    path("biggraph.json", views.biggraph_data, name="biggraph-data"),
     path("bridge/guess.csv", views.guess_csv, name="guess-csv"),
     path("bridge/hint.csv", views.hint_csv, name="hint-csv"),
     path("bridge/puzzle.log", views.puzzle_log, name="puzzle-log"),
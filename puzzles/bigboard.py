@@ -0,0 +1,524 @@
+# The bigboard shows every team's progress on every puzzle. Rather than keeping
+# a dict per team per puzzle, this module loads the TeamPuzzleProgress table
+# into dense arrays indexed by cell (team index * number of puzzles + puzzle
+# index), with each cell's status packed into a byte of bit flags, and derives
+# the per-team and per-puzzle totals from those. Only the rows that are shown
+# get turned into anything the template can read, or, for the virtualized grid
+# (bigboard.js), the arrays are sent as they are.
+import base64
+import collections
+import datetime
+import time
+from array import array
+from datetime import UTC
+
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+
+from puzzles.hunt_config import HUNT_END_TIME, META_META_SLUG
+from puzzles.models import AnswerSubmission, Hint, PuzzleUnlock, TeamPuzzleProgress
+
+# cell status flags
+FREE = 1 << 0  # solved with a free answer
+SOLVED = 1 << 1
+WRONG = 1 << 2  # has wrong guesses
+UNLOCKED = 1 << 3
+HINTED = 1 << 4  # has answered hints
+POST_HUNT = 1 << 5  # solved after the hunt ended
+BACKSOLVED = 1 << 6  # solved less than five minutes before its meta
+
+
+def classes(status):
+    """The CSS classes of a status, as used by bigboard.html."""
+
+    letters = []
+    for flag, letter in ((FREE, "F"), (SOLVED, "S"), (WRONG, "W"), (UNLOCKED, "U")):
+        if status & flag:
+            # only the first of these is shown
+            letters.append(letter)
+            break
+    letters.extend(
+        letter
+        for (flag, letter) in ((HINTED, "H"), (POST_HUNT, "P"), (BACKSOLVED, "B"))
+        if status & flag
+    )
+    return " ".join(letters)
+
+
+CLASSES = tuple(classes(status) for status in range(1 << 7))
+
+BACKSOLVE_WINDOW = 5 * 60
+
+Cell = collections.namedtuple(
+    "Cell", ("cls", "solve_position", "wrong_guesses", "hints")
+)
+
+
+def counters(length):
+    return array("I", bytes(4 * length))
+
+
+class Board:
+    def __init__(self, teams, puzzles):
+        # in leaderboard and hunt order respectively
+        self.teams = list(teams)
+        self.puzzles = list(puzzles)
+        self.team_index = {team.id: i for (i, team) in enumerate(self.teams)}
+        self.puzzle_index = {puzzle.id: j for (j, puzzle) in enumerate(self.puzzles)}
+        self.metameta_index = next(
+            (
+                p
+                for (p, puzzle) in enumerate(self.puzzles)
+                if puzzle.slug == META_META_SLUG
+            ),
+            None,
+        )
+        cells = len(self.teams) * len(self.puzzles)
+
+        self.status = bytearray(cells)
+        # nth team to solve the puzzle (without a free answer), or 0
+        self.solve_position = counters(cells)
+        self.wrong_guesses = counters(cells)
+        self.hints = counters(cells)
+        # POSIX time of the (non-free) solve, or 0
+        self.solve_time = array("d", bytes(8 * cells))
+
+        teams = len(self.teams)
+        self.team_solves = counters(teams)
+        self.team_free_solves = counters(teams)
+        self.team_meta_solves = counters(teams)
+        self.team_wrong_guesses = counters(teams)
+        self.team_hints = counters(teams)
+        self.team_last_solve_time = [team.creation_time for team in self.teams]
+
+        puzzles = len(self.puzzles)
+        self.puzzle_solves = counters(puzzles)
+        self.puzzle_free_solves = counters(puzzles)
+        self.puzzle_guesses = counters(puzzles)
+        self.puzzle_unlocks = counters(puzzles)
+        self.puzzle_hints = counters(puzzles)
+
+    @staticmethod
+    def load(teams, puzzles):
+        """
+        Builds the board of these teams (in order) on these puzzles (in
+        order). Solve positions count only these teams.
+        """
+
+        board = Board(teams, puzzles)
+        width = len(board.puzzles)
+        team_ids = list(board.team_index)
+
+        solves = []
+        for (
+            team_id,
+            puzzle_id,
+            unlocked_at,
+            solved_at,
+            used_free_answer,
+            wrong_guesses,
+            partial_guesses,
+        ) in TeamPuzzleProgress.objects.filter(team_id__in=team_ids).values_list(
+            "team_id",
+            "puzzle_id",
+            "unlocked_at",
+            "solved_at",
+            "used_free_answer",
+            "wrong_guesses",
+            "partial_guesses",
+        ):
+            t = board.team_index[team_id]
+            p = board.puzzle_index[puzzle_id]
+            cell = t * width + p
+            status = 0
+            if unlocked_at:
+                status |= UNLOCKED
+                board.puzzle_unlocks[p] += 1
+            guesses = wrong_guesses + partial_guesses
+            if guesses:
+                status |= WRONG
+                board.wrong_guesses[cell] = guesses
+                board.team_wrong_guesses[t] += guesses
+                board.puzzle_guesses[p] += guesses
+            if solved_at:
+                board.puzzle_guesses[p] += 1
+                if board.puzzles[p].is_meta:
+                    board.team_meta_solves[t] += 1
+                if used_free_answer:
+                    status |= FREE
+                    board.team_free_solves[t] += 1
+                    board.puzzle_free_solves[p] += 1
+                else:
+                    status |= SOLVED
+                    if solved_at > HUNT_END_TIME:
+                        status |= POST_HUNT
+                    board.solve_time[cell] = solved_at.timestamp()
+                    board.team_solves[t] += 1
+                    board.team_last_solve_time[t] = max(
+                        board.team_last_solve_time[t], solved_at
+                    )
+                    solves.append((solved_at, cell))
+            board.status[cell] = status
+
+        metas = [
+            None if puzzle.is_meta else board.puzzle_index.get(puzzle.round.meta_id)
+            for puzzle in board.puzzles
+        ]
+        solves.sort()
+        for _, cell in solves:
+            p = cell % width
+            board.puzzle_solves[p] += 1
+            board.solve_position[cell] = board.puzzle_solves[p]
+            if metas[p] is not None:
+                meta_time = board.solve_time[cell - p + metas[p]]
+                if meta_time and board.solve_time[cell] > meta_time - BACKSOLVE_WINDOW:
+                    board.status[cell] |= BACKSOLVED
+
+        for team_id, puzzle_id, count in (
+            Hint.objects.filter(
+                team_id__in=team_ids, status=Hint.ANSWERED, is_followup=False
+            )
+            .values("team_id", "puzzle_id")
+            .annotate(count=Count("*"))
+            .values_list("team_id", "puzzle_id", "count")
+        ):
+            t = board.team_index[team_id]
+            p = board.puzzle_index[puzzle_id]
+            cell = t * width + p
+            board.status[cell] |= HINTED
+            board.hints[cell] = count
+            board.team_hints[t] += count
+            board.puzzle_hints[p] += count
+
+        return board
+
+    def team_rows(self, limit=None):
+        """The rows of the first few teams, for bigboard.html."""
+
+        width = len(self.puzzles)
+        metameta = self.metameta_index
+        for t, team in enumerate(self.teams[:limit] if limit else self.teams):
+            row = t * width
+            yield {
+                "team": team,
+                "last_solve_time": self.team_last_solve_time[t],
+                "total_solves": self.team_solves[t],
+                "free_solves": self.team_free_solves[t],
+                "wrong_guesses": self.team_wrong_guesses[t],
+                "used_hints": self.team_hints[t],
+                "finished": (
+                    None if metameta is None else self.solve_position[row + metameta]
+                ),
+                "meta_solves": self.team_meta_solves[t],
+                "entries": [
+                    Cell(
+                        CLASSES[self.status[cell]],
+                        self.solve_position[cell] or None,
+                        self.wrong_guesses[cell],
+                        self.hints[cell],
+                    )
+                    for cell in range(row, row + width)
+                ],
+            }
+
+    def puzzle_totals(self):
+        """The totals of each puzzle, for bigboard.html."""
+
+        return [
+            {
+                "puzzle": puzzle,
+                "solves": self.puzzle_solves[p],
+                "free_solves": self.puzzle_free_solves[p],
+                "total_guesses": self.puzzle_guesses[p],
+                "total_unlocks": self.puzzle_unlocks[p],
+                "hints": self.puzzle_hints[p],
+            }
+            for (p, puzzle) in enumerate(self.puzzles)
+        ]
+
+    def team_json(self, count):
+        """
+        The per-team columns and the grids of the first few teams, for
+        bigboard.js. Each grid is flattened by cell, and the status grid is
+        sent as base64 bytes.
+        """
+
+        teams = self.teams[:count]
+        cells = len(teams) * len(self.puzzles)
+        metameta = self.metameta_index
+        return {
+            "teams": {
+                "id": [team.id for team in teams],
+                "name": [team.team_name for team in teams],
+                "url": [reverse("team", args=(team.team_name,)) for team in teams],
+                "solves": self.team_solves[:count].tolist(),
+                "free_solves": self.team_free_solves[:count].tolist(),
+                "meta_solves": self.team_meta_solves[:count].tolist(),
+                "wrong_guesses": self.team_wrong_guesses[:count].tolist(),
+                "hints": self.team_hints[:count].tolist(),
+                "hints_total": [team.num_hints_total for team in teams],
+                "last_solve_time": [
+                    int(time.timestamp()) for time in self.team_last_solve_time[:count]
+                ],
+                "finished": [
+                    (
+                        0
+                        if metameta is None
+                        else self.solve_position[t * len(self.puzzles) + metameta]
+                    )
+                    for t in range(len(teams))
+                ],
+            },
+            "status": base64.b64encode(self.status[:cells]).decode(),
+            "solve_position": self.solve_position[:cells].tolist(),
+            "wrong_guesses": self.wrong_guesses[:cells].tolist(),
+            "hints": self.hints[:cells].tolist(),
+        }
+
+    def puzzle_json(self):
+        return {
+            "id": [puzzle.id for puzzle in self.puzzles],
+            "name": [puzzle.name for puzzle in self.puzzles],
+            "short_name": [puzzle.short_name for puzzle in self.puzzles],
+            "url": [reverse("stats", args=(puzzle.slug,)) for puzzle in self.puzzles],
+            "is_meta": [puzzle.is_meta for puzzle in self.puzzles],
+            "solves": self.puzzle_solves.tolist(),
+            "free_solves": self.puzzle_free_solves.tolist(),
+            "guesses": self.puzzle_guesses.tolist(),
+            "unlocks": self.puzzle_unlocks.tolist(),
+            "hints": self.puzzle_hints.tolist(),
+        }
+
+    def as_json(self, limit=None):
+        """
+        The first few rows of the board, with the puzzle totals, as a compact
+        columnar payload for bigboard.js, with the classes of each status
+        listed once.
+        """
+
+        return {
+            "classes": CLASSES,
+            "puzzles": self.puzzle_json(),
+            **self.team_json(limit or len(self.teams)),
+        }
+
+
+# Live dashboards follow changes with a cursor: the highest AnswerSubmission,
+# Hint and PuzzleUnlock ids they've seen, and the time they got the cursor
+# (hints get answered long after they're created).
+def current_cursor():
+    return (
+        *(
+            model.objects.aggregate(last=Max("id"))["last"] or 0
+            for model in (AnswerSubmission, Hint, PuzzleUnlock)
+        ),
+        int(time.time()),
+    )
+
+
+def format_cursor(cursor):
+    return "-".join(map(str, cursor))
+
+
+def parse_cursor(value):
+    """Parses a cursor from a request, or returns None if it's invalid."""
+
+    try:
+        cursor = tuple(int(part) for part in value.split("-"))
+    except (AttributeError, ValueError):
+        return None
+    return cursor if len(cursor) == 4 else None
+
+
+def changed_cells(cursor, teams):
+    """The (team id, puzzle id) cells of these teams changed since a cursor."""
+
+    submission_id, hint_id, unlock_id, since = cursor
+    cells = set()
+    for model, changed in (
+        (AnswerSubmission, Q(id__gt=submission_id)),
+        (
+            Hint,
+            Q(id__gt=hint_id)
+            | Q(answered_datetime__gte=datetime.datetime.fromtimestamp(since, UTC)),
+        ),
+        (PuzzleUnlock, Q(id__gt=unlock_id)),
+    ):
+        cells.update(
+            model.objects.filter(changed, team__in=teams).values_list(
+                "team_id", "puzzle_id"
+            )
+        )
+    return cells
+
+
+def board_changes(cursor, teams, puzzles, limit=None):
+    """
+    The changes to the board of these teams (a QuerySet, in leaderboard order)
+    since a cursor, or None if there aren't any: the full rows of the teams
+    that changed (in the same format as Board.as_json), the totals of the
+    puzzles that changed, and the new order of the first few teams, if anyone
+    solved anything.
+    """
+
+    cells = changed_cells(cursor, teams)
+    if not cells:
+        return None
+    team_ids = {team_id for (team_id, _) in cells}
+    puzzle_ids = {puzzle_id for (_, puzzle_id) in cells}
+    board = Board.load(teams.filter(id__in=team_ids), puzzles)
+    width = len(board.puzzles)
+
+    # Board.load only counted solves by the teams that changed.
+    scoring = TeamPuzzleProgress.objects.filter(
+        team__in=teams, solved_at__isnull=False, used_free_answer=False
+    )
+    for team_id, puzzle_id, position in (
+        scoring.filter(team_id__in=team_ids)
+        .annotate(
+            position=Subquery(
+                scoring.filter(
+                    puzzle_id=OuterRef("puzzle_id"),
+                    solved_at__lte=OuterRef("solved_at"),
+                )
+                .order_by()
+                .values("puzzle_id")
+                .annotate(count=Count("*"))
+                .values("count")
+            )
+        )
+        .values_list("team_id", "puzzle_id", "position")
+    ):
+        cell = board.team_index[team_id] * width + board.puzzle_index[puzzle_id]
+        board.solve_position[cell] = position
+
+    totals = {
+        row.pop("puzzle_id"): row
+        for row in (
+            TeamPuzzleProgress.objects.filter(team__in=teams, puzzle_id__in=puzzle_ids)
+            .order_by()
+            .values("puzzle_id")
+            .annotate(
+                solves=Count(
+                    "id", filter=Q(solved_at__isnull=False, used_free_answer=False)
+                ),
+                free_solves=Count("id", filter=Q(used_free_answer=True)),
+                guesses=Coalesce(Sum(F("wrong_guesses") + F("partial_guesses")), 0)
+                + Count("id", filter=Q(solved_at__isnull=False)),
+                unlocks=Count("id", filter=Q(unlocked_at__isnull=False)),
+            )
+        )
+    }
+    hints = dict(
+        Hint.objects.filter(
+            team__in=teams,
+            puzzle_id__in=puzzle_ids,
+            status=Hint.ANSWERED,
+            is_followup=False,
+        )
+        .order_by()
+        .values("puzzle_id")
+        .annotate(count=Count("*"))
+        .values_list("puzzle_id", "count")
+    )
+    changed_puzzles = [puzzle.id for puzzle in board.puzzles if puzzle.id in puzzle_ids]
+    empty = {"solves": 0, "free_solves": 0, "guesses": 0, "unlocks": 0}
+    puzzle_totals = {
+        "id": changed_puzzles,
+        **{
+            key: [totals.get(puzzle_id, empty)[key] for puzzle_id in changed_puzzles]
+            for key in empty
+        },
+        "hints": [hints.get(puzzle_id, 0) for puzzle_id in changed_puzzles],
+    }
+
+    solved = any(status & (SOLVED | FREE) for status in board.status)
+    order = teams.values_list("id", flat=True)
+    return {
+        **board.team_json(len(board.teams)),
+        "puzzles": puzzle_totals,
+        "order": list(order[:limit] if limit else order) if solved else None,
+    }
+
+
+def graph_points(cursor, teams):
+    """
+    The points to add to the biggraph since a cursor: (team name, time in
+    milliseconds, score, puzzle name, whether it's a meta) for each solve.
+    """
+
+    solves = AnswerSubmission.objects.filter(
+        team__in=teams, is_correct=True, used_free_answer=False
+    )
+    new_solves = list(
+        solves.filter(id__gt=cursor[0])
+        .order_by("submitted_datetime")
+        .values_list(
+            "team_id",
+            "team__team_name",
+            "submitted_datetime",
+            "puzzle__name",
+            "puzzle__is_meta",
+        )
+    )
+    if not new_solves:
+        return []
+    scores = collections.Counter(
+        dict(
+            solves.filter(
+                id__lte=cursor[0], team_id__in={team_id for (team_id, *_) in new_solves}
+            )
+            .order_by()
+            .values("team_id")
+            .annotate(count=Count("*"))
+            .values_list("team_id", "count")
+        )
+    )
+    points = []
+    for team_id, team_name, submitted_datetime, puzzle_name, is_meta in new_solves:
+        scores[team_id] += 1
+        points.append(
+            (
+                team_name,
+                submitted_datetime.timestamp() * 1000,
+                scores[team_id],
+                puzzle_name,
+                is_meta,
+            )
+        )
+    return points
+
+
+def graph_series(teams, puzzles):
+    """
+    The solve time series of these teams (in order) for biggraph: the names of
+    the puzzles once, and for each team, the index of each puzzle it solved
+    with the time in milliseconds, delta-encoded (each time is the difference
+    from the one before, and the first is from the epoch).
+    """
+
+    puzzles = list(puzzles)
+    puzzle_index = {puzzle.id: p for (p, puzzle) in enumerate(puzzles)}
+    series = {
+        team.id: {"name": team.team_name, "times": [], "puzzles": []} for team in teams
+    }
+    last_times = dict.fromkeys(series, 0)
+    for team_id, puzzle_id, solved_at in (
+        TeamPuzzleProgress.objects.filter(
+            team_id__in=list(series), solved_at__isnull=False, used_free_answer=False
+        )
+        .order_by("solved_at")
+        .values_list("team_id", "puzzle_id", "solved_at")
+    ):
+        solve_time = int(solved_at.timestamp() * 1000)
+        series[team_id]["times"].append(solve_time - last_times[team_id])
+        series[team_id]["puzzles"].append(puzzle_index[puzzle_id])
+        last_times[team_id] = solve_time
+    return {
+        "puzzles": {
+            "name": [puzzle.name for puzzle in puzzles],
+            "is_meta": [puzzle.is_meta for puzzle in puzzles],
+        },
+        "teams": list(series.values()),
+    }
@@ -0,0 +1,142 @@
+# Puzzles, rounds, puzzle messages and canned hints are set up before the hunt
+# and almost never change while it's running, but nearly every page needs the
+# ordered list of puzzles. This module keeps an immutable snapshot of all of
+# them in each worker, so requests don't have to query for them.
+#
+# Workers find out about edits through a version key in the shared Django
+# cache, bumped by the receivers in models.py. Each request checks the version
+# once (see Context.catalog) and rebuilds the catalog if it changed.
+import collections
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from puzzles.hunt_config import META_META_SLUG
+from puzzles.unlocks import get_engine as get_unlock_engine
+
+VERSION_KEY = "catalog-version"
+
+
+def group_by_puzzle(objects):
+    grouped = collections.defaultdict(list)
+    for obj in objects:
+        grouped[obj.puzzle_id].append(obj)
+    return {puzzle_id: tuple(objs) for (puzzle_id, objs) in grouped.items()}
+
+
+class Catalog:
+    def __init__(self, puzzles, rounds, messages, canned_hints):
+        # in hunt order (by round, then by order within the round)
+        self.puzzles = tuple(puzzles)
+        self.by_id = {puzzle.id: puzzle for puzzle in self.puzzles}
+        self.by_slug = {puzzle.slug: puzzle for puzzle in self.puzzles}
+
+        self.rounds = tuple(rounds)
+        self.rounds_by_slug = {round.slug: round for round in self.rounds}
+        round_puzzles = {round.slug: [] for round in self.rounds}
+        for puzzle in self.puzzles:
+            round_puzzles[puzzle.round.slug].append(puzzle)
+        self.round_puzzles = {
+            slug: tuple(puzzles) for (slug, puzzles) in round_puzzles.items()
+        }
+
+        self.meta_ids = frozenset(
+            puzzle.id for puzzle in self.puzzles if puzzle.is_meta
+        )
+        metameta = self.by_slug.get(META_META_SLUG)
+        self.metameta_id = metameta.id if metameta else None
+
+        # puzzle id -> tuple of PuzzleMessages / CannedHints (in order)
+        self.messages = group_by_puzzle(messages)
+        self.canned_hints = group_by_puzzle(canned_hints)
+
+        # Guesses are checked against these (see check_answer), so that's a
+        # lookup instead of normalizing every answer and message again.
+        self.normalized_answers = {
+            puzzle.id: puzzle.normalized_answer for puzzle in self.puzzles
+        }
+        # puzzle id -> semicleaned guess -> the first PuzzleMessage for it
+        self.message_matchers = {}
+        for puzzle_id, puzzle_messages in self.messages.items():
+            matcher = self.message_matchers[puzzle_id] = {}
+            for message in puzzle_messages:
+                matcher.setdefault(message.semicleaned_guess, message)
+
+        self.unlock_engine = get_unlock_engine(self.puzzles)
+
+    def check_answer(self, puzzle_id, guess):
+        """
+        Returns the normalized guess, whether it's the answer to this puzzle,
+        and the PuzzleMessage it triggers (or None).
+        """
+
+        # puzzles.models imports this module, so it can't be imported at the top.
+        from puzzles.models import Puzzle, PuzzleMessage  # noqa: PLC0415
+
+        normalized_answer = Puzzle.normalize_answer(guess)
+        message = self.message_matchers.get(puzzle_id, {}).get(
+            PuzzleMessage.semiclean_guess(guess)
+        )
+        return (
+            normalized_answer,
+            normalized_answer == self.normalized_answers[puzzle_id],
+            message,
+        )
+
+    @staticmethod
+    def load():
+        # puzzles.models imports this module, so it can't be imported at the top.
+        from puzzles.models import (  # noqa: PLC0415
+            CannedHint,
+            Puzzle,
+            PuzzleMessage,
+            Round,
+        )
+
+        return Catalog(
+            Puzzle.objects.select_related("round").order_by("round__order", "order"),
+            Round.objects.order_by("order"),
+            PuzzleMessage.objects.order_by("id"),
+            CannedHint.objects.order_by("order"),
+        )
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate():
+    """
+    Marks the catalog as changed. The version is bumped right away, so that
+    this worker sees its own edits, and again on commit, so that nobody keeps a
+    catalog they built from data that was about to change.
+    """
+
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+_catalogs = {}
+
+
+def get_catalog():
+    """Returns this worker's catalog, rebuilding it if it's out of date."""
+
+    version = get_version()
+    hunt_catalog = _catalogs.get(version)
+    if hunt_catalog is None:
+        _catalogs.clear()
+        hunt_catalog = _catalogs[version] = Catalog.load()
+    return hunt_catalog
@@ -4,6 +4,7 @@
 # properties of teams (the caching is only within a single request (?)). See
 # https://docs.djangoproject.com/en/3.1/ref/templates/api/#using-requestcontext
 import datetime
+import functools
 import inspect
 import types
 from functools import cached_property
@@ -11,7 +12,7 @@ from functools import cached_property
 from django.conf import settings
 from django.utils import timezone
 
-from puzzles import hunt_config, models
+from puzzles import catalog, hunt_config, models, progress, timing
 from puzzles.hunt_config import (
     HUNT_CLOSE_TIME,
     HUNT_END_TIME,
@@ -24,29 +25,47 @@ from puzzles.shortcuts import get_shortcuts
 def context_middleware(get_response):
     def middleware(request):
         request.context = Context(request)
-        return get_response(request)
+        response = get_response(request)
+        progress.flush_writes(request.context)
+        return response
 
     return middleware
 
 
 # A context processor takes a request and returns a dictionary of (key: value)s
-# to merge into the request's context.
+# to merge into the request's context. Constants are passed as they are, and
+# cached properties as thunks, so that they're only computed if a template
+# actually uses them. Django copies the dictionary into every template context
+# it renders, so it's built once per request and reused for later renders
+# (includes, emails).
 def context_processor(request):
-    def thunk(name):
-        return lambda: getattr(request.context, name)
-
-    return {name: thunk(name) for name in request.context._cached_names}
+    context = request.context
+    if context.template_vars is None:
+        template_vars = context._constants.copy()
+        for name in context._cached_names:
+            template_vars[name] = functools.partial(getattr, context, name)
+        context.template_vars = template_vars
+    return context.template_vars
 
 
 # Construct a get/set property from a name and a function to compute a value.
 # Doing this with name="foo" causes accesses to self.foo to call fn and cache
-# the result.
-def wrap_cacheable(name, fn):
+# the result. If timing is enabled for the request (see timing.py), computing
+# and reading the value are recorded under label.
+def wrap_cacheable(name, fn, label=None):
+    label = label or name
+
     def fget(self):
         if not hasattr(self, "_cache"):
             self._cache = {}
+        recorder = timing.current()
         if name not in self._cache:
-            self._cache[name] = fn(self)
+            if recorder is None:
+                self._cache[name] = fn(self)
+            else:
+                self._cache[name] = recorder.compute(label, fn, self)
+        elif recorder is not None:
+            recorder.hit(label)
         return self._cache[name]
 
     def fset(self, value):
@@ -59,24 +78,28 @@ def wrap_cacheable(name, fn):
 
 # Decorator for a class, like the `Context` class below but also the `Team`
 # model, that replaces all non-special methods that take no arguments other
-# than `self` with a get/set property as constructed above, and also gather
-# their names into the property `_cached_names`.
+# than `self` (and all cached_properties) with a get/set property as
+# constructed above, and also gather their names into the property
+# `_cached_names`. The constants on BaseContext are copied over as plain class
+# attributes, and gathered into `_constants`.
 def context_cache(cls):
+    for name, value in BaseContext._constants.items():
+        setattr(cls, name, value)
+    cls._constants = BaseContext._constants
+
+    prefix = cls.__name__.lower()
     cached_names = []
     for c in (BaseContext, cls):
         for name, fn in c.__dict__.items():
             if (
                 not name.startswith("__")  # not special
                 and isinstance(fn, types.FunctionType)  # method
-                and (
-                    inspect.getfullargspec(fn).args == ["self"]  # only self
-                    or inspect.getfullargspec(fn).args == ["self", "__v"]
-                )
+                and inspect.getfullargspec(fn).args == ["self"]  # only self
             ):
-                setattr(cls, name, wrap_cacheable(name, fn))
+                setattr(cls, name, wrap_cacheable(name, fn, f"{prefix}.{name}"))
                 cached_names.append(name)
             elif isinstance(fn, cached_property):
-                setattr(cls, name, fn)
+                setattr(cls, name, wrap_cacheable(name, fn.func, f"{prefix}.{name}"))
                 cached_names.append(name)
 
     cls._cached_names = tuple(cached_names)
@@ -157,21 +180,23 @@ class BaseContext:
         return self.now >= self.close_time
 
 
-# Also include the constants from hunt_config.
-for key, value in hunt_config.__dict__.items():
-    if key.isupper() and key not in (
-        "HUNT_START_TIME",
-        "HUNT_END_TIME",
-        "HUNT_CLOSE_TIME",
-    ):
-        # Return a lambda to work with the context processor caching
-        # only functions, not variables
-        setattr(BaseContext, key.lower(), lambda self, __v=value: __v)
+# Also include the constants from hunt_config. These are plain class
+# attributes, which context_cache copies over and the context processor passes
+# to templates as they are.
+constants = {
+    key.lower(): value
+    for key, value in hunt_config.__dict__.items()
+    if key.isupper()
+    and key not in ("HUNT_START_TIME", "HUNT_END_TIME", "HUNT_CLOSE_TIME")
+}
 
 # Also include select constants from settings.
 for key in ("DOMAIN",):
-    value = getattr(settings, key)
-    setattr(BaseContext, key.lower(), lambda self, __v=value: __v)
+    constants[key.lower()] = getattr(settings, key)
+
+for key, value in constants.items():
+    setattr(BaseContext, key, value)
+BaseContext._constants = constants
 
 
 # The properties of a request Context are accessible both from views and from
@@ -181,6 +206,11 @@ for key in ("DOMAIN",):
 class Context:
     def __init__(self, request):
         self.request = request
+        # Progress writes queued while handling the request, by puzzle id; see
+        # progress.py.
+        self.unlock_writes = {}
+        self.view_writes = set()
+        self.template_vars = None
 
     @cached_property
     def request_user(self):
@@ -210,13 +240,13 @@ class Context:
     def unlocks(self):
         return models.Team.compute_unlocks(self)
 
+    @cached_property
+    def catalog(self):
+        return catalog.get_catalog()
+
     @cached_property
     def all_puzzles(self):
-        return tuple(
-            models.Puzzle.objects.select_related("round").order_by(
-                "round__order", "order"
-            )
-        )
+        return self.catalog.puzzles
 
     @cached_property
     def unclaimed_hints(self):
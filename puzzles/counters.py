@@ -0,0 +1,65 @@
+# The puzzles list can show, for each puzzle, how many solves and guesses
+# public teams made during the hunt and how many of them guessed at all. Those
+# are counters in PuzzleStats, bumped as submissions are made, and this module
+# keeps all of them in each worker, so the most visited page of the site reads
+# no submissions at all.
+#
+# Workers find out about new counts through a version key in the shared Django
+# cache, bumped whenever a submission is counted (see PuzzleStats). Each
+# request checks the version once and reloads the counts if it changed.
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "puzzle-counters-version"
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate():
+    """Marks the counts as changed once the current transaction commits."""
+
+    transaction.on_commit(bump_version)
+
+
+def load():
+    # puzzles.models imports this module, so it can't be imported at the top.
+    from puzzles.models import PuzzleStats  # noqa: PLC0415
+
+    return {
+        puzzle_id: {"correct": solves, "guesses": guesses, "teams": teams}
+        for (puzzle_id, solves, guesses, teams) in PuzzleStats.objects.filter(
+            guesses__gt=0
+        ).values_list("puzzle_id", "solves", "guesses", "teams")
+    }
+
+
+_counts = {}
+
+
+def get_counts():
+    """
+    Returns this worker's counts, as a dict of puzzle id to a dict of
+    'correct', 'guesses' and 'teams', for the puzzles with any guesses.
+    """
+
+    version = get_version()
+    counts = _counts.get(version)
+    if counts is None:
+        _counts.clear()
+        counts = _counts[version] = load()
+    return counts
@@ -0,0 +1,124 @@
+# After the hunt ends, the data behind the stats pages only changes through
+# post-hunt activity, which they mostly leave out, but the wrap-up brings the
+# most traffic they'll ever get. This module freezes their payloads (see
+# stats.py) once the hunt is over: they're built once, stored in FrozenPayload
+# so that they survive cache evictions and deploys, and served from the cache
+# or that one row from then on.
+#
+# tasks.freeze_payloads builds all of them at the end of the hunt, and
+# `manage.py freeze_stats` rebuilds them. Payloads that include post-hunt data
+# (answered hints, mostly) are rebuilt in the background once they're older
+# than REFRESH_INTERVAL. The rest only change when a team is hidden, unhidden
+# or deleted, or a submission is fixed or deleted, and the receivers in
+# models.py rebuild them in the background when that happens.
+#
+# Until then, payloads are cached for a few minutes, keyed by the leaderboard
+# version (bumped whenever a submission changes the standings) and the catalog
+# version; hints don't bump either, hence the timeout.
+#
+# The bigboard and biggraph aren't frozen: they show post-hunt solves too, and
+# are already served from caches keyed by the leaderboard version.
+import datetime
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from puzzles import catalog, leaderboard, stats, tasks
+from puzzles.hunt_config import HUNT_END_TIME
+from puzzles.models import FrozenPayload
+
+LIVE_TIMEOUT = 5 * 60
+CACHE_TIMEOUT = 60 * 60
+REFRESH_INTERVAL = datetime.timedelta(minutes=10)
+
+# kind -> (build(puzzles, argument), whether it includes post-hunt data), for
+# payloads named "kind" or "kind:argument"
+PAYLOADS = {
+    "hunt-stats": (lambda puzzles, _: stats.hunt_stats(puzzles), True),
+    "wrapup": (lambda puzzles, _: stats.wrapup(puzzles), True),
+    "finishers": (lambda puzzles, _: stats.finishers(), False),
+    "stats": (
+        lambda puzzles, slug: stats.puzzle_stats(
+            next(puzzle for puzzle in puzzles if puzzle.slug == slug)
+        ),
+        False,
+    ),
+}
+
+
+def names(puzzles):
+    """The names of all the payloads there are."""
+
+    return [
+        "hunt-stats",
+        "wrapup",
+        "finishers",
+        *(f"stats:{puzzle.slug}" for puzzle in puzzles),
+    ]
+
+
+def cache_key(name):
+    return f"frozen:{name}"
+
+
+def build(name, puzzles):
+    kind, _, argument = name.partition(":")
+    return PAYLOADS[kind][0](puzzles, argument)
+
+
+def store(name, payload, now):
+    FrozenPayload.objects.update_or_create(
+        name=name, defaults={"payload": payload, "updated": now}
+    )
+    cache.set(cache_key(name), (payload, now), timeout=CACHE_TIMEOUT)
+
+
+def get(name, puzzles):
+    """
+    Returns a payload. Until the hunt ends, it's built whenever the
+    leaderboard changes; after that, it's the frozen copy, built and stored
+    the first time it's needed if it wasn't already.
+    """
+
+    now = timezone.now()
+    if now < HUNT_END_TIME:
+        key = f"live:{name}:{leaderboard.get_version()}:{catalog.get_version()}"
+        payload = cache.get(key)
+        if payload is None:
+            payload = build(name, puzzles)
+            cache.set(key, payload, timeout=LIVE_TIMEOUT)
+        return payload
+
+    entry = cache.get(cache_key(name))
+    if entry is None:
+        entry = (
+            FrozenPayload.objects.filter(name=name)
+            .values_list("payload", "updated")
+            .first()
+        )
+        if entry is None:
+            payload = build(name, puzzles)
+            store(name, payload, now)
+            return payload
+        cache.set(cache_key(name), entry, timeout=CACHE_TIMEOUT)
+
+    payload, updated = entry
+    if PAYLOADS[name.partition(":")[0]][1] and updated < now - REFRESH_INTERVAL:
+        tasks.schedule_refresh_frozen(name)
+    return payload
+
+
+def freeze(puzzles, only_missing=False):
+    """Builds and stores the payloads (or the ones that aren't yet)."""
+
+    frozen_names = names(puzzles)
+    if only_missing:
+        existing = set(
+            FrozenPayload.objects.filter(name__in=frozen_names).values_list(
+                "name", flat=True
+            )
+        )
+        frozen_names = [name for name in frozen_names if name not in existing]
+    for name in frozen_names:
+        store(name, build(name, puzzles), timezone.now())
+    return frozen_names
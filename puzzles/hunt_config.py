@@ -104,3 +104,17 @@ TEAM_AGE_BEFORE_FREE_ANSWERS = datetime.timedelta(days=3)
 # sense for every hunt.
 INTRO_ROUND_SLUG = "intro"
 META_META_SLUG = "hephaestus"
+
+# Milestone puzzles whose solve times are recorded on each team's standing, by
+# the TeamStanding field they're stored in. Each one needs a field there, so
+# adding one means adding the field and a migration too.
+# The first few also break ties on the leaderboard, in order: earlier solves
+# rank higher, and teams that haven't solved them go last. After those, teams
+# are ranked by number of solves and then by time of last solve.
+MILESTONES = {
+    "metameta_solve_time": META_META_SLUG,
+    "ripple_solve_time": "ripple-effect",
+    "melody_solve_time": "melody-medley",
+    "demon_solve_time": "mark-of-the-demon",
+}
+TIEBREAK_MILESTONES = ("metameta_solve_time", "ripple_solve_time")
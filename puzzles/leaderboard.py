@@ -0,0 +1,139 @@
+# The public leaderboard is the same for every viewer, so it's cached in pages
+# shared by all of them. Pages are read from TeamStanding by rank with keyset
+# pagination (each page starts after the rank and team id of the last row of
+# the previous one), so even a miss is an index range scan on the standings and not the
+# aggregate over submissions.
+#
+# Workers find out about changes through a version key in the shared Django
+# cache, bumped whenever ranks are recomputed (see tasks.rank_standings).
+# Hidden teams see themselves on the leaderboard, but instead of changing the
+# shared pages, their own row is spliced into the page where it would go.
+import time
+
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from puzzles.hunt_config import TIEBREAK_MILESTONES
+from puzzles.models import Team, TeamStanding
+
+VERSION_KEY = "leaderboard-version"
+PAGE_SIZE = 100
+PAGE_TIMEOUT = 60 * 60
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def rows(teams):
+    """
+    The rows of these teams, with the same keys as Team.leaderboard() plus
+    'rank'.
+    """
+
+    return teams.values(
+        "id",
+        "user_id",
+        "team_name",
+        rank=F("standing__rank"),
+        **{field: F(f"standing__{field}") for field in TeamStanding.DERIVED_FIELDS},
+    )
+
+
+def sort_key(row):
+    # Same as TeamStanding.ORDERING.
+    return (
+        *((row[field] is None, row[field]) for field in TIEBREAK_MILESTONES),
+        -row["total_solves"],
+        row["last_solve_or_creation_time"],
+    )
+
+
+def parse_cursor(value):
+    """Parses a cursor from a query string, or returns None if it's invalid."""
+
+    try:
+        rank, team_id = value.split("-")
+        return (int(rank), int(team_id))
+    except (AttributeError, ValueError):
+        return None
+
+
+def load_page(after):
+    teams = Team.objects.filter(standing__rank__isnull=False)
+    if after is not None:
+        rank, team_id = after
+        teams = teams.filter(
+            Q(standing__rank__gt=rank) | Q(standing__rank=rank, id__gt=team_id)
+        )
+    # one extra row to tell whether there's a next page, and where it starts
+    teams = list(rows(teams.order_by("standing__rank", "id"))[: PAGE_SIZE + 1])
+    following = teams[PAGE_SIZE] if len(teams) > PAGE_SIZE else None
+    teams = teams[:PAGE_SIZE]
+    return {
+        "teams": teams,
+        "following": following,
+        "next": f"{teams[-1]['rank']}-{teams[-1]['id']}" if following else None,
+    }
+
+
+def get_page(after=None):
+    """
+    Returns the page of the public leaderboard after a cursor (or the first
+    page), as a dict with 'teams', the rows of the page, 'following', the
+    first row of the next page, if any, and 'next', the cursor of the next
+    page, if any.
+    """
+
+    cursor = "first" if after is None else "{}-{}".format(*after)
+    key = f"leaderboard:{get_version()}:{cursor}"
+    page = cache.get(key)
+    if page is None:
+        page = load_page(after)
+        cache.set(key, page, timeout=PAGE_TIMEOUT)
+    return page
+
+
+def team_row(team_id):
+    """The row of one team, or None if it doesn't have a standing yet."""
+
+    return rows(Team.objects.filter(id=team_id, standing__isnull=False)).first()
+
+
+def splice(page, after, row):
+    """
+    Returns the rows of a page with the row of a team that isn't on the public
+    leaderboard inserted where it would be, if that's on this page. The team
+    is shown with the rank of the public team it goes before.
+    """
+
+    teams = page["teams"]
+    key = sort_key(row)
+    if after is not None and teams and key < sort_key(teams[0]):
+        return teams
+    if page["following"] and key >= sort_key(page["following"]):
+        return teams
+
+    position = next(
+        (i for (i, team) in enumerate(teams) if key < sort_key(team)), len(teams)
+    )
+    if position < len(teams):
+        rank = teams[position]["rank"]
+    elif page["following"]:
+        rank = page["following"]["rank"]
+    elif teams:
+        rank = teams[-1]["rank"] + 1
+    else:
+        rank = 1
+    return [*teams[:position], {**row, "rank": rank}, *teams[position:]]
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from puzzles import catalog, frozen
+
+
+class Command(BaseCommand):
+    help = (
+        "Precomputes the payloads of the post-hunt stats pages and stores them, "
+        "replacing any frozen before"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only build the payloads that haven't been frozen yet",
+        )
+
+    def handle(self, *args, **options):
+        names = frozen.freeze(
+            catalog.get_catalog().puzzles, only_missing=options["missing"]
+        )
+        if options["verbosity"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Successfully froze {len(names)} payloads")
+            )
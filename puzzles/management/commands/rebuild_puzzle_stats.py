@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from puzzles.models import Puzzle, PuzzleStats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the per-puzzle stats from unlocks, submissions and hints"
+
+    def add_arguments(self, parser):
+        parser.add_argument("slugs", nargs="*", help="Only rebuild these puzzles")
+        parser.add_argument(
+            "--counts",
+            action="store_true",
+            help="Only recompute the solve, guess and team counters",
+        )
+
+    def handle(self, *args, **options):
+        puzzle_ids = None
+        if options["slugs"]:
+            puzzle_ids = list(
+                Puzzle.objects.filter(slug__in=options["slugs"]).values_list(
+                    "id", flat=True
+                )
+            )
+        if options["counts"]:
+            PuzzleStats.recount(puzzle_ids)
+        else:
+            PuzzleStats.refresh(puzzle_ids)
+        if options["verbosity"]:
+            count = (
+                PuzzleStats.objects.count() if puzzle_ids is None else len(puzzle_ids)
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Successfully rebuilt stats for {count} puzzles")
+            )
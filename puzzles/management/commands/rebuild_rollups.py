@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from puzzles.models import WrapupRollup
+
+
+class Command(BaseCommand):
+    help = "Recomputes the wrap-up chart rollups from submissions and hints"
+
+    def handle(self, *args, **options):
+        WrapupRollup.refresh()
+        if options["verbosity"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Successfully rebuilt "
+                    f"{WrapupRollup.objects.count()} wrap-up rollups"
+                )
+            )
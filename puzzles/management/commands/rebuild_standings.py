@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from puzzles import leaderboard
+from puzzles.hunt_config import HUNT_END_TIME
+from puzzles.models import Team, TeamStanding
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the materialized leaderboard from submissions and checks "
+        "it against the aggregate query"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only compare the table against the aggregate query",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            team_ids = list(Team.objects.order_by("id").values_list("id", flat=True))
+            TeamStanding.refresh(team_ids)
+            TeamStanding.rank_all()
+            leaderboard.bump_version()
+            if options["verbosity"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Successfully rebuilt standings for {len(team_ids)} teams"
+                    )
+                )
+
+        fields = ("id", *TeamStanding.DERIVED_FIELDS)
+        expected = list(
+            Team.compute_standings(Team.objects.filter(creation_time__lt=HUNT_END_TIME))
+            .order_by(*TeamStanding.ORDERING, "id")
+            .values_list(*fields)
+        )
+        actual = list(
+            Team.leaderboard_teams(None, hide_hidden=False)
+            .order_by(*TeamStanding.ORDERING, "id")
+            .values_list(*fields)
+        )
+        if expected != actual:
+            mismatched = {row[0] for row in set(expected) ^ set(actual)}
+            msg = f"Standings differ from submissions for teams {sorted(mismatched)}"
+            raise CommandError(msg)
+        if options["verbosity"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Standings match for {len(actual)} teams")
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from puzzles.models import SurveyAggregate
+
+
+class Command(BaseCommand):
+    help = "Recomputes the per-puzzle survey rating totals from the surveys"
+
+    def handle(self, *args, **options):
+        SurveyAggregate.refresh()
+        if options["verbosity"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Successfully rebuilt "
+                    f"{SurveyAggregate.objects.count()} survey aggregates"
+                )
+            )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from puzzles import progress
+from puzzles.models import Team, TeamPuzzleProgress
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the denormalized team puzzle progress table from unlocks, "
+        "submissions and hints"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "team_ids", nargs="*", type=int, help="Only rebuild these teams"
+        )
+
+    def handle(self, *args, **options):
+        team_ids = options["team_ids"] or list(
+            Team.objects.order_by("id").values_list("id", flat=True)
+        )
+        TeamPuzzleProgress.refresh(team_ids)
+        for team_id in team_ids:
+            progress.invalidate(team_id)
+        if options["verbosity"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Successfully rebuilt progress for {len(team_ids)} teams"
+                )
+            )
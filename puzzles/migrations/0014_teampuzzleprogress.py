@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("puzzles", "0013_alter_erratum_is_announcement_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TeamPuzzleProgress",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "unlocked_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Unlocked at"
+                    ),
+                ),
+                (
+                    "viewed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Viewed at"
+                    ),
+                ),
+                (
+                    "solved_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Solved at"
+                    ),
+                ),
+                (
+                    "used_free_answer",
+                    models.BooleanField(default=False, verbose_name="Used free answer"),
+                ),
+                (
+                    "wrong_guesses",
+                    models.IntegerField(default=0, verbose_name="Wrong guesses"),
+                ),
+                (
+                    "partial_guesses",
+                    models.IntegerField(default=0, verbose_name="Partial guesses"),
+                ),
+                (
+                    "hints_requested",
+                    models.IntegerField(default=0, verbose_name="Hints requested"),
+                ),
+                (
+                    "hints_used",
+                    models.IntegerField(default=0, verbose_name="Hints used"),
+                ),
+                (
+                    "puzzle",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="puzzles.puzzle",
+                        verbose_name="puzzle",
+                    ),
+                ),
+                (
+                    "team",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="puzzles.team",
+                        verbose_name="team",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "team puzzle progress",
+                "verbose_name_plural": "team puzzle progress",
+                "unique_together": {("team", "puzzle")},
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("puzzles", "0014_teampuzzleprogress"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TeamStanding",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total_solves",
+                    models.IntegerField(default=0, verbose_name="Total solves"),
+                ),
+                (
+                    "metameta_solve_time",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Metameta solve time"
+                    ),
+                ),
+                (
+                    "ripple_solve_time",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Ripple solve time"
+                    ),
+                ),
+                (
+                    "melody_solve_time",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Melody solve time"
+                    ),
+                ),
+                (
+                    "demon_solve_time",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Demon solve time"
+                    ),
+                ),
+                (
+                    "last_solve_or_creation_time",
+                    models.DateTimeField(verbose_name="Last solve or creation time"),
+                ),
+                (
+                    "rank",
+                    models.IntegerField(
+                        blank=True, db_index=True, null=True, verbose_name="Rank"
+                    ),
+                ),
+                (
+                    "team",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="standing",
+                        to="puzzles.team",
+                        verbose_name="team",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "team standing",
+                "verbose_name_plural": "team standings",
+                "indexes": [
+                    models.Index(
+                        fields=[
+                            "metameta_solve_time",
+                            "ripple_solve_time",
+                            "-total_solves",
+                            "last_solve_or_creation_time",
+                        ],
+                        name="puzzles_tea_metamet_ffae5c_idx",
+                    )
+                ],
+            },
+        ),
+    ]
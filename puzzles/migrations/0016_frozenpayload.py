@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("puzzles", "0015_teamstanding"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FrozenPayload",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=255, unique=True, verbose_name="Name"),
+                ),
+                ("payload", models.JSONField(verbose_name="Payload")),
+                ("updated", models.DateTimeField(verbose_name="Updated")),
+            ],
+            options={
+                "verbose_name": "frozen payload",
+                "verbose_name_plural": "frozen payloads",
+            },
+        ),
+    ]
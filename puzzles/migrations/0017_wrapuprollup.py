@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("puzzles", "0016_frozenpayload"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WrapupRollup",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField(verbose_name="Hour")),
+                (
+                    "correct_guesses",
+                    models.IntegerField(default=0, verbose_name="Correct guesses"),
+                ),
+                (
+                    "partial_guesses",
+                    models.IntegerField(default=0, verbose_name="Partial guesses"),
+                ),
+                (
+                    "wrong_guesses",
+                    models.IntegerField(default=0, verbose_name="Wrong guesses"),
+                ),
+                ("hints", models.IntegerField(default=0, verbose_name="Hints")),
+                (
+                    "hint_latency",
+                    models.FloatField(default=0, verbose_name="Hint latency"),
+                ),
+                (
+                    "fastest_solve",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="Fastest solve"
+                    ),
+                ),
+                (
+                    "fastest_team",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="puzzles.team",
+                        verbose_name="Fastest team",
+                    ),
+                ),
+                (
+                    "puzzle",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="puzzles.puzzle",
+                        verbose_name="puzzle",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "wrap-up rollup",
+                "verbose_name_plural": "wrap-up rollups",
+                "unique_together": {("puzzle", "hour")},
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("puzzles", "0017_wrapuprollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PuzzleStats",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("solves", models.IntegerField(default=0, verbose_name="Solves")),
+                ("guesses", models.IntegerField(default=0, verbose_name="Guesses")),
+                ("teams", models.IntegerField(default=0, verbose_name="Teams")),
+                ("unlocks", models.IntegerField(default=0, verbose_name="Unlocks")),
+                ("hints", models.IntegerField(default=0, verbose_name="Hints")),
+                (
+                    "puzzle",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="puzzles.puzzle",
+                        verbose_name="puzzle",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "puzzle stats",
+                "verbose_name_plural": "puzzle stats",
+            },
+        ),
+        migrations.CreateModel(
+            name="PuzzleWrongAnswer",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("guess", models.CharField(max_length=255, verbose_name="Guess")),
+                ("partial", models.BooleanField(default=False, verbose_name="Partial")),
+                ("count", models.IntegerField(default=0, verbose_name="Count")),
+                (
+                    "puzzle",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="puzzles.puzzle",
+                        verbose_name="puzzle",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "puzzle wrong answer",
+                "verbose_name_plural": "puzzle wrong answers",
+                "unique_together": {("puzzle", "guess", "partial")},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("puzzles", "0018_puzzlestats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SurveyAggregate",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("field", models.CharField(max_length=255, verbose_name="Field")),
+                ("is_hidden", models.BooleanField(verbose_name="Is hidden")),
+                ("total", models.IntegerField(default=0, verbose_name="Total")),
+                ("count", models.IntegerField(default=0, verbose_name="Count")),
+                (
+                    "puzzle",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="puzzles.puzzle",
+                        verbose_name="puzzle",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "survey aggregate",
+                "verbose_name_plural": "survey aggregates",
+                "unique_together": {("puzzle", "field", "is_hidden")},
+            },
+        ),
+    ]
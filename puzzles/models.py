@@ -8,16 +8,29 @@ from urllib.parse import quote
 from django import forms
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models import Case, Count, F, FilteredRelation, Min, Q, When
-from django.db.models.functions import Coalesce
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    FilteredRelation,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+    Window,
+)
+from django.db.models.functions import Coalesce, RowNumber
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
-from puzzles import tasks
+from puzzles import catalog, counters, progress, tasks
 from puzzles.context import ContextProps, context_cache
 from puzzles.hunt_config import (
     FREE_ANSWER_TIME,
@@ -28,12 +41,14 @@ from puzzles.hunt_config import (
     HINTS_ENABLED,
     HINTS_PER_INTERVAL,
     HUNT_END_TIME,
+    HUNT_START_TIME,
     INTRO_HINTS,
     INTRO_ROUND_SLUG,
     MAX_GUESSES_PER_PUZZLE,
-    META_META_SLUG,
+    MILESTONES,
     TEAM_AGE_BEFORE_FREE_ANSWERS,
     TEAM_AGE_BEFORE_HINTS,
+    TIEBREAK_MILESTONES,
 )
 from puzzles.messaging import (
     dispatch_free_answer_alert,
@@ -295,22 +310,33 @@ class Team(models.Model, ContextProps):
         ]
 
     def puzzle_submissions(self, puzzle):
-        return [
-            submission for submission in self.submissions if submission.puzzle == puzzle
-        ]
+        # Pages about a single puzzle don't need the team's whole history, so
+        # unless something already loaded it, only fetch this puzzle's
+        # submissions (which the (team, puzzle, submitted_answer) unique
+        # index covers).
+        if "submissions" in getattr(self, "_cache", {}):
+            return [
+                submission
+                for submission in self.submissions
+                if submission.puzzle_id == puzzle.id
+            ]
+        submissions = list(
+            self.answersubmission_set.filter(puzzle=puzzle).order_by(
+                "-submitted_datetime"
+            )
+        )
+        for submission in submissions:
+            submission.puzzle = puzzle
+        return submissions
 
     def puzzle_answer(self, puzzle):
         return puzzle.answer if puzzle.id in self.solves else None
 
     def num_wrong_guesses(self, puzzle):
-        return sum(
-            1
-            for submission in self.puzzle_submissions(puzzle)
-            if not submission.is_correct and not submission.is_message
-        )
+        return self.progress.wrong_guesses.get(puzzle.id, 0)
 
     def num_extra_guesses(self, puzzle):
-        return self.extra_guesses.get(puzzle.slug, 0)
+        return self.extra_guesses.get(puzzle.id, 0)
 
     def guesses_remaining(self, puzzle):
         if puzzle.max_guesses is not None:
@@ -336,20 +362,14 @@ class Team(models.Model, ContextProps):
             end), or if none, team creation time
           - 'metameta_solve_time': time of finishing the hunt (if before hunt
             end)
+          - the solve time of each of the other MILESTONES (if before hunt
+            end)
 
         This depends on the viewing team for hidden teams.
         """
 
         return Team.leaderboard_teams(current_team, hide_hidden).values(
-            "id",
-            "user_id",
-            "team_name",
-            "total_solves",
-            "last_solve_or_creation_time",
-            "metameta_solve_time",
-            "ripple_solve_time",
-            "melody_solve_time",
-            "demon_solve_time",
+            "id", "user_id", "team_name", *TeamStanding.DERIVED_FIELDS
         )
 
     @staticmethod
@@ -363,6 +383,9 @@ class Team(models.Model, ContextProps):
           - 'metameta_solve_time': time of finishing the hunt (if before hunt
             end)
 
+        The annotations are read from the teams' TeamStandings rather than
+        aggregated from submissions (see Team.compute_standings).
+
         This depends on the viewing team for hidden teams.
         """
 
@@ -377,12 +400,31 @@ class Team(models.Model, ContextProps):
                 # ...but always show current team, regardless of hidden status
                 q |= Q(id=current_team.id)
 
-        all_teams = Team.objects.filter(q)
+        return Team.with_standings(Team.objects.filter(q))
+
+    @staticmethod
+    def with_standings(teams):
+        """
+        Annotates a QuerySet of teams with the fields of their TeamStandings,
+        in leaderboard order.
+        """
+
+        return teams.annotate(
+            **{field: F(f"standing__{field}") for field in TeamStanding.DERIVED_FIELDS}
+        ).order_by(*TeamStanding.ORDERING, "id")
+
+    @staticmethod
+    def compute_standings(teams):
+        """
+        Annotates a QuerySet of teams with the fields of TeamStanding, computed
+        from their submissions. This is the expensive query that TeamStanding
+        exists to avoid running on every leaderboard view.
+        """
 
         # https://docs.djangoproject.com/en/3.1/ref/models/querysets/#filteredrelation-objects
         # FilteredRelation does a LEFT OUTER JOIN with additional conditions in
         # the ON clause, so every team survives; the other stuff aggregates it
-        all_teams = all_teams.annotate(
+        all_teams = teams.annotate(
             scoring_submissions=FilteredRelation(
                 "answersubmission",
                 condition=Q(
@@ -392,49 +434,19 @@ class Team(models.Model, ContextProps):
                 ),
             ),
             total_solves=Count("scoring_submissions"),
-            metameta_solve_time=Min(
-                Case(
-                    When(
-                        scoring_submissions__puzzle__slug=META_META_SLUG,
-                        then="scoring_submissions__submitted_datetime",
-                    )
-                    # else, null by default
-                )
-            ),
-            ripple_solve_time=Min(
-                Case(
-                    When(
-                        scoring_submissions__puzzle__slug="ripple-effect",
-                        then="scoring_submissions__submitted_datetime",
-                    )
-                    # else, null by default
-                )
-            ),
-            melody_solve_time=Min(
-                Case(
-                    When(
-                        scoring_submissions__puzzle__slug="melody-medley",
-                        then="scoring_submissions__submitted_datetime",
-                    )
-                    # else, null by default
-                )
-            ),
-            demon_solve_time=Min(
-                Case(
-                    When(
-                        scoring_submissions__puzzle__slug="mark-of-the-demon",
-                        then="scoring_submissions__submitted_datetime",
+            **{
+                field: Min(
+                    Case(
+                        When(
+                            scoring_submissions__puzzle__slug=slug,
+                            then="scoring_submissions__submitted_datetime",
+                        )
+                        # else, null by default
                     )
-                    # else, null by default
-                )
-            ),
+                ) for (field, slug) in MILESTONES.items()
+            },
             # Coalesce(things) = the first of things that isn't null
             last_solve_or_creation_time=Coalesce("last_solve_time", "creation_time"),
-        ).order_by(
-            F("metameta_solve_time").asc(nulls_last=True),
-            F("ripple_solve_time").asc(nulls_last=True),
-            F("total_solves").desc(),
-            F("last_solve_or_creation_time"),
         )
 
         return all_teams
@@ -479,9 +491,72 @@ class Team(models.Model, ContextProps):
     def team(self):
         return self
 
-    @cached_property
-    def asked_hints(self):
-        return tuple(self.hint_set.select_related("puzzle", "puzzle__round"))
+    def progress(self):
+        return progress.get_progress(self.id, lambda: Team.load_progress(self.id))
+
+    @staticmethod
+    def load_progress(team_id):
+        solves = {}
+        free_answers = set()
+        wrong_guesses = {}
+        hints = {}
+        hints_used = 0
+        intro_hints_used = 0
+        unlocks = {}
+        for (
+            puzzle_id,
+            round_slug,
+            unlocked_at,
+            viewed_at,
+            solved_at,
+            used_free_answer,
+            num_wrong_guesses,
+            hints_requested,
+            num_hints_used,
+        ) in TeamPuzzleProgress.objects.filter(team_id=team_id).values_list(
+            "puzzle_id",
+            "puzzle__round__slug",
+            "unlocked_at",
+            "viewed_at",
+            "solved_at",
+            "used_free_answer",
+            "wrong_guesses",
+            "hints_requested",
+            "hints_used",
+        ):
+            if unlocked_at:
+                unlocks[puzzle_id] = (unlocked_at, viewed_at)
+            if solved_at:
+                solves[puzzle_id] = solved_at
+            if used_free_answer:
+                free_answers.add(puzzle_id)
+            if num_wrong_guesses:
+                wrong_guesses[puzzle_id] = num_wrong_guesses
+            if hints_requested:
+                hints[puzzle_id] = hints_requested
+            hints_used += num_hints_used
+            if round_slug == INTRO_ROUND_SLUG:
+                intro_hints_used += num_hints_used
+
+        return progress.TeamProgress(
+            solves=solves,
+            free_answers=frozenset(free_answers),
+            wrong_guesses=wrong_guesses,
+            hints=hints,
+            hints_used=hints_used,
+            intro_hints_used=intro_hints_used,
+            open_hints=tuple(
+                Hint.objects.filter(team_id=team_id, status=Hint.NO_RESPONSE)
+                .order_by("id")
+                .values_list("puzzle_id", flat=True)
+            ),
+            unlocks=unlocks,
+            extra_guesses=dict(
+                ExtraGuessGrant.objects.filter(team_id=team_id).values_list(
+                    "puzzle_id", "extra_guesses"
+                )
+            ),
+        )
 
     @cached_property
     def num_hints_total(self):
@@ -500,7 +575,7 @@ class Team(models.Model, ContextProps):
 
     @cached_property
     def num_hints_used(self):
-        return sum(hint.consumes_hint for hint in self.asked_hints)
+        return self.progress.hints_used
 
     @cached_property
     def num_hints_remaining(self):
@@ -508,14 +583,7 @@ class Team(models.Model, ContextProps):
 
     @cached_property
     def num_intro_hints_used(self):
-        return min(
-            INTRO_HINTS,
-            sum(
-                hint.consumes_hint
-                for hint in self.asked_hints
-                if hint.puzzle.round.slug == INTRO_ROUND_SLUG
-            ),
-        )
+        return min(INTRO_HINTS, self.progress.intro_hints_used)
 
     @cached_property
     def num_intro_hints_remaining(self):
@@ -536,16 +604,13 @@ class Team(models.Model, ContextProps):
 
     @cached_property
     def num_free_answers_used(self):
-        return sum(1 for submission in self.submissions if submission.used_free_answer)
+        return len(self.progress.free_answers)
 
     def num_free_answers_remaining(self):
         return self.num_free_answers_total - self.num_free_answers_used
 
     def extra_guesses(self):
-        return {
-            grant.puzzle.slug: grant.extra_guesses
-            for grant in self.extraguessgrant_set.select_related("puzzle")
-        }
+        return self.progress.extra_guesses
 
     @cached_property
     def submissions(self):
@@ -557,82 +622,154 @@ class Team(models.Model, ContextProps):
 
     @cached_property
     def solves(self):
+        solve_times = self.progress.solves
+        if not solve_times:
+            return {}
+        puzzles = catalog.get_catalog().by_id
         return {
-            submission.puzzle_id: submission.puzzle
-            for submission in self.submissions
-            if submission.is_correct
+            puzzle_id: puzzles[puzzle_id]
+            for puzzle_id in sorted(
+                solve_times, key=solve_times.__getitem__, reverse=True
+            )
         }
 
     def db_unlocks(self):
+        # These are rebuilt from the snapshot (and are never saved; see
+        # progress.queue_view); they're mutated within a request, so they
+        # can't be shared.
         return {
-            unlock.puzzle_id: unlock
-            for unlock in self.puzzleunlock_set.select_related(
-                "puzzle", "puzzle__round"
+            puzzle_id: PuzzleUnlock(
+                team=self,
+                puzzle_id=puzzle_id,
+                unlock_datetime=unlock_datetime,
+                view_datetime=view_datetime,
             )
+            for (
+                puzzle_id,
+                (unlock_datetime, view_datetime),
+            ) in self.progress.unlocks.items()
         }
 
-    def main_round_solves(self):
-        global_solves = 0
-        local_solves = collections.defaultdict(int)
-        for puzzle in self.solves.values():
-            if puzzle.is_meta:
-                continue
-            local_solves[puzzle.round.slug] += 1
-            if puzzle.round.slug == INTRO_ROUND_SLUG:
-                continue
-            global_solves += 1
-        return (global_solves, local_solves)
-
     @staticmethod
     def compute_unlocks(context):
-        metas_solved = []
+        puzzles = context.all_puzzles
         puzzles_unlocked = collections.OrderedDict()
+        if context.hunt_is_prereleased or context.hunt_is_over:
+            for puzzle in puzzles:
+                puzzles_unlocked[puzzle] = context.start_time
+            return puzzles_unlocked
+
+        engine = context.catalog.unlock_engine
+        elapsed = context.now - context.start_time
+        if not context.team:
+            for index, offset in engine.evaluate(elapsed):
+                puzzles_unlocked[puzzles[index]] = context.start_time + offset
+            return puzzles_unlocked
+
+        team = context.team
+        rule_unlocks = dict(
+            engine.evaluate(elapsed, team.allow_time_unlocks, team.solves)
+        )
+        # Puzzles that were ever unlocked stay unlocked, at their original time.
+        db_indices = [
+            engine.indices[puzzle_id]
+            for puzzle_id in team.db_unlocks
+            if puzzle_id in engine.indices
+        ]
+        for index in sorted(rule_unlocks.keys() | db_indices):
+            puzzle = puzzles[index]
+            if puzzle.id in team.db_unlocks:
+                unlocked_at = team.db_unlocks[puzzle.id].unlock_datetime
+            else:
+                offset = rule_unlocks[index]
+                if offset is None:
+                    unlocked_at = context.now
+                else:
+                    unlocked_at = context.start_time + offset
+                unlocked_at = Team.unlock_puzzle(
+                    context, puzzle, unlocked_at
+                ).unlock_datetime
+            puzzles_unlocked[puzzle] = unlocked_at
+        return puzzles_unlocked
+
+    @staticmethod
+    def materialize_time_unlocks(now, since=None):
+        """
+        Inserts PuzzleUnlock rows for every time unlock that has passed for
+        any team, so that page views find them in db_unlocks instead of
+        writing them. Teams are grouped by (start_offset, allow_time_unlocks),
+        since those determine their timeline; if since is given, only groups
+        with a time unlock in (since, now] are looked at. Returns the ids of
+        teams that got new unlocks.
+        """
+
+        if now >= HUNT_END_TIME:
+            # Everything is unlocked for everyone anyway.
+            return []
+        hunt_catalog = catalog.get_catalog()
+        puzzles = hunt_catalog.puzzles
+        engine = hunt_catalog.unlock_engine
+
+        groups = collections.defaultdict(list)
+        for team_id, start_offset, allow_time_unlocks in Team.objects.filter(
+            is_prerelease_testsolver=False
+        ).values_list("id", "start_offset", "allow_time_unlocks"):
+            groups[start_offset, allow_time_unlocks].append(team_id)
+
         unlocks = []
-        for puzzle in context.all_puzzles:
-            unlocked_at = None
-            if puzzle.unlock_hours >= 0 and (
-                puzzle.unlock_hours == 0
-                or not context.team
-                or context.team.allow_time_unlocks
+        for (start_offset, allow_time_unlocks), team_ids in groups.items():
+            start_time = HUNT_START_TIME - start_offset
+            passed = engine.num_time_triggers(now - start_time, allow_time_unlocks)
+            if not passed or (
+                since is not None
+                and passed == engine.num_time_triggers(
+                    since - start_time, allow_time_unlocks
+                )
             ):
-                unlock_time = context.start_time + datetime.timedelta(
-                    hours=puzzle.unlock_hours
+                continue
+            timeline = [
+                (puzzles[index].id, start_time + offset)
+                for index, offset in engine.evaluate(
+                    now - start_time, allow_time_unlocks
                 )
-                if unlock_time <= context.now:
-                    unlocked_at = unlock_time
-            if context.hunt_is_prereleased or context.hunt_is_over:
-                unlocked_at = context.start_time
-            elif context.team:
-                (global_solves, local_solves) = context.team.main_round_solves
-                if 0 <= puzzle.unlock_global <= global_solves and (
-                    global_solves or any(metas_solved)
-                ):
-                    unlocked_at = context.now
-                if 0 <= puzzle.unlock_local <= local_solves[puzzle.round.slug]:
-                    unlocked_at = context.now
-                # For a single-round hunt, this auto-unlocks the metameta
-                # Since there's no metas, all([]) is True
-                # if puzzle.slug == META_META_SLUG and all(metas_solved):
-                #     unlocked_at = context.now
-                if puzzle.is_meta:
-                    metas_solved.append(puzzle.id in context.team.solves)
-                if puzzle.id in context.team.db_unlocks:
-                    unlocked_at = context.team.db_unlocks[puzzle.id].unlock_datetime
-                elif unlocked_at:
-                    unlocks.append(Team.unlock_puzzle(context, puzzle, unlocked_at))
-            if unlocked_at:
-                puzzles_unlocked[puzzle] = unlocked_at
-        if unlocks:
-            PuzzleUnlock.objects.bulk_create(unlocks, ignore_conflicts=True)
-        return puzzles_unlocked
+            ]
+            existing = set(
+                PuzzleUnlock.objects.filter(
+                    team_id__in=team_ids,
+                    puzzle_id__in=[puzzle_id for (puzzle_id, _) in timeline],
+                ).values_list("team_id", "puzzle_id")
+            )
+            unlocks.extend(
+                PuzzleUnlock(
+                    team_id=team_id, puzzle_id=puzzle_id, unlock_datetime=unlocked_at
+                )
+                for team_id in team_ids
+                for puzzle_id, unlocked_at in timeline
+                if (team_id, puzzle_id) not in existing
+            )
+
+        # One statement for everyone; rows a page view inserted in the
+        # meantime are skipped.
+        PuzzleUnlock.objects.bulk_create(unlocks, ignore_conflicts=True)
+        team_ids = sorted({unlock.team_id for unlock in unlocks})
+        # bulk_create doesn't send post_save.
+        TeamPuzzleProgress.record_unlocks(
+            (unlock.team_id, unlock.puzzle_id) for unlock in unlocks
+        )
+        for team_id in team_ids:
+            progress.invalidate(team_id)
+        return team_ids
 
     @staticmethod
     def unlock_puzzle(context, puzzle, unlocked_at):
+        # The row is written after the response (see progress.flush_writes);
+        # until then it only lives in this request's db_unlocks.
+        unlocked_at, queued = progress.queue_unlock(context, puzzle.id, unlocked_at)
         unlock = PuzzleUnlock(
             team=context.team, puzzle=puzzle, unlock_datetime=unlocked_at
         )
         context.team.db_unlocks[puzzle.id] = unlock
-        if unlocked_at == context.now:
+        if queued and unlocked_at == context.now:
             show_unlock_notification(context, unlock)
         return unlock
 
@@ -1286,6 +1423,1216 @@ def notify_on_hint_update(sender, instance: Hint, created, update_fields, **kwar
             )
 
 
+class TeamPuzzleProgress(models.Model):
+    """
+    A team's progress on one puzzle, denormalized from PuzzleUnlock,
+    AnswerSubmission and Hint so that it can be read with a single query. Kept
+    up to date by the receivers below; `manage.py rebuild_team_progress`
+    recomputes it from scratch.
+    """
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, verbose_name=_("team"))
+    puzzle = models.ForeignKey(
+        Puzzle, on_delete=models.CASCADE, verbose_name=_("puzzle")
+    )
+
+    unlocked_at = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Unlocked at")
+    )
+    viewed_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Viewed at"))
+    solved_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Solved at"))
+    used_free_answer = models.BooleanField(
+        default=False, verbose_name=_("Used free answer")
+    )
+    wrong_guesses = models.IntegerField(default=0, verbose_name=_("Wrong guesses"))
+    partial_guesses = models.IntegerField(default=0, verbose_name=_("Partial guesses"))
+    hints_requested = models.IntegerField(default=0, verbose_name=_("Hints requested"))
+    # hints that consume a hint (see Hint.consumes_hint)
+    hints_used = models.IntegerField(default=0, verbose_name=_("Hints used"))
+
+    team_id: int
+    puzzle_id: int
+
+    DERIVED_FIELDS = (
+        "unlocked_at",
+        "viewed_at",
+        "solved_at",
+        "used_free_answer",
+        "wrong_guesses",
+        "partial_guesses",
+        "hints_requested",
+        "hints_used",
+    )
+
+    class Meta:
+        unique_together = ("team", "puzzle")
+        verbose_name = _("team puzzle progress")
+        verbose_name_plural = _("team puzzle progress")
+
+    def __str__(self):
+        return f"{self.team} -> {self.puzzle}"
+
+    @staticmethod
+    def refresh(team_ids, puzzle_ids=None):
+        """
+        Recomputes the rows of these teams (only for these puzzles, if given)
+        from the underlying tables, in one transaction.
+        """
+
+        scope = Q(team_id__in=team_ids)
+        if puzzle_ids is not None:
+            scope &= Q(puzzle_id__in=puzzle_ids)
+
+        rows = {}
+
+        def row(team_id, puzzle_id):
+            if (team_id, puzzle_id) not in rows:
+                rows[team_id, puzzle_id] = TeamPuzzleProgress(
+                    team_id=team_id, puzzle_id=puzzle_id
+                )
+            return rows[team_id, puzzle_id]
+
+        with transaction.atomic():
+            # Lock the teams, so that concurrent refreshes of the same team
+            # can't overwrite each other's counts with older ones.
+            list(
+                Team.objects.select_for_update()
+                .filter(id__in=team_ids)
+                .order_by("id")
+                .values_list("id")
+            )
+
+            for (
+                team_id,
+                puzzle_id,
+                unlock_datetime,
+                view_datetime,
+            ) in PuzzleUnlock.objects.filter(scope).values_list(
+                "team_id", "puzzle_id", "unlock_datetime", "view_datetime"
+            ):
+                progress_row = row(team_id, puzzle_id)
+                progress_row.unlocked_at = unlock_datetime
+                progress_row.viewed_at = view_datetime
+
+            for aggregate in (
+                AnswerSubmission.objects.filter(scope)
+                .order_by()
+                .values("team_id", "puzzle_id")
+                .annotate(
+                    solved_at=Min("submitted_datetime", filter=Q(is_correct=True)),
+                    free_answers=Count(
+                        "id", filter=Q(is_correct=True, used_free_answer=True)
+                    ),
+                    wrong_guesses=Count(
+                        "id", filter=Q(is_correct=False, is_message=False)
+                    ),
+                    partial_guesses=Count(
+                        "id", filter=Q(is_correct=False, is_message=True)
+                    ),
+                )
+            ):
+                progress_row = row(aggregate["team_id"], aggregate["puzzle_id"])
+                progress_row.solved_at = aggregate["solved_at"]
+                progress_row.used_free_answer = aggregate["free_answers"] > 0
+                progress_row.wrong_guesses = aggregate["wrong_guesses"]
+                progress_row.partial_guesses = aggregate["partial_guesses"]
+
+            for aggregate in (
+                Hint.objects.filter(scope)
+                .order_by()
+                .values("team_id", "puzzle_id")
+                .annotate(
+                    hints_requested=Count("id"),
+                    # Same as Hint.consumes_hint.
+                    hints_used=Count(
+                        "id",
+                        filter=~Q(status__in=(Hint.REFUNDED, Hint.OBSOLETE))
+                        & Q(is_followup=False),
+                    ),
+                )
+            ):
+                progress_row = row(aggregate["team_id"], aggregate["puzzle_id"])
+                progress_row.hints_requested = aggregate["hints_requested"]
+                progress_row.hints_used = aggregate["hints_used"]
+
+            TeamPuzzleProgress.objects.filter(scope).exclude(
+                id__in=[
+                    progress_id
+                    for (
+                        progress_id,
+                        team_id,
+                        puzzle_id,
+                    ) in TeamPuzzleProgress.objects.filter(scope).values_list(
+                        "id", "team_id", "puzzle_id"
+                    )
+                    if (team_id, puzzle_id) in rows
+                ]
+            ).delete()
+            TeamPuzzleProgress.objects.bulk_create(
+                rows.values(),
+                update_conflicts=True,
+                unique_fields=("team", "puzzle"),
+                update_fields=TeamPuzzleProgress.DERIVED_FIELDS,
+            )
+
+    @staticmethod
+    def record(instance):
+        """
+        Applies a new answer submission, hint or unlock to its team's row for
+        the puzzle: counters are bumped with F() and times are only set if
+        they're still empty, so concurrent events don't need a lock.
+        """
+
+        if isinstance(instance, PuzzleUnlock):
+            TeamPuzzleProgress.record_unlocks([(instance.team_id, instance.puzzle_id)])
+            return
+        if isinstance(instance, Hint):
+            changes = {"hints_requested": F("hints_requested") + 1}
+            if instance.consumes_hint:
+                changes["hints_used"] = F("hints_used") + 1
+        elif instance.is_correct:
+            changes = {
+                "solved_at": Coalesce(
+                    "solved_at",
+                    Value(
+                        instance.submitted_datetime,
+                        output_field=models.DateTimeField(),
+                    ),
+                )
+            }
+            if instance.used_free_answer:
+                changes["used_free_answer"] = True
+        elif instance.is_message:
+            changes = {"partial_guesses": F("partial_guesses") + 1}
+        else:
+            changes = {"wrong_guesses": F("wrong_guesses") + 1}
+
+        rows = TeamPuzzleProgress.objects.filter(
+            team_id=instance.team_id, puzzle_id=instance.puzzle_id
+        )
+        if not rows.update(**changes):
+            TeamPuzzleProgress.objects.bulk_create(
+                [
+                    TeamPuzzleProgress(
+                        team_id=instance.team_id, puzzle_id=instance.puzzle_id
+                    )
+                ],
+                ignore_conflicts=True,
+            )
+            rows.update(**changes)
+
+    @staticmethod
+    def record_unlocks(team_puzzle_ids):
+        """
+        Copies the unlock and view times of these (team id, puzzle id) pairs
+        from their PuzzleUnlocks to the rows that don't have them yet. Bulk
+        writes of PuzzleUnlock send no signals, so they call this themselves.
+        """
+
+        team_puzzle_ids = set(team_puzzle_ids)
+        if not team_puzzle_ids:
+            return
+        TeamPuzzleProgress.objects.bulk_create(
+            [
+                TeamPuzzleProgress(team_id=team_id, puzzle_id=puzzle_id)
+                for team_id, puzzle_id in team_puzzle_ids
+            ],
+            ignore_conflicts=True,
+        )
+        by_team = collections.defaultdict(list)
+        for team_id, puzzle_id in team_puzzle_ids:
+            by_team[team_id].append(puzzle_id)
+        scope = Q(pk__in=[])
+        for team_id, puzzle_ids in by_team.items():
+            scope |= Q(team_id=team_id, puzzle_id__in=puzzle_ids)
+        unlock = PuzzleUnlock.objects.filter(
+            team_id=OuterRef("team_id"), puzzle_id=OuterRef("puzzle_id")
+        )
+        TeamPuzzleProgress.objects.filter(scope, unlocked_at=None).update(
+            unlocked_at=Subquery(unlock.values("unlock_datetime")[:1])
+        )
+        TeamPuzzleProgress.objects.filter(scope, viewed_at=None).update(
+            viewed_at=Subquery(unlock.values("view_datetime")[:1])
+        )
+
+
+def deleted_with(origin, *senders):
+    """
+    Whether a post_delete with this origin is cascading from the deletion of
+    an instance (or QuerySet) of one of these models.
+    """
+
+    if isinstance(origin, models.QuerySet):
+        return origin.model in senders
+    return type(origin) in senders
+
+
+@receiver(pre_save, sender=AnswerSubmission)
+@receiver(pre_save, sender=Hint)
+@receiver(pre_save, sender=Survey)
+def remember_previous(sender, instance, **kwargs):
+    # Counters that an edit moves (see WrapupRollup, PuzzleStats and
+    # SurveyAggregate) subtract the instance as it was before adding it back.
+    instance._previous = (
+        None
+        if instance._state.adding
+        else sender.objects.filter(pk=instance.pk).first()
+    )
+
+
+@receiver(post_save, sender=AnswerSubmission)
+@receiver(post_delete, sender=AnswerSubmission)
+@receiver(post_save, sender=Hint)
+@receiver(post_delete, sender=Hint)
+@receiver(post_save, sender=PuzzleUnlock)
+@receiver(post_delete, sender=PuzzleUnlock)
+def refresh_team_puzzle_progress(
+    sender, instance, created=False, origin=None, **kwargs
+):
+    # If the team or puzzle itself is being deleted, its rows go with it.
+    if deleted_with(origin, Team, Puzzle):
+        return
+    if created:
+        TeamPuzzleProgress.record(instance)
+    else:
+        # edited or deleted, which can take anything away
+        TeamPuzzleProgress.refresh([instance.team_id], [instance.puzzle_id])
+
+
+@receiver(post_save, sender=AnswerSubmission)
+@receiver(post_delete, sender=AnswerSubmission)
+@receiver(post_save, sender=Hint)
+@receiver(post_delete, sender=Hint)
+@receiver(post_save, sender=PuzzleUnlock)
+@receiver(post_delete, sender=PuzzleUnlock)
+@receiver(post_save, sender=ExtraGuessGrant)
+@receiver(post_delete, sender=ExtraGuessGrant)
+def invalidate_team_progress(sender, instance, **kwargs):
+    progress.invalidate(instance.team_id)
+
+
+class TeamStanding(models.Model):
+    """
+    A team's leaderboard standing, materialized from Team.compute_standings so
+    that the leaderboard doesn't aggregate every submission each time. Kept up
+    to date by the receivers below; `manage.py rebuild_standings` recomputes
+    (and checks) the table from scratch.
+    """
+
+    team = models.OneToOneField(
+        Team,
+        on_delete=models.CASCADE,
+        related_name="standing",
+        verbose_name=_("team"),
+    )
+
+    total_solves = models.IntegerField(default=0, verbose_name=_("Total solves"))
+    # the solve times of hunt_config.MILESTONES
+    metameta_solve_time = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Metameta solve time")
+    )
+    ripple_solve_time = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Ripple solve time")
+    )
+    melody_solve_time = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Melody solve time")
+    )
+    demon_solve_time = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Demon solve time")
+    )
+    last_solve_or_creation_time = models.DateTimeField(
+        verbose_name=_("Last solve or creation time")
+    )
+    # 1-based position among public teams (ties are broken by team id, so
+    # it's unique, like the numbering of the leaderboard), or null for
+    # hidden teams and teams created after the hunt. Recomputed in the
+    # background after standings change (see tasks.rank_standings), so it can
+    # briefly lag behind the other fields.
+    rank = models.IntegerField(
+        null=True, blank=True, db_index=True, verbose_name=_("Rank")
+    )
+
+    team_id: int
+
+    DERIVED_FIELDS = ("total_solves", *MILESTONES, "last_solve_or_creation_time")
+    # leaderboard order
+    ORDERING = (
+        *(F(field).asc(nulls_last=True) for field in TIEBREAK_MILESTONES),
+        F("total_solves").desc(),
+        F("last_solve_or_creation_time").asc(),
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=[
+                    *TIEBREAK_MILESTONES,
+                    "-total_solves",
+                    "last_solve_or_creation_time",
+                ]
+            )
+        ]
+        verbose_name = _("team standing")
+        verbose_name_plural = _("team standings")
+
+    def __str__(self):
+        return f"{self.team}: {self.total_solves} solves"
+
+    @staticmethod
+    def refresh(team_ids):
+        """Recomputes the standings of these teams (but not the ranks)."""
+
+        TeamStanding.objects.bulk_create(
+            [
+                TeamStanding(
+                    team_id=values["id"],
+                    **{field: values[field] for field in TeamStanding.DERIVED_FIELDS},
+                )
+                for values in Team.compute_standings(
+                    Team.objects.filter(id__in=team_ids)
+                ).values("id", *TeamStanding.DERIVED_FIELDS)
+            ],
+            update_conflicts=True,
+            unique_fields=("team",),
+            update_fields=TeamStanding.DERIVED_FIELDS,
+        )
+
+    @staticmethod
+    def rank_all():
+        """Recomputes every team's rank, writing only the ones that changed."""
+
+        ranks = dict(
+            TeamStanding.objects.filter(
+                team__is_hidden=False, team__creation_time__lt=HUNT_END_TIME
+            )
+            .annotate(
+                new_rank=Window(
+                    RowNumber(), order_by=(*TeamStanding.ORDERING, F("team_id").asc())
+                )
+            )
+            .values_list("id", "new_rank")
+        )
+        changed = []
+        for standing in TeamStanding.objects.only("id", "rank"):
+            new_rank = ranks.get(standing.id)
+            if standing.rank != new_rank:
+                standing.rank = new_rank
+                changed.append(standing)
+        TeamStanding.objects.bulk_update(changed, ["rank"], batch_size=1000)
+        return len(changed)
+
+    @staticmethod
+    def record_solve(submission):
+        """
+        Adds a new scoring submission to its team's standing, recording the
+        time if it's the team's first solve of a milestone.
+        """
+
+        updates = {"total_solves": F("total_solves") + 1}
+        slug = catalog.get_catalog().by_id[submission.puzzle_id].slug
+        for field, milestone_slug in MILESTONES.items():
+            if slug == milestone_slug:
+                updates[field] = Coalesce(field, Value(submission.submitted_datetime))
+        if not TeamStanding.objects.filter(team_id=submission.team_id).update(
+            **updates
+        ):
+            TeamStanding.refresh([submission.team_id])
+
+
+def is_scoring_submission(submission):
+    return (
+        submission.is_correct
+        and not submission.used_free_answer
+        and submission.submitted_datetime < HUNT_END_TIME
+    )
+
+
+@receiver(post_save, sender=AnswerSubmission)
+@receiver(post_delete, sender=AnswerSubmission)
+def refresh_standing_on_submission(
+    sender, instance, created=False, origin=None, **kwargs
+):
+    if deleted_with(origin, Team):
+        return
+    if created:
+        if not is_scoring_submission(instance):
+            return
+        TeamStanding.record_solve(instance)
+    else:
+        # Edited or deleted, which only happens by hand. The submission may
+        # have scored before, whatever it looks like now.
+        TeamStanding.refresh([instance.team_id])
+    tasks.schedule_rank_standings()
+
+
+@receiver(post_save, sender=Team)
+def refresh_standing_on_team_update(sender, instance, created, **kwargs):
+    # New teams need a standing to show up on the leaderboard; otherwise, the
+    # team's last solve time or hidden status may have changed.
+    if created:
+        TeamStanding.refresh([instance.id])
+    else:
+        TeamStanding.objects.filter(team=instance).update(
+            last_solve_or_creation_time=instance.last_solve_time
+            or instance.creation_time
+        )
+    tasks.schedule_rank_standings()
+
+
+@receiver(post_delete, sender=Team)
+def rerank_on_team_deletion(sender, instance, **kwargs):
+    tasks.schedule_rank_standings()
+
+
+def hour_of(time):
+    return time.replace(minute=0, second=0, microsecond=0)
+
+
+class WrapupRollup(models.Model):
+    """
+    The inputs of the wrap-up charts for one puzzle and hour, aggregated from
+    the submissions and hints made in it, so that the wrap-up reads a few
+    hundred of these instead of the whole hunt. Kept up to date by the
+    receivers below; `manage.py rebuild_rollups` recomputes it from scratch
+    (which is also needed after hiding or unhiding a team).
+    """
+
+    puzzle = models.ForeignKey(
+        Puzzle, on_delete=models.CASCADE, verbose_name=_("puzzle")
+    )
+    hour = models.DateTimeField(verbose_name=_("Hour"))
+
+    # guesses during the hunt by public teams, without free answers
+    correct_guesses = models.IntegerField(default=0, verbose_name=_("Correct guesses"))
+    partial_guesses = models.IntegerField(default=0, verbose_name=_("Partial guesses"))
+    wrong_guesses = models.IntegerField(default=0, verbose_name=_("Wrong guesses"))
+    # answered hints asked in this hour, and the total seconds they took
+    hints = models.IntegerField(default=0, verbose_name=_("Hints"))
+    hint_latency = models.FloatField(default=0, verbose_name=_("Hint latency"))
+    # the fastest of these solves, in seconds from unlocking the puzzle
+    fastest_solve = models.FloatField(
+        null=True, blank=True, verbose_name=_("Fastest solve")
+    )
+    fastest_team = models.ForeignKey(
+        Team,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        verbose_name=_("Fastest team"),
+    )
+
+    puzzle_id: int
+
+    DERIVED_FIELDS = (
+        "correct_guesses",
+        "partial_guesses",
+        "wrong_guesses",
+        "hints",
+        "hint_latency",
+        "fastest_solve",
+        "fastest_team",
+    )
+
+    class Meta:
+        unique_together = ("puzzle", "hour")
+        verbose_name = _("wrap-up rollup")
+        verbose_name_plural = _("wrap-up rollups")
+
+    def __str__(self):
+        return f"{self.puzzle} @ {self.hour}"
+
+    @staticmethod
+    def submissions(*filters):
+        """
+        The submissions among these that count towards the rollups, with the
+        time the team unlocked the puzzle if it has viewed it (None otherwise).
+        """
+
+        return AnswerSubmission.objects.filter(
+            *filters,
+            used_free_answer=False,
+            team__is_hidden=False,
+            submitted_datetime__lt=HUNT_END_TIME,
+        ).annotate(
+            unlock_datetime=Subquery(
+                PuzzleUnlock.objects.filter(
+                    team_id=OuterRef("team_id"),
+                    puzzle_id=OuterRef("puzzle_id"),
+                    view_datetime__isnull=False,
+                ).values("unlock_datetime")[:1]
+            )
+        )
+
+    @staticmethod
+    def refresh():
+        """
+        Recomputes all the rows from the underlying tables, in one
+        transaction. The receivers below only add and remove single
+        submissions and hints.
+        """
+
+        rows = {}
+
+        def row(puzzle_id, hour):
+            if (puzzle_id, hour) not in rows:
+                rows[puzzle_id, hour] = WrapupRollup(puzzle_id=puzzle_id, hour=hour)
+            return rows[puzzle_id, hour]
+
+        with transaction.atomic():
+            for (
+                puzzle_id,
+                team_id,
+                submitted_datetime,
+                is_correct,
+                is_message,
+                unlock_datetime,
+            ) in WrapupRollup.submissions().values_list(
+                "puzzle_id",
+                "team_id",
+                "submitted_datetime",
+                "is_correct",
+                "is_message",
+                "unlock_datetime",
+            ):
+                rollup = row(puzzle_id, hour_of(submitted_datetime))
+                if not is_correct:
+                    if is_message:
+                        rollup.partial_guesses += 1
+                    else:
+                        rollup.wrong_guesses += 1
+                    continue
+                rollup.correct_guesses += 1
+                if unlock_datetime is not None:
+                    duration = (submitted_datetime - unlock_datetime).total_seconds()
+                    if rollup.fastest_solve is None or duration < rollup.fastest_solve:
+                        rollup.fastest_solve = duration
+                        rollup.fastest_team_id = team_id
+
+            for puzzle_id, submitted_datetime, answered_datetime in Hint.objects.filter(
+                answered_datetime__isnull=False
+            ).values_list("puzzle_id", "submitted_datetime", "answered_datetime"):
+                rollup = row(puzzle_id, hour_of(submitted_datetime))
+                rollup.hints += 1
+                rollup.hint_latency += (
+                    answered_datetime - submitted_datetime
+                ).total_seconds()
+
+            WrapupRollup.objects.all().delete()
+            # Rows that submissions made meanwhile created are overwritten.
+            WrapupRollup.objects.bulk_create(
+                rows.values(),
+                update_conflicts=True,
+                unique_fields=("puzzle", "hour"),
+                update_fields=WrapupRollup.DERIVED_FIELDS,
+            )
+
+    @staticmethod
+    def count(instance, sign=1):
+        """
+        Adds an answer submission or hint to the row of its puzzle and hour,
+        or removes it with a sign of -1. Counters are bumped with F() in the
+        database, so concurrent submissions don't need to lock anything.
+        """
+
+        if isinstance(instance, Hint):
+            if instance.answered_datetime is None:
+                return
+            counts = {
+                "hints": 1,
+                "hint_latency": (
+                    (
+                        instance.answered_datetime - instance.submitted_datetime
+                    ).total_seconds()
+                ),
+            }
+        elif (
+            instance.used_free_answer
+            or instance.team.is_hidden
+            or instance.submitted_datetime >= HUNT_END_TIME
+        ):
+            return
+        elif instance.is_correct:
+            counts = {"correct_guesses": 1}
+        elif instance.is_message:
+            counts = {"partial_guesses": 1}
+        else:
+            counts = {"wrong_guesses": 1}
+
+        hour = hour_of(instance.submitted_datetime)
+        WrapupRollup.objects.bulk_create(
+            [WrapupRollup(puzzle_id=instance.puzzle_id, hour=hour)],
+            ignore_conflicts=True,
+        )
+        WrapupRollup.objects.filter(puzzle_id=instance.puzzle_id, hour=hour).update(
+            **{field: F(field) + sign * value for field, value in counts.items()}
+        )
+
+        if "correct_guesses" not in counts:
+            return
+        if sign < 0:
+            WrapupRollup.refresh_fastest(instance.puzzle_id, hour)
+            return
+        unlock_datetime = (
+            PuzzleUnlock.objects.filter(
+                team_id=instance.team_id,
+                puzzle_id=instance.puzzle_id,
+                view_datetime__isnull=False,
+            )
+            .values_list("unlock_datetime", flat=True)
+            .first()
+        )
+        if unlock_datetime is not None:
+            WrapupRollup.count_solve(
+                instance.puzzle_id,
+                instance.team_id,
+                instance.submitted_datetime,
+                unlock_datetime,
+            )
+
+    @staticmethod
+    def count_solve(puzzle_id, team_id, submitted_datetime, unlock_datetime):
+        """Makes a solve the fastest of its hour if it beats the current one."""
+
+        duration = (submitted_datetime - unlock_datetime).total_seconds()
+        WrapupRollup.objects.filter(
+            Q(fastest_solve__isnull=True) | Q(fastest_solve__gt=duration),
+            puzzle_id=puzzle_id,
+            hour=hour_of(submitted_datetime),
+        ).update(fastest_solve=duration, fastest_team_id=team_id)
+
+    @staticmethod
+    def refresh_fastest(puzzle_id, hour):
+        """Recomputes the fastest solve of an hour after removing a solve."""
+
+        fastest_solve, fastest_team_id = min(
+            (
+                ((submitted_datetime - unlock_datetime).total_seconds(), team_id)
+                for (
+                    team_id,
+                    submitted_datetime,
+                    unlock_datetime,
+                ) in (
+                    WrapupRollup.submissions(
+                        Q(
+                            puzzle_id=puzzle_id,
+                            is_correct=True,
+                            submitted_datetime__gte=hour,
+                            submitted_datetime__lt=hour + datetime.timedelta(hours=1),
+                        )
+                    )
+                    .exclude(unlock_datetime=None)
+                    .values_list("team_id", "submitted_datetime", "unlock_datetime")
+                )
+            ),
+            default=(None, None),
+        )
+        WrapupRollup.objects.filter(puzzle_id=puzzle_id, hour=hour).update(
+            fastest_solve=fastest_solve, fastest_team_id=fastest_team_id
+        )
+
+    @staticmethod
+    def count_views(team_id, puzzle_ids):
+        """
+        Counts a team's solves of these puzzles towards the fastest ones,
+        which they only are once the team viewed the puzzle.
+        """
+
+        for (
+            puzzle_id,
+            submitted_datetime,
+            unlock_datetime,
+        ) in (
+            WrapupRollup.submissions(
+                Q(team_id=team_id, puzzle_id__in=puzzle_ids, is_correct=True)
+            )
+            .exclude(unlock_datetime=None)
+            .values_list("puzzle_id", "submitted_datetime", "unlock_datetime")
+        ):
+            WrapupRollup.count_solve(
+                puzzle_id, team_id, submitted_datetime, unlock_datetime
+            )
+
+
+class FrozenPayload(models.Model):
+    """
+    The precomputed payload of a post-hunt stats page (see frozen.py), stored
+    so that it survives cache evictions and deploys. They're rebuilt when a
+    team is hidden, unhidden or deleted, or a submission is edited or deleted,
+    after the hunt; `manage.py freeze_stats` rebuilds all of them.
+    """
+
+    name = models.CharField(max_length=255, unique=True, verbose_name=_("Name"))
+    payload = models.JSONField(verbose_name=_("Payload"))
+    updated = models.DateTimeField(verbose_name=_("Updated"))
+
+    class Meta:
+        verbose_name = _("frozen payload")
+        verbose_name_plural = _("frozen payloads")
+
+    def __str__(self):
+        return self.name
+
+
+@receiver(pre_save, sender=Team)
+def remember_previous_hidden(sender, instance, **kwargs):
+    # Only the frozen payloads care, and they only exist after the hunt.
+    instance._previous_is_hidden = (
+        None
+        if instance._state.adding or timezone.now() < HUNT_END_TIME
+        else Team.objects.filter(pk=instance.pk)
+        .values_list("is_hidden", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Team)
+def refresh_frozen_on_team_update(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_is_hidden", None)
+    if previous is not None and previous != instance.is_hidden:
+        tasks.schedule_refresh_frozen_on_commit()
+
+
+@receiver(post_delete, sender=Team)
+def refresh_frozen_on_team_deletion(sender, instance, **kwargs):
+    if timezone.now() >= HUNT_END_TIME:
+        tasks.schedule_refresh_frozen_on_commit()
+
+
+@receiver(post_save, sender=AnswerSubmission)
+@receiver(post_delete, sender=AnswerSubmission)
+def refresh_frozen_on_submission(
+    sender, instance, created=False, origin=None, **kwargs
+):
+    # Submissions made after the hunt are left out of the frozen payloads,
+    # but fixing or deleting an earlier one can change them.
+    if created or timezone.now() < HUNT_END_TIME or deleted_with(origin, Team, Puzzle):
+        return
+    tasks.schedule_refresh_frozen_on_commit(
+        [
+            "hunt-stats",
+            "wrapup",
+            "finishers",
+            f"stats:{catalog.get_catalog().by_id[instance.puzzle_id].slug}",
+        ]
+    )
+
+
+@receiver(post_save, sender=AnswerSubmission)
+@receiver(post_save, sender=Hint)
+def count_wrapup_rollup(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    if previous is not None:
+        WrapupRollup.count(previous, -1)
+    WrapupRollup.count(instance)
+
+
+@receiver(post_delete, sender=AnswerSubmission)
+@receiver(post_delete, sender=Hint)
+def uncount_wrapup_rollup(sender, instance, origin=None, **kwargs):
+    if deleted_with(origin, Puzzle):
+        return
+    WrapupRollup.count(instance, -1)
+
+
+@receiver(post_save, sender=PuzzleUnlock)
+def count_wrapup_rollup_view(sender, instance, **kwargs):
+    WrapupRollup.count_views(instance.team_id, [instance.puzzle_id])
+
+
+class PuzzleStats(models.Model):
+    """
+    The counters of a puzzle among public teams, as shown by its stats page
+    and the puzzles list, so that they read one row instead of every
+    submission. Its wrong answers are kept in PuzzleWrongAnswer and its
+    solvers come from TeamPuzzleProgress. The counters are bumped with F() as
+    submissions, hints and views are made; `manage.py rebuild_puzzle_stats`
+    recomputes all of them (which is also needed after hiding or unhiding a
+    team).
+    """
+
+    puzzle = models.OneToOneField(
+        Puzzle, on_delete=models.CASCADE, verbose_name=_("puzzle")
+    )
+
+    # guesses during the hunt, without free answers (see also counters.py)
+    solves = models.IntegerField(default=0, verbose_name=_("Solves"))
+    guesses = models.IntegerField(default=0, verbose_name=_("Guesses"))
+    teams = models.IntegerField(default=0, verbose_name=_("Teams"))
+    # teams (hidden or not) that viewed it, and hints asked, even after the hunt
+    unlocks = models.IntegerField(default=0, verbose_name=_("Unlocks"))
+    hints = models.IntegerField(default=0, verbose_name=_("Hints"))
+
+    puzzle_id: int
+
+    class Meta:
+        verbose_name = _("puzzle stats")
+        verbose_name_plural = _("puzzle stats")
+
+    def __str__(self):
+        return str(self.puzzle)
+
+    @staticmethod
+    def counted_submissions(*args, **kwargs):
+        """The submissions matching these filters that count towards the stats."""
+
+        return AnswerSubmission.objects.filter(
+            *args,
+            **kwargs,
+            used_free_answer=False,
+            submitted_datetime__lt=HUNT_END_TIME,
+        )
+
+    @staticmethod
+    def count_per_puzzle(queryset):
+        """The number of rows of this queryset for each row's puzzle."""
+
+        return Coalesce(
+            Subquery(
+                queryset.filter(puzzle_id=OuterRef("puzzle_id"))
+                .order_by()
+                .values("puzzle_id")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0,
+        )
+
+    @staticmethod
+    def refresh(puzzle_ids=None):
+        """
+        Recomputes the rows of these puzzles (or all of them), and their wrong
+        answers, from the underlying tables, in one transaction.
+        """
+
+        if puzzle_ids is None:
+            puzzle_ids = list(Puzzle.objects.values_list("id", flat=True))
+        public = Q(team__is_hidden=False)
+        with transaction.atomic():
+            PuzzleStats.objects.bulk_create(
+                [PuzzleStats(puzzle_id=puzzle_id) for puzzle_id in puzzle_ids],
+                ignore_conflicts=True,
+            )
+            PuzzleStats.objects.filter(puzzle_id__in=puzzle_ids).update(
+                unlocks=PuzzleStats.count_per_puzzle(
+                    PuzzleUnlock.objects.filter(view_datetime__isnull=False)
+                ),
+                hints=PuzzleStats.count_per_puzzle(Hint.objects.filter(public)),
+            )
+            PuzzleWrongAnswer.objects.filter(puzzle_id__in=puzzle_ids).delete()
+            # Rows that submissions made meanwhile created are overwritten.
+            PuzzleWrongAnswer.objects.bulk_create(
+                [
+                    PuzzleWrongAnswer(
+                        puzzle_id=puzzle_id, guess=guess, partial=partial, count=count
+                    )
+                    for (
+                        puzzle_id,
+                        guess,
+                        partial,
+                        count,
+                    ) in (
+                        PuzzleStats.counted_submissions(
+                            public, puzzle_id__in=puzzle_ids, is_correct=False
+                        )
+                        .order_by()
+                        .values("puzzle_id", "submitted_answer", "is_message")
+                        .annotate(count=Count("id"))
+                        .values_list(
+                            "puzzle_id", "submitted_answer", "is_message", "count"
+                        )
+                    )
+                ],
+                update_conflicts=True,
+                unique_fields=("puzzle", "guess", "partial"),
+                update_fields=("count",),
+            )
+        PuzzleStats.recount(puzzle_ids)
+
+    @staticmethod
+    def recount(puzzle_ids=None):
+        """
+        Recomputes the solve, guess and team counters of these puzzles (or all
+        of them) with a single aggregate over the submissions.
+        """
+
+        scope = Q() if puzzle_ids is None else Q(puzzle_id__in=puzzle_ids)
+        counts = {
+            aggregate["puzzle_id"]: aggregate
+            for aggregate in (
+                PuzzleStats.counted_submissions(scope, team__is_hidden=False)
+                .order_by()
+                .values("puzzle_id")
+                .annotate(
+                    solves=Count("id", filter=Q(is_correct=True)),
+                    guesses=Count("id"),
+                    teams=Count("team_id", distinct=True),
+                )
+            )
+        }
+        rows = list(PuzzleStats.objects.filter(scope))
+        for stats in rows:
+            aggregate = counts.get(stats.puzzle_id, {})
+            stats.solves = aggregate.get("solves", 0)
+            stats.guesses = aggregate.get("guesses", 0)
+            stats.teams = aggregate.get("teams", 0)
+        PuzzleStats.objects.bulk_update(rows, ["solves", "guesses", "teams"])
+        counters.invalidate()
+
+    @staticmethod
+    def bump(puzzle_id, sign=1, **counts):
+        """Adds these counts to the row of a puzzle, creating it if needed."""
+
+        changes = {field: F(field) + sign * value for field, value in counts.items()}
+        rows = PuzzleStats.objects.filter(puzzle_id=puzzle_id)
+        if not rows.update(**changes):
+            PuzzleStats.objects.bulk_create(
+                [PuzzleStats(puzzle_id=puzzle_id)], ignore_conflicts=True
+            )
+            rows.update(**changes)
+
+    @staticmethod
+    def count(submission, sign=1):
+        """
+        Adds a submission to the counters and wrong answers of its puzzle, or
+        removes it with a sign of -1. Nothing is locked: every change is an
+        F() update in the database.
+        """
+
+        if (
+            submission.used_free_answer
+            or submission.submitted_datetime >= HUNT_END_TIME
+            or submission.team.is_hidden
+        ):
+            return
+        counts = {"guesses": 1}
+        if (
+            not PuzzleStats.counted_submissions(
+                puzzle_id=submission.puzzle_id, team_id=submission.team_id
+            )
+            .exclude(id=submission.id)
+            .exists()
+        ):
+            counts["teams"] = 1
+        if submission.is_correct:
+            counts["solves"] = 1
+        PuzzleStats.bump(submission.puzzle_id, sign, **counts)
+
+        if not submission.is_correct:
+            wrong_answer = {
+                "puzzle_id": submission.puzzle_id,
+                "guess": submission.submitted_answer,
+                "partial": submission.is_message,
+            }
+            PuzzleWrongAnswer.objects.bulk_create(
+                [PuzzleWrongAnswer(**wrong_answer)], ignore_conflicts=True
+            )
+            PuzzleWrongAnswer.objects.filter(**wrong_answer).update(
+                count=F("count") + sign
+            )
+        counters.invalidate()
+
+    @staticmethod
+    def count_unlocks(puzzle_ids):
+        PuzzleStats.objects.bulk_create(
+            [PuzzleStats(puzzle_id=puzzle_id) for puzzle_id in puzzle_ids],
+            ignore_conflicts=True,
+        )
+        PuzzleStats.objects.filter(puzzle_id__in=puzzle_ids).update(
+            unlocks=PuzzleStats.count_per_puzzle(
+                PuzzleUnlock.objects.filter(view_datetime__isnull=False)
+            )
+        )
+
+
+class PuzzleWrongAnswer(models.Model):
+    """
+    How many times public teams guessed a wrong answer to a puzzle during the
+    hunt, without free answers (see PuzzleStats).
+    """
+
+    puzzle = models.ForeignKey(
+        Puzzle, on_delete=models.CASCADE, verbose_name=_("puzzle")
+    )
+    guess = models.CharField(max_length=255, verbose_name=_("Guess"))
+    partial = models.BooleanField(default=False, verbose_name=_("Partial"))
+    count = models.IntegerField(default=0, verbose_name=_("Count"))
+
+    class Meta:
+        unique_together = ("puzzle", "guess", "partial")
+        verbose_name = _("puzzle wrong answer")
+        verbose_name_plural = _("puzzle wrong answers")
+
+    def __str__(self):
+        return f"{self.puzzle}: {self.guess}"
+
+
+@receiver(post_save, sender=AnswerSubmission)
+def count_puzzle_stats(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    if previous is not None:
+        PuzzleStats.count(previous, -1)
+    PuzzleStats.count(instance)
+
+
+@receiver(post_delete, sender=AnswerSubmission)
+def uncount_puzzle_stats(sender, instance, origin=None, **kwargs):
+    if deleted_with(origin, Puzzle):
+        return
+    PuzzleStats.count(instance, -1)
+
+
+@receiver(post_save, sender=Hint)
+@receiver(post_delete, sender=Hint)
+def count_puzzle_stats_hint(sender, instance, created=False, origin=None, **kwargs):
+    if deleted_with(origin, Puzzle) or instance.team.is_hidden:
+        return
+    if created:
+        PuzzleStats.bump(instance.puzzle_id, hints=1)
+    elif kwargs["signal"] is post_delete:
+        PuzzleStats.bump(instance.puzzle_id, -1, hints=1)
+
+
+@receiver(post_save, sender=PuzzleUnlock)
+@receiver(post_delete, sender=PuzzleUnlock)
+def count_puzzle_stats_unlocks(sender, instance, origin=None, **kwargs):
+    if deleted_with(origin, Puzzle):
+        return
+    PuzzleStats.count_unlocks([instance.puzzle_id])
+
+
+class SurveyAggregate(models.Model):
+    """
+    The total and count of one rating field over a puzzle's surveys, from
+    either hidden or public teams, so that averages are read per puzzle
+    instead of over every survey. Surveys are added to and removed from these
+    running sums by the receivers below; `manage.py rebuild_survey_aggregates`
+    recomputes them from scratch (which is also needed after hiding or
+    unhiding a team).
+    """
+
+    puzzle = models.ForeignKey(
+        Puzzle, on_delete=models.CASCADE, verbose_name=_("puzzle")
+    )
+    # the name of a RatingField of Survey
+    field = models.CharField(max_length=255, verbose_name=_("Field"))
+    is_hidden = models.BooleanField(verbose_name=_("Is hidden"))
+
+    total = models.IntegerField(default=0, verbose_name=_("Total"))
+    count = models.IntegerField(default=0, verbose_name=_("Count"))
+
+    puzzle_id: int
+
+    class Meta:
+        unique_together = ("puzzle", "field", "is_hidden")
+        verbose_name = _("survey aggregate")
+        verbose_name_plural = _("survey aggregates")
+
+    def __str__(self):
+        return f"{self.puzzle}: {self.field}"
+
+    @staticmethod
+    def refresh(puzzle_ids=None):
+        """
+        Recomputes the rows of these puzzles (or all of them) from the surveys,
+        in one transaction.
+        """
+
+        scope = Q() if puzzle_ids is None else Q(puzzle_id__in=puzzle_ids)
+        fields = [field.name for field in Survey.fields()]
+        with transaction.atomic():
+            rows = [
+                SurveyAggregate(
+                    puzzle_id=aggregate["puzzle_id"],
+                    field=field,
+                    is_hidden=aggregate["team__is_hidden"],
+                    total=aggregate[field],
+                    count=aggregate["count"],
+                )
+                for aggregate in (
+                    Survey.objects.filter(scope)
+                    .order_by()
+                    .values("puzzle_id", "team__is_hidden")
+                    .annotate(
+                        count=Count("id"), **{field: Sum(field) for field in fields}
+                    )
+                )
+                for field in fields
+            ]
+            SurveyAggregate.objects.filter(scope).delete()
+            # Rows that surveys submitted meanwhile created are overwritten.
+            SurveyAggregate.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=("puzzle", "field", "is_hidden"),
+                update_fields=("total", "count"),
+            )
+
+    @staticmethod
+    def add(survey, sign=1):
+        """
+        Adds a survey's ratings to the running sums of its puzzle, or removes
+        them with a sign of -1, with F() updates in the database.
+        """
+
+        key = {"puzzle_id": survey.puzzle_id, "is_hidden": survey.team.is_hidden}
+        fields = [field.name for field in Survey.fields()]
+        SurveyAggregate.objects.bulk_create(
+            [SurveyAggregate(field=field, **key) for field in fields],
+            ignore_conflicts=True,
+        )
+        for field in fields:
+            SurveyAggregate.objects.filter(field=field, **key).update(
+                total=F("total") + sign * getattr(survey, field),
+                count=F("count") + sign,
+            )
+
+    @staticmethod
+    def averages(puzzle_ids=None, include_hidden=True):
+        """
+        Returns a dict of puzzle id to the number of surveys and the average
+        of each rating field (in the order of Survey.fields), for the puzzles
+        (among these, if given) with any surveys.
+        """
+
+        scope = Q() if puzzle_ids is None else Q(puzzle_id__in=puzzle_ids)
+        if not include_hidden:
+            scope &= Q(is_hidden=False)
+        totals = collections.defaultdict(lambda: collections.defaultdict(int))
+        counts = collections.defaultdict(lambda: collections.defaultdict(int))
+        for puzzle_id, field, total, count in SurveyAggregate.objects.filter(
+            scope
+        ).values_list("puzzle_id", "field", "total", "count"):
+            totals[puzzle_id][field] += total
+            counts[puzzle_id][field] += count
+        fields = [field.name for field in Survey.fields()]
+        return {
+            puzzle_id: (
+                counts[puzzle_id][fields[0]],
+                [
+                    totals[puzzle_id][field] / counts[puzzle_id][field]
+                    for field in fields
+                ],
+            )
+            for puzzle_id in totals
+            if all(counts[puzzle_id][field] for field in fields)
+        }
+
+
+@receiver(post_save, sender=Survey)
+def count_survey_aggregate(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous", None)
+    if previous is not None:
+        SurveyAggregate.add(previous, -1)
+    SurveyAggregate.add(instance)
+
+
+@receiver(post_delete, sender=Survey)
+def uncount_survey_aggregate(sender, instance, origin=None, **kwargs):
+    if deleted_with(origin, Puzzle):
+        return
+    SurveyAggregate.add(instance, -1)
+
+
 class CannedHint(models.Model):
     """
     Canned hints used as suggestions for responses.
@@ -1338,3 +2685,15 @@ class CannedHint(models.Model):
 
     def get_keywords(self) -> list[str]:
         return self.keywords.split(",")
+
+
+@receiver(post_save, sender=Round)
+@receiver(post_delete, sender=Round)
+@receiver(post_save, sender=Puzzle)
+@receiver(post_delete, sender=Puzzle)
+@receiver(post_save, sender=PuzzleMessage)
+@receiver(post_delete, sender=PuzzleMessage)
+@receiver(post_save, sender=CannedHint)
+@receiver(post_delete, sender=CannedHint)
+def invalidate_catalog(sender, instance, **kwargs):
+    catalog.invalidate()
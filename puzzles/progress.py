@@ -0,0 +1,146 @@
+# The per-request caching in context.py means a team's solves, hints and
+# unlocks are only loaded once per request, but every request still loads them
+# again. This module keeps a compact snapshot of a team's progress in the
+# configured Django cache (locmem in development, Redis in production) so that
+# it can be shared across requests and workers.
+#
+# The snapshot is read from the denormalized TeamPuzzleProgress table, plus the
+# team's open hints and extra guess grants.
+#
+# Invalidation is by version: each team has a version key, snapshots are
+# stored under a key containing the version, and anything that changes a
+# team's progress bumps the version (see the receivers in models.py). Old
+# snapshots are never read again and just expire.
+#
+# GET requests don't write progress themselves either: unlocks and first-view
+# times they discover are queued on the request's Context and handed to a huey
+# task once the response is ready (see flush_writes). Pending writes are also
+# noted in the cache, so that concurrent requests from the same team coalesce
+# onto the first one instead of racing on the same rows.
+import dataclasses
+import datetime
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from puzzles import tasks
+
+# Snapshots are rebuilt whenever the team's version changes anyway; this just
+# bounds how long abandoned ones sit in the cache.
+SNAPSHOT_TIMEOUT = 60 * 60
+# How long a queued write keeps other requests from queueing the same one. If
+# the task never runs, the write is queued again after this.
+PENDING_TIMEOUT = 60
+
+
+@dataclasses.dataclass(frozen=True)
+class TeamProgress:
+    # puzzle id -> time of (earliest) correct submission
+    solves: dict[int, datetime.datetime]
+    # puzzle ids solved using a free answer
+    free_answers: frozenset[int]
+    # puzzle id -> number of incorrect, non-partial guesses
+    wrong_guesses: dict[int, int]
+    # puzzle id -> number of hints requested (in any status)
+    hints: dict[int, int]
+    # number of hints consuming a hint (see Hint.consumes_hint), overall and
+    # on puzzles in the intro round
+    hints_used: int
+    intro_hints_used: int
+    # puzzle ids of hints awaiting a response, oldest first
+    open_hints: tuple[int, ...]
+    # puzzle id -> (unlock time, first view time)
+    unlocks: dict[int, tuple[datetime.datetime, datetime.datetime | None]]
+    # puzzle id -> extra guesses granted
+    extra_guesses: dict[int, int]
+
+
+def version_key(team_id):
+    return f"progress-version:{team_id}"
+
+
+def get_version(team_id):
+    key = version_key(team_id)
+    version = cache.get(key)
+    if version is None:
+        # If the version was evicted, start from something that can't collide
+        # with a version whose snapshot might still be around.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(team_id):
+    try:
+        cache.incr(version_key(team_id))
+    except ValueError:
+        cache.set(version_key(team_id), time.time_ns(), timeout=None)
+
+
+def invalidate(team_id):
+    """
+    Marks a team's progress as changed. If we're inside a transaction, this
+    waits for it to commit, so that nobody can rebuild a snapshot from data
+    that's about to change under the new version.
+    """
+
+    transaction.on_commit(lambda: bump_version(team_id))
+
+
+def get_cached(name, team_id, build, timeout=SNAPSHOT_TIMEOUT):
+    """
+    Returns something derived from a team's progress, cached until the
+    progress changes, calling build() on a miss.
+    """
+
+    key = f"{name}:{team_id}:{get_version(team_id)}"
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout=timeout)
+    return value
+
+
+def get_progress(team_id, build):
+    """Returns the cached snapshot for a team, calling build() on a miss."""
+
+    return get_cached("progress", team_id, build)
+
+
+def pending_key(kind, team_id, puzzle_id):
+    return f"pending-{kind}:{team_id}:{puzzle_id}"
+
+
+def queue_unlock(context, puzzle_id, unlocked_at):
+    """
+    Queues writing an unlock of a puzzle for the context's team. If another
+    request already queued it, that one's time wins. Returns the unlock time
+    and whether this request queued it.
+    """
+
+    key = pending_key("unlock", context.team.id, puzzle_id)
+    if cache.add(key, unlocked_at, timeout=PENDING_TIMEOUT):
+        context.unlock_writes[puzzle_id] = unlocked_at
+        return (unlocked_at, True)
+    return (cache.get(key, unlocked_at), False)
+
+
+def queue_view(context, puzzle_id):
+    """Queues stamping the first view of a puzzle by the context's team."""
+
+    key = pending_key("view", context.team.id, puzzle_id)
+    if cache.add(key, context.now, timeout=PENDING_TIMEOUT):
+        context.view_writes.add(puzzle_id)
+
+
+def flush_writes(context):
+    """Hands the writes queued by a request to a background task."""
+
+    if context.unlock_writes or context.view_writes:
+        tasks.write_unlocks(
+            context.team.id,
+            context.unlock_writes,
+            sorted(context.view_writes),
+            context.now,
+        )
@@ -1,5 +1,5 @@
+import functools
 import inspect
-import types
 
 from django.utils.translation import gettext as _
 
@@ -7,50 +7,32 @@ from puzzles import hunt_config, models
 
 
 def get_shortcuts(context):
-    for action, callback in Shortcuts.__dict__.items():
-        if action.startswith("__"):
-            continue
-
-        fn = callback
-        if isinstance(callback, staticmethod):
-            fn = callback.__func__  # noqa: PLW2901
-
-        params = dict.fromkeys(inspect.getfullargspec(fn).args)
-        if "puzzle" in params and context.puzzle:
-            params["puzzle"] = context.puzzle
-        if "team" in params and context.team:
-            params["team"] = context.team
-        if "user" in params and not context.team:
-            params["user"] = context.request_user
-        if "now" in params:
-            params["now"] = context.now
-        if not all(params.values()):
-            continue
-        if hasattr(callback, "is_heading"):
-            yield {"name": callback(**params)}
+    values = {
+        "puzzle": context.puzzle,
+        "team": context.team,
+        "user": None if context.team else context.request_user,
+        "now": context.now,
+    }
+    available = frozenset(param for (param, value) in values.items() if value)
+    for shortcut in available_shortcuts(available):
+        if shortcut.is_heading:
+            params = {param: values[param] for param in shortcut.params}
+            yield {"name": shortcut.fn(**params)}
         else:
-            yield {
-                "action": action,
-                "name": callback.__doc__,
-                "info": getattr(callback, "info", ""),
-                "danger": hasattr(callback, "is_danger"),
-            }
+            yield shortcut.entry
 
 
 def dispatch_shortcut(request):
     action = request.POST.get("action")
     assert action, _("Missing action")
-    callback = getattr(Shortcuts, action, None)
+    shortcut = SHORTCUTS_BY_ACTION.get(action)
+    assert shortcut, _("Invalid action %r") % action
 
-    if isinstance(callback, staticmethod):
-        callback = callback.__func__
-
-    assert isinstance(callback, types.FunctionType), _("Invalid action %r") % action
-    params = dict.fromkeys(inspect.getfullargspec(callback).args)
+    params = dict.fromkeys(shortcut.params)
     if "puzzle" in params:
         slug = request.POST.get("puzzle")
         assert slug, _("Missing puzzle")
-        puzzle = models.Puzzle.objects.filter(slug=slug).first()
+        puzzle = request.context.catalog.by_slug.get(slug)
         assert puzzle, _("Invalid puzzle %r") % slug
         params["puzzle"] = puzzle
     if "team" in params:
@@ -61,7 +43,7 @@ def dispatch_shortcut(request):
         params["user"] = request.user
     if "now" in params:
         params["now"] = request.context.now
-    callback(**params)
+    shortcut.fn(**params)
 
 
 def heading(f):
@@ -304,3 +286,40 @@ class Shortcuts:
         team.answersubmission_set.filter(puzzle=puzzle).delete()
 
     delete_guesses.__doc__ = _("Guesses")
+
+
+class Shortcut:
+    """One entry of the Shortcuts menu, introspected once at import."""
+
+    def __init__(self, action, callback):
+        self.action = action
+        self.fn = callback
+        if isinstance(callback, staticmethod):
+            self.fn = callback.__func__
+        # the subset of puzzle, team, user and now that the action needs
+        self.params = tuple(inspect.getfullargspec(self.fn).args)
+        self.is_heading = hasattr(callback, "is_heading")
+        # what get_shortcuts yields for non-headings
+        self.entry = {
+            "action": action,
+            "name": callback.__doc__,
+            "info": getattr(callback, "info", ""),
+            "danger": hasattr(callback, "is_danger"),
+        }
+
+
+SHORTCUTS = tuple(
+    Shortcut(action, callback)
+    for action, callback in Shortcuts.__dict__.items()
+    if not action.startswith("__")
+)
+SHORTCUTS_BY_ACTION = {shortcut.action: shortcut for shortcut in SHORTCUTS}
+
+
+@functools.cache
+def available_shortcuts(available):
+    """The shortcuts whose parameters are all in the frozenset available."""
+
+    return tuple(
+        shortcut for shortcut in SHORTCUTS if available.issuperset(shortcut.params)
+    )
@@ -0,0 +1,257 @@
+// Renders the bigboard from the columnar payload of bigboard.json (see
+// Board.as_json), then keeps it up to date by polling it for changes. Only
+// the team rows near the viewport exist in the DOM at any time, so the page
+// stays fast no matter how many teams there are.
+(function () {
+    const OVERSCAN = 10;
+    const POLL_INTERVAL = 5000;
+
+    function cell(text, className) {
+        const div = document.createElement('div');
+        if (className) div.className = className;
+        if (text !== undefined && text !== null) div.append(text);
+        return div;
+    }
+
+    function small(text) {
+        const element = document.createElement('small');
+        element.textContent = text;
+        return element;
+    }
+
+    function link(text, href) {
+        const a = document.createElement('a');
+        a.href = href;
+        a.textContent = text;
+        a.title = text;
+        return a;
+    }
+
+    function row(cells, className) {
+        const div = document.createElement('div');
+        div.className = className ? 'row ' + className : 'row';
+        div.append(...cells);
+        return div;
+    }
+
+    function decode(base64) {
+        const binary = atob(base64);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+        return bytes;
+    }
+
+    const TOTALS = [
+        [gettext('Solves'), 'solves', 'S'],
+        [gettext('Guesses'), 'guesses', 'W'],
+        [gettext('Unlocks'), 'unlocks', 'U'],
+        [gettext('Hints'), 'hints', 'H'],
+        [gettext('Free answers'), 'free_solves', 'F'],
+    ];
+    const GRIDS = ['solve_position', 'wrong_guesses', 'hints'];
+
+    function render(container, data) {
+        const puzzles = data.puzzles;
+        const teams = data.teams;
+        const width = puzzles.name.length;
+        data.status = decode(data.status);
+        const puzzleClass = (p) => (puzzles.is_meta[p] ? 'end' : '');
+        let teamIndex = new Map(teams.id.map((id, t) => [id, t]));
+        const puzzleIndex = new Map(puzzles.id.map((id, p) => [id, p]));
+
+        const head = document.createElement('div');
+        head.className = 'head';
+        function renderHead() {
+            head.replaceChildren(row([
+                cell(gettext('Team'), 'team'),
+                cell('#', 'end'),
+                cell(gettext('Solves')),
+                cell(gettext('Metas')),
+                cell(gettext('Hints')),
+                cell(gettext('Last solve'), 'wide end'),
+                ...puzzles.name.map((name, p) => {
+                    const div = cell(link(puzzles.short_name[p], puzzles.url[p]), puzzleClass(p));
+                    div.title = name;
+                    return div;
+                }),
+            ]), ...TOTALS.map(([label, key, className]) => row([
+                cell(label, 'team'),
+                cell('', 'end'),
+                cell(''),
+                cell(''),
+                cell(''),
+                cell('', 'wide end'),
+                ...puzzles[key].map((count, p) => cell(count, className + ' ' + puzzleClass(p))),
+            ])));
+        }
+
+        function teamRow(t) {
+            const cells = [
+                cell(link(teams.name[t], teams.url[t]), 'team'),
+                cell(t + 1, 'end'),
+            ];
+            const solves = cell(teams.solves[t] || '');
+            if (teams.wrong_guesses[t]) solves.append(' −' + teams.wrong_guesses[t]);
+            if (teams.free_solves[t]) solves.append(small('+' + teams.free_solves[t]));
+            if (teams.finished[t]) cells[1].append(small(teams.finished[t]));
+            cells.push(
+                solves,
+                cell(teams.meta_solves[t] || ''),
+                cell(teams.hints[t] || teams.hints_total[t]
+                    ? teams.hints[t] + ' / ' + teams.hints_total[t] : ''),
+                cell(new Date(teams.last_solve_time[t] * 1000).toLocaleString(), 'wide end'),
+            );
+            for (let p = 0; p < width; p++) {
+                const i = t * width + p;
+                const div = cell(null, data.classes[data.status[i]] + ' ' + puzzleClass(p));
+                if (data.solve_position[i]) div.append(data.solve_position[i]);
+                if (data.wrong_guesses[i]) div.append(' −' + data.wrong_guesses[i]);
+                if (data.hints[i]) div.append(small('+' + data.hints[i]));
+                cells.push(div);
+            }
+            return row(cells);
+        }
+
+        const body = document.createElement('div');
+        body.className = 'body';
+        renderHead();
+        container.replaceChildren(head, body);
+
+        // Measure a row to size the scrollable area.
+        const probe = teamRow(0);
+        body.append(probe);
+        const rowHeight = probe.offsetHeight || 40;
+        probe.remove();
+        body.style.height = rowHeight * teams.name.length + 'px';
+
+        const rendered = new Map();
+        function update() {
+            const top = -body.getBoundingClientRect().top;
+            const first = Math.max(0, Math.floor(top / rowHeight) - OVERSCAN);
+            const last = Math.min(
+                teams.name.length,
+                Math.ceil((top + window.innerHeight) / rowHeight) + OVERSCAN,
+            );
+            for (const [t, element] of rendered) {
+                if (t < first || t >= last) {
+                    element.remove();
+                    rendered.delete(t);
+                }
+            }
+            for (let t = first; t < last; t++) {
+                if (rendered.has(t)) continue;
+                const element = teamRow(t);
+                element.style.top = t * rowHeight + 'px';
+                body.append(element);
+                rendered.set(t, element);
+            }
+        }
+
+        // Applies changes from polling (see bigboard.board_changes).
+        // Returns false if they can't be applied to the teams we have, e.g.
+        // because a team moved into them from further down.
+        function apply(changes) {
+            const order = changes.order;
+            if (order && (order.length !== teams.id.length
+                          || !order.every((id) => teamIndex.has(id)))) {
+                return false;
+            }
+            const status = decode(changes.status);
+            changes.teams.id.forEach((id, k) => {
+                const t = teamIndex.get(id);
+                if (t === undefined) return;
+                for (const key in teams) teams[key][t] = changes.teams[key][k];
+                for (let p = 0; p < width; p++) {
+                    data.status[t * width + p] = status[k * width + p];
+                    for (const key of GRIDS) {
+                        data[key][t * width + p] = changes[key][k * width + p];
+                    }
+                }
+            });
+            changes.puzzles.id.forEach((id, k) => {
+                const p = puzzleIndex.get(id);
+                if (p === undefined) return;
+                for (const [, key] of TOTALS) puzzles[key][p] = changes.puzzles[key][k];
+            });
+            if (order) {
+                const moved = order.map((id) => teamIndex.get(id));
+                for (const key in teams) {
+                    const column = teams[key];
+                    teams[key] = moved.map((t) => column[t]);
+                }
+                for (const key of ['status', ...GRIDS]) {
+                    const grid = data[key];
+                    data[key] = key === 'status' ? new Uint8Array(grid.length) : [];
+                    moved.forEach((t, u) => {
+                        for (let p = 0; p < width; p++) {
+                            data[key][u * width + p] = grid[t * width + p];
+                        }
+                    });
+                }
+                teamIndex = new Map(teams.id.map((id, t) => [id, t]));
+            }
+            renderHead();
+            for (const element of rendered.values()) element.remove();
+            rendered.clear();
+            update();
+            return true;
+        }
+
+        update();
+        return {update, apply};
+    }
+
+    const container = document.getElementById('bigboard');
+    const limit = /^\?\d+$/.test(window.location.search) ? window.location.search.slice(1) : '';
+    let view = null;
+    let timer = null;
+
+    function load() {
+        fetch(container.dataset.url + window.location.search)
+            .then((response) => response.json())
+            .then((data) => {
+                if (data.teams.name.length) {
+                    view = render(container, data);
+                } else {
+                    view = null;
+                    container.textContent = gettext('No teams yet.');
+                }
+                follow(data.cursor);
+            });
+    }
+
+    // Asks for the changes since the last cursor every so often, and starts
+    // over if they can't be applied.
+    function follow(cursor) {
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            let url = container.dataset.url + '?since=' + encodeURIComponent(cursor);
+            if (limit) url += '&limit=' + limit;
+            fetch(url)
+                .then((response) => response.json())
+                .then((data) => {
+                    if (!data.changes) {
+                        follow(data.cursor);
+                    } else if (view && view.apply(data.changes)) {
+                        follow(data.cursor);
+                    } else {
+                        load();
+                    }
+                })
+                .catch(() => follow(cursor));
+        }, POLL_INTERVAL);
+    }
+
+    let scheduled = false;
+    function schedule() {
+        if (scheduled) return;
+        scheduled = true;
+        requestAnimationFrame(() => {
+            scheduled = false;
+            if (view) view.update();
+        });
+    }
+    window.addEventListener('scroll', schedule, {passive: true});
+    window.addEventListener('resize', schedule);
+    load();
+})();
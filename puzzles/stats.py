@@ -0,0 +1,416 @@
+# The payloads of the post-hunt stats pages (hunt stats, puzzle stats,
+# finishers and wrap-up). They refer to teams and puzzles by id or name and to
+# times as POSIX timestamps, so that they can be cached and frozen as JSON
+# (see frozen.py).
+#
+# For the hunt stats, rather than loading every hint and submission, the
+# database groups them by puzzle and team, and the classifications (forward
+# solves by number of hints used, backsolves, teams that guessed but never
+# solved) are made in one pass over those groups.
+import datetime
+from collections import Counter
+from datetime import UTC
+
+from django.conf import settings
+from django.db.models import Count, Exists, Max, Min, OuterRef, Q, Sum
+from django.utils import timezone
+
+from puzzles.hunt_config import HUNT_CLOSE_TIME, HUNT_END_TIME, META_META_SLUG
+from puzzles.models import (
+    AnswerSubmission,
+    Hint,
+    PuzzleStats,
+    PuzzleUnlock,
+    PuzzleWrongAnswer,
+    Team,
+    TeamMember,
+    TeamPuzzleProgress,
+    WrapupRollup,
+)
+
+# Solves this long before the round's meta (or earlier) are forward solves.
+BACKSOLVE_WINDOW = datetime.timedelta(minutes=5)
+
+
+def timestamp(time):
+    return None if time is None else time.timestamp()
+
+
+def from_timestamp(value):
+    return None if value is None else datetime.datetime.fromtimestamp(value, UTC)
+
+
+# indices into the numbers of each puzzle, as shown by hunt_stats.html
+SOLVES = 0
+GUESSES = 1
+HINTS = 2
+FORWARD_SOLVES = 3
+FORWARD_SOLVES_BY_HINTS = 4  # then 5 and 6, for no hints, one hint and more
+BACKSOLVES = 7
+NO_SOLVE = 8
+NUMBERS = 9
+
+
+def hunt_stats(puzzles):
+    """
+    The stats of the hunt on these puzzles: overall totals, and for each
+    puzzle, the list of numbers shown by hunt_stats.html.
+    """
+
+    puzzles = list(puzzles)
+    numbers = {puzzle.id: [0] * NUMBERS for puzzle in puzzles}
+
+    hints_used = {}
+    total_hints = 0
+    for puzzle_id, team_id, hints, consumed in (
+        Hint.objects.filter(team__is_hidden=False)
+        .order_by()
+        .values("puzzle_id", "team_id")
+        .annotate(
+            hints=Count("id"),
+            consumed=Count(
+                "id",
+                filter=Q(is_followup=False)
+                & ~Q(status__in=(Hint.REFUNDED, Hint.OBSOLETE)),
+            ),
+        )
+        .values_list("puzzle_id", "team_id", "hints", "consumed")
+    ):
+        total_hints += hints
+        if puzzle_id in numbers:
+            numbers[puzzle_id][HINTS] += hints
+        hints_used[puzzle_id, team_id] = consumed
+
+    groups = list(
+        AnswerSubmission.objects.filter(
+            used_free_answer=False,
+            team__is_hidden=False,
+            submitted_datetime__lt=HUNT_END_TIME,
+        )
+        .order_by()
+        .values("puzzle_id", "team_id")
+        .annotate(
+            guesses=Count("id"),
+            solves=Count("id", filter=Q(is_correct=True)),
+            solved_at=Min("submitted_datetime", filter=Q(is_correct=True)),
+        )
+        .values_list("puzzle_id", "team_id", "guesses", "solves", "solved_at")
+    )
+    solve_times = {
+        (puzzle_id, team_id): solved_at
+        for (puzzle_id, team_id, _, _, solved_at) in groups
+        if solved_at is not None
+    }
+    # metas are always forward solves
+    metas = {
+        puzzle.id: puzzle.round.meta_id for puzzle in puzzles if not puzzle.is_meta
+    }
+
+    total_guesses = 0
+    total_solves = 0
+    for puzzle_id, team_id, guesses, solves, solved_at in groups:
+        total_guesses += guesses
+        total_solves += solves
+        if puzzle_id not in numbers:
+            continue
+        row = numbers[puzzle_id]
+        row[GUESSES] += guesses
+        row[SOLVES] += solves
+        if solved_at is None:
+            row[NO_SOLVE] += 1
+            continue
+        if puzzle_id not in metas or solved_at <= (
+            solve_times.get((metas[puzzle_id], team_id), HUNT_CLOSE_TIME)
+            - BACKSOLVE_WINDOW
+        ):
+            row[FORWARD_SOLVES] += 1
+            hints = min(hints_used.get((puzzle_id, team_id), 0), 2)
+            row[FORWARD_SOLVES_BY_HINTS + hints] += 1
+        else:
+            row[BACKSOLVES] += 1
+
+    return {
+        "total_teams": Team.objects.exclude(is_hidden=True).count(),
+        "total_participants": TeamMember.objects.exclude(team__is_hidden=True).count(),
+        "total_hints": total_hints,
+        "total_guesses": total_guesses,
+        "total_solves": total_solves,
+        "total_metas": sum(
+            numbers[puzzle.id][SOLVES] for puzzle in puzzles if puzzle.is_meta
+        ),
+        "numbers": list(numbers.items()),
+    }
+
+
+def puzzle_stats(puzzle, team=None):
+    """
+    The stats of a puzzle among public teams (and this hidden team, if given): the
+    solvers in order, the total solves and guesses, and the wrong answers
+    tried. Reads its PuzzleStats, wrong answers and the progress of its
+    solvers, plus the team's own submissions.
+    """
+
+    teams = Q(team__is_hidden=False)
+    guesses = (
+        PuzzleStats.objects.filter(puzzle_id=puzzle.id)
+        .values_list("guesses", flat=True)
+        .first()
+    ) or 0
+    wrong_answers = list(
+        PuzzleWrongAnswer.objects.filter(puzzle_id=puzzle.id, count__gt=0).values_list(
+            "guess", "count", "partial"
+        )
+    )
+    if team:
+        teams |= Q(team_id=team.id)
+        submissions = PuzzleStats.counted_submissions(
+            puzzle_id=puzzle.id, team_id=team.id
+        )
+        guesses += submissions.count()
+        wrong_answers += (
+            submissions.filter(is_correct=False)
+            .order_by()
+            .values("submitted_answer", "is_message")
+            .annotate(count=Count("id"))
+            .values_list("submitted_answer", "count", "is_message")
+        )
+
+    partial_guesses = Counter()
+    incorrect_guesses = Counter()
+    for guess, count, partial in wrong_answers:
+        (partial_guesses if partial else incorrect_guesses)[guess] += count
+    all_not_correct_guesses = partial_guesses + incorrect_guesses
+
+    answers_tried = []
+    for guess, count in partial_guesses.most_common():
+        answers_tried.append({"guess": guess, "count": count, "partial": True})
+
+    for guess, count in incorrect_guesses.most_common():
+        answers_tried.append({"guess": guess, "count": count, "partial": False})
+
+    wrong = "(?)"
+    if all_not_correct_guesses:
+        ((wrong, _),) = all_not_correct_guesses.most_common(1)
+
+    progress = list(
+        TeamPuzzleProgress.objects.filter(
+            teams,
+            puzzle_id=puzzle.id,
+            solved_at__lt=HUNT_END_TIME,
+            used_free_answer=False,
+        ).values_list(
+            "team_id",
+            "team__team_name",
+            "unlocked_at",
+            "viewed_at",
+            "solved_at",
+            "wrong_guesses",
+            "partial_guesses",
+        )
+    )
+    # when each solver last guessed the most common wrong answer
+    wrong_times = dict(
+        PuzzleStats.counted_submissions(
+            puzzle_id=puzzle.id,
+            team_id__in=[team_id for (team_id, *_) in progress],
+            submitted_answer=wrong,
+            is_correct=False,
+        )
+        .order_by()
+        .values("team_id")
+        .annotate(last_guess=Max("submitted_datetime"))
+        .values_list("team_id", "last_guess")
+    )
+    solvers = []
+    for (
+        team_id,
+        team_name,
+        unlocked_at,
+        viewed_at,
+        solved_at,
+        wrong_guesses,
+        partial_guesses,
+    ) in progress:
+        # Only the teams that viewed the puzzle have an unlock time.
+        unlock_time = timestamp(unlocked_at) if viewed_at is not None else None
+        solve_time = timestamp(solved_at)
+        solvers.append(
+            {
+                "team_id": team_id,
+                "team_name": team_name,
+                "unlock_time": unlock_time,
+                "solve_time": solve_time,
+                "open_duration": (
+                    solve_time - unlock_time if unlock_time is not None else None
+                ),
+                "wrong_duration": (
+                    solve_time - timestamp(wrong_times[team_id])
+                    if team_id in wrong_times
+                    else None
+                ),
+                "total_guesses": wrong_guesses + partial_guesses,
+            }
+        )
+    solvers.sort(key=lambda d: d["solve_time"])
+
+    return {
+        "solvers": solvers,
+        "solves": len(solvers),
+        "guesses": guesses,
+        "answers_tried": answers_tried,
+        "wrong": wrong,
+    }
+
+
+def finishers():
+    """The teams that solved the metameta during the hunt, in order."""
+
+    solves = dict(
+        AnswerSubmission.objects.filter(
+            puzzle__slug=META_META_SLUG,
+            team__is_hidden=False,
+            is_correct=True,
+            submitted_datetime__lt=HUNT_END_TIME,
+        )
+        .order_by("submitted_datetime")
+        .values_list("team_id", "submitted_datetime")
+    )
+    unlocks = {
+        team_id: (team_name, unlock_time)
+        for (team_id, team_name, unlock_time) in PuzzleUnlock.objects.filter(
+            team__id__in=solves, puzzle__slug=META_META_SLUG
+        ).values_list("team_id", "team__team_name", "unlock_datetime")
+    }
+
+    return [
+        {
+            "team_id": team_id,
+            "team_name": unlocks[team_id][0],
+            "unlock_time": timestamp(unlocks[team_id][1]),
+            "solve_time": timestamp(solve_time),
+            "total_time": (solve_time - unlocks[team_id][1]).total_seconds(),
+        }
+        for (team_id, solve_time) in solves.items()
+        if team_id in unlocks
+    ]
+
+
+# These don't get a fastest solve on the wrap-up, nor a point on its
+# leaderboard.
+WRAPUP_SKIPPED_SOLVES = ("ripple-effect", "melody-medley", "mark-of-the-demon")
+
+
+def wrapup(puzzles):
+    """
+    The charts of the wrap-up page, from the per-puzzle, per-hour rollups
+    (see WrapupRollup), plus the solves of the first teams to finish.
+    """
+
+    puzzles = sorted(puzzles, key=lambda puzzle: puzzle.order)
+
+    totals = {
+        row["puzzle_id"]: row
+        for row in (
+            WrapupRollup.objects.order_by()
+            .values("puzzle_id")
+            .annotate(
+                correct=Sum("correct_guesses"),
+                partial=Sum("partial_guesses"),
+                incorrect=Sum("wrong_guesses"),
+                hints=Sum("hints"),
+            )
+        )
+    }
+    empty = {"correct": 0, "partial": 0, "incorrect": 0, "hints": 0}
+
+    fastest = {}
+    for puzzle_id, duration, team_name in (
+        WrapupRollup.objects.filter(fastest_solve__isnull=False)
+        .exclude(puzzle__slug__in=WRAPUP_SKIPPED_SOLVES)
+        .order_by("puzzle_id", "fastest_solve", "hour")
+        .values_list("puzzle_id", "fastest_solve", "fastest_team__team_name")
+    ):
+        fastest.setdefault(puzzle_id, (team_name, duration))
+    fastest_solves_data = {
+        "labels": [p.name for p in puzzles if p.id in fastest and p.name],
+        "tooltips": [fastest[p.id][0] for p in puzzles if p.id in fastest],
+        "data": [fastest[p.id][1] / 60 for p in puzzles if p.id in fastest],
+    }
+
+    hint_latencies_per_hour = []
+    hints_per_hour = []
+    for hour, hints, latency in (
+        WrapupRollup.objects.filter(hints__gt=0)
+        .order_by("hour")
+        .values("hour")
+        .annotate(hints=Sum("hints"), latency=Sum("hint_latency"))
+        .values_list("hour", "hints", "latency")
+    ):
+        x = timezone.localtime(hour, settings.PY_TIME_ZONE).isoformat()
+        hint_latencies_per_hour.append({"x": x, "y": round(latency / hints / 60, 2)})
+        hints_per_hour.append({"x": x, "y": hints})
+
+    # Only the first few finishers are charted, so their solves are read as
+    # they are.
+    solves = AnswerSubmission.objects.filter(
+        team__is_hidden=False,
+        is_correct=True,
+        used_free_answer=False,
+        submitted_datetime__lt=HUNT_END_TIME,
+    )
+    team_leaderboard = {
+        team_name: []
+        for team_name in (
+            solves.filter(puzzle__slug=META_META_SLUG)
+            .order_by("submitted_datetime")
+            .values_list("team__team_name", flat=True)[:10]
+        )
+    }
+    for team_name, is_meta, puzzle_name, submitted_datetime in (
+        solves.filter(team__team_name__in=team_leaderboard)
+        .exclude(puzzle__slug__in=WRAPUP_SKIPPED_SOLVES)
+        .filter(
+            Exists(
+                PuzzleUnlock.objects.filter(
+                    team_id=OuterRef("team_id"),
+                    puzzle_id=OuterRef("puzzle_id"),
+                    view_datetime__isnull=False,
+                )
+            )
+        )
+        .order_by("submitted_datetime")
+        .values_list(
+            "team__team_name", "puzzle__is_meta", "puzzle__name", "submitted_datetime"
+        )
+    ):
+        team_leaderboard[team_name].append(
+            {
+                "solve_count": len(team_leaderboard[team_name]),
+                "is_meta": is_meta,
+                "tooltip_label": puzzle_name,
+                "datetime": (
+                    timezone.localtime(
+                        submitted_datetime, settings.PY_TIME_ZONE
+                    ).isoformat()
+                ),
+            }
+        )
+
+    return {
+        "fastest_solves": fastest_solves_data,
+        "hint_latencies_per_hour": hint_latencies_per_hour,
+        "hints_per_hour": hints_per_hour,
+        "hints_per_puzzle": {
+            "labels": [p.name for p in puzzles],
+            "data": [totals.get(p.id, empty)["hints"] for p in puzzles],
+        },
+        "team_leaderboard": [
+            {"team_name": k, "data": v} for k, v in team_leaderboard.items()
+        ],
+        "puzzle_guesses": {
+            "correct": [totals.get(p.id, empty)["correct"] for p in puzzles],
+            "partial": [totals.get(p.id, empty)["partial"] for p in puzzles],
+            "incorrect": [totals.get(p.id, empty)["incorrect"] for p in puzzles],
+            "puzzles": [p.name for p in puzzles],
+        },
+    }
@@ -1,3 +1,4 @@
+import functools
 import logging
 import time
 import traceback
@@ -5,15 +6,21 @@ from collections import defaultdict
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
 from django.core.mail import get_connection
 from django.core.mail.message import EmailMultiAlternatives
+from django.db import transaction
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.translation import gettext as _
-from huey.contrib.djhuey import db_task, task
+from huey import crontab
+from huey.contrib.djhuey import db_periodic_task, db_task, task
 
+from puzzles import catalog
 from puzzles.discord import DiscordClient, JsonDict
 from puzzles.hunt_config import (
     CONTACT_EMAIL,
+    HUNT_END_TIME,
     HUNT_ORGANIZERS,
     HUNT_TITLE,
     MESSAGING_SENDER_EMAIL,
@@ -243,3 +250,183 @@ def clear_hint(hint_id: int):
                 _("Discord API failure: modify\n{}").format(traceback.format_exc())
             )
             return
+
+
+# When the time unlock materializer last ran, so that it only has to look at
+# teams with a time unlock since then.
+TIME_UNLOCKS_LAST_RUN_KEY = "time-unlocks-last-run"
+
+
+@db_periodic_task(crontab(minute="*"))
+def materialize_time_unlocks():
+    """
+    Writes out time unlocks as they pass, and warms the progress snapshots of
+    the teams that got them, so that the first page view after an unlock (or
+    the hunt start) doesn't have to do the write. Hint and free answer
+    releases are pure arithmetic on the team's start offset and never touch
+    the database, so there's nothing to do for them.
+    """
+
+    # progress and models both import this module
+    from puzzles import progress  # noqa: PLC0415
+    from puzzles.models import Team  # noqa: PLC0415
+
+    now = timezone.now()
+    since = cache.get(TIME_UNLOCKS_LAST_RUN_KEY)
+    team_ids = Team.materialize_time_unlocks(now, since)
+    cache.set(TIME_UNLOCKS_LAST_RUN_KEY, now, timeout=None)
+    for team_id in team_ids:
+        progress.get_progress(team_id, functools.partial(Team.load_progress, team_id))
+    if team_ids:
+        logger.info(_("Materialized time unlocks for {} teams").format(len(team_ids)))
+
+
+@db_task()
+def write_unlocks(team_id, unlocks, viewed_puzzle_ids, view_datetime):
+    """
+    Writes the unlocks (a dict of puzzle id to unlock time) and first-view
+    times queued by a request. Both writes are idempotent, so it doesn't
+    matter if a time unlock was materialized or another request got there
+    first; if either wrote a later unlock time, the earlier one wins.
+    """
+
+    # progress and models both import this module
+    from puzzles import progress  # noqa: PLC0415
+    from puzzles.models import (  # noqa: PLC0415
+        PuzzleStats,
+        PuzzleUnlock,
+        TeamPuzzleProgress,
+        WrapupRollup,
+    )
+
+    # Everything commits together, and the pending writes are only forgotten
+    # once the new snapshot version is visible.
+    with transaction.atomic():
+        PuzzleUnlock.objects.bulk_create(
+            [
+                PuzzleUnlock(
+                    team_id=team_id, puzzle_id=puzzle_id, unlock_datetime=unlocked_at
+                )
+                for puzzle_id, unlocked_at in unlocks.items()
+            ],
+            ignore_conflicts=True,
+        )
+        # The time unlock materializer may have written one of these first,
+        # with the time trigger's later time.
+        lowered_puzzle_ids = [
+            puzzle_id
+            for puzzle_id, unlocked_at in unlocks.items()
+            if PuzzleUnlock.objects.filter(
+                team_id=team_id,
+                puzzle_id=puzzle_id,
+                unlock_datetime__gt=unlocked_at,
+            ).update(unlock_datetime=unlocked_at)
+        ]
+        PuzzleUnlock.objects.filter(
+            team_id=team_id, puzzle_id__in=viewed_puzzle_ids, view_datetime=None
+        ).update(view_datetime=view_datetime)
+        # Neither bulk_create nor update sends signals.
+        TeamPuzzleProgress.record_unlocks(
+            (team_id, puzzle_id) for puzzle_id in [*unlocks, *viewed_puzzle_ids]
+        )
+        if lowered_puzzle_ids:
+            TeamPuzzleProgress.refresh([team_id], lowered_puzzle_ids)
+        WrapupRollup.count_views(team_id, viewed_puzzle_ids)
+        PuzzleStats.count_unlocks(viewed_puzzle_ids)
+        progress.invalidate(team_id)
+        pending_keys = [
+            progress.pending_key("unlock", team_id, puzzle_id) for puzzle_id in unlocks
+        ] + [
+            progress.pending_key("view", team_id, puzzle_id)
+            for puzzle_id in viewed_puzzle_ids
+        ]
+        transaction.on_commit(lambda: cache.delete_many(pending_keys))
+
+
+RANK_STANDINGS_PENDING_KEY = "rank-standings-pending"
+
+
+def schedule_rank_standings():
+    """
+    Queues recomputing the leaderboard ranks once the current transaction
+    commits. While a run is queued, further calls don't queue another one.
+    """
+
+    def schedule():
+        if cache.add(RANK_STANDINGS_PENDING_KEY, True, timeout=60):
+            rank_standings()
+
+    transaction.on_commit(schedule)
+
+
+@db_task()
+def rank_standings():
+    # models imports this module, and so does leaderboard through it
+    from puzzles import leaderboard  # noqa: PLC0415
+    from puzzles.models import TeamStanding  # noqa: PLC0415
+
+    # Anything that changes after this point queues another run.
+    cache.delete(RANK_STANDINGS_PENDING_KEY)
+    TeamStanding.rank_all()
+    # Names and solve counts can change without changing any ranks, so the
+    # cached pages are always thrown out.
+    leaderboard.bump_version()
+
+
+def refresh_frozen_pending_key(name):
+    return f"refresh-frozen-pending:{name}"
+
+
+def schedule_refresh_frozen(name):
+    """Queues rebuilding a frozen payload, unless that's already queued."""
+
+    if cache.add(refresh_frozen_pending_key(name), True, timeout=60):
+        refresh_frozen(name)
+
+
+def schedule_refresh_frozen_on_commit(names=None):
+    """
+    Queues rebuilding these frozen payloads (or all of them) once the current
+    transaction commits.
+    """
+
+    # frozen imports this module
+    from puzzles import frozen  # noqa: PLC0415
+
+    def schedule():
+        puzzles = catalog.get_catalog().puzzles
+        for name in frozen.names(puzzles) if names is None else names:
+            schedule_refresh_frozen(name)
+
+    transaction.on_commit(schedule)
+
+
+@db_task()
+def refresh_frozen(name):
+    # frozen imports this module
+    from puzzles import frozen  # noqa: PLC0415
+
+    # Anything that changes after this point queues another run.
+    cache.delete(refresh_frozen_pending_key(name))
+    frozen.store(
+        name, frozen.build(name, catalog.get_catalog().puzzles), timezone.now()
+    )
+
+
+# Set once everything is frozen, so that the periodic task stops checking.
+FROZEN_KEY = "payloads-frozen"
+
+
+@db_periodic_task(crontab(minute="*"))
+def freeze_payloads():
+    """Freezes the post-hunt stats pages (see frozen.py) when the hunt ends."""
+
+    # frozen imports this module
+    from puzzles import frozen  # noqa: PLC0415
+
+    if timezone.now() < HUNT_END_TIME or cache.get(FROZEN_KEY):
+        return
+    names = frozen.freeze(catalog.get_catalog().puzzles, only_missing=True)
+    cache.set(FROZEN_KEY, True, timeout=None)
+    if names:
+        logger.info(_("Froze {} stats payloads").format(len(names)))
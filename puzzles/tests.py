@@ -1,12 +1,37 @@
+import base64
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
 from django import urls
 from django.contrib.auth.models import User
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
 
-from .models import AnswerSubmission, Puzzle, Round, Team
+from . import catalog, counters, frozen, leaderboard, progress, shortcuts, stats, tasks
+from .hunt_config import HUNT_START_TIME, MILESTONES
+from .models import (
+    AnswerSubmission,
+    FrozenPayload,
+    Hint,
+    Puzzle,
+    PuzzleMessage,
+    PuzzleStats,
+    PuzzleUnlock,
+    PuzzleWrongAnswer,
+    Round,
+    Survey,
+    SurveyAggregate,
+    Team,
+    TeamPuzzleProgress,
+    TeamStanding,
+    WrapupRollup,
+)
+from .unlocks import get_engine as get_unlock_engine
 
 # wow, we log a lot of things as INFO
 logging.disable(logging.INFO)
@@ -20,8 +45,10 @@ def create_user(name):
     )
 
 
-class Misc(TestCase):
+class HuntTestCase(TestCase):
     def setUp(self):
+        # Progress snapshots outlive the test transactions, and ids get reused.
+        cache.clear()
         self.user_a = User.objects.create_user(
             username="a", email="a@example.com", password="secret"
         )
@@ -66,6 +93,8 @@ class Misc(TestCase):
         )
         self.sample_puzzle_2.save()
 
+
+class Misc(HuntTestCase):
     def test_index(self):
         c = Client()
         c.login(username="b", password="password")
@@ -117,8 +146,1002 @@ class Misc(TestCase):
         self.assertEqual(puzzle["answer"], "SAMPLE ANSWER")
 
     def test_team_page(self):
+        Team.objects.update(creation_time=HUNT_START_TIME)
+        call_command("rebuild_standings", verbosity=0)
         c = Client()
         c.login(username="b", password="password")
 
         response = c.get(urls.reverse("team", args=(self.team_b.team_name,)))
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["submissions"], [])
+
+        # Tied teams are numbered by position, like on the leaderboard, both
+        # once their ranks are recomputed in the background and before.
+        def ranks():
+            return [
+                c.get(urls.reverse("team", args=(team.team_name,))).context["rank"]
+                for team in (self.team_a, self.team_b)
+            ]
+
+        self.assertEqual(
+            list(TeamStanding.objects.order_by("team_id").values_list("rank")),
+            [(1,), (2,)],
+        )
+        self.assertEqual(ranks(), [1, 2])
+        TeamStanding.objects.update(rank=None)
+        self.assertEqual(ranks(), [1, 2])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AnswerSubmission.objects.create(
+                team=self.team_b,
+                puzzle=self.sample_puzzle,
+                submitted_answer="SAMPLEANSWER",
+                is_correct=True,
+                used_free_answer=False,
+            )
+        response = c.get(urls.reverse("team", args=(self.team_b.team_name,)))
+        [solve] = response.context["submissions"]
+        self.assertEqual(solve["puzzle"], self.sample_puzzle)
+        self.assertEqual(len(response.context["chart"]["solves"]), 2)
+
+
+class UnlockEngineTests(TestCase):
+    def setUp(self):
+        self.intro = Round.objects.create(name="Intro", slug="intro", order=0)
+        self.main = Round.objects.create(name="Main", slug="main", order=1)
+
+        def puzzle(slug, round, order, **kwargs):
+            return Puzzle.objects.create(
+                name=slug, slug=slug, answer=slug, round=round, order=order, **kwargs
+            )
+
+        self.intro_1 = puzzle("intro-1", self.intro, 0, unlock_hours=0)
+        self.intro_meta = puzzle(
+            "intro-meta", self.intro, 1, is_meta=True, unlock_local=1
+        )
+        self.main_1 = puzzle("main-1", self.main, 0, unlock_global=0)
+        self.main_2 = puzzle("main-2", self.main, 1, unlock_global=1)
+        self.main_3 = puzzle("main-3", self.main, 2, unlock_hours=24)
+        self.puzzles = (
+            self.intro_1,
+            self.intro_meta,
+            self.main_1,
+            self.main_2,
+            self.main_3,
+        )
+
+    def unlocked(self, elapsed, allow_time_unlocks=True, solved=None):
+        engine = get_unlock_engine(self.puzzles)
+        solved_ids = None if solved is None else {p.id for p in solved}
+        return {
+            self.puzzles[index].slug: offset
+            for index, offset in engine.evaluate(
+                elapsed, allow_time_unlocks, solved_ids
+            )
+        }
+
+    def test_time_unlocks(self):
+        self.assertEqual(self.unlocked(timedelta(hours=1)), {"intro-1": timedelta()})
+        self.assertEqual(
+            self.unlocked(timedelta(hours=24)),
+            {"intro-1": timedelta(), "main-3": timedelta(hours=24)},
+        )
+        self.assertEqual(
+            self.unlocked(timedelta(hours=24), allow_time_unlocks=False, solved=()),
+            {"intro-1": timedelta()},
+        )
+
+    def test_solve_unlocks(self):
+        elapsed = timedelta(hours=1)
+        self.assertEqual(
+            self.unlocked(elapsed, solved=(self.intro_1,)),
+            {"intro-1": timedelta(), "intro-meta": None},
+        )
+        # A solved meta makes global thresholds of 0 count, but only for
+        # puzzles after it.
+        self.assertEqual(
+            self.unlocked(elapsed, solved=(self.intro_1, self.intro_meta)),
+            {"intro-1": timedelta(), "intro-meta": None, "main-1": None},
+        )
+        self.assertEqual(
+            self.unlocked(elapsed, solved=(self.intro_1, self.intro_meta, self.main_1)),
+            {
+                "intro-1": timedelta(),
+                "intro-meta": None,
+                "main-1": None,
+                "main-2": None,
+            },
+        )
+
+    def test_materialize_time_unlocks(self):
+        team = Team.objects.create(
+            user=create_user("early"),
+            team_name="Early",
+            start_offset=timedelta(hours=2),
+        )
+        start_time = HUNT_START_TIME - team.start_offset
+
+        def unlocks():
+            return dict(
+                team.puzzleunlock_set.values_list("puzzle__slug", "unlock_datetime")
+            )
+
+        now = start_time + timedelta(hours=1)
+        self.assertEqual(Team.materialize_time_unlocks(now), [team.id])
+        self.assertEqual(unlocks(), {"intro-1": start_time})
+        # Nothing new until the next boundary.
+        self.assertEqual(
+            Team.materialize_time_unlocks(now + timedelta(hours=1), since=now), []
+        )
+        self.assertEqual(
+            Team.materialize_time_unlocks(start_time + timedelta(hours=24), since=now),
+            [team.id],
+        )
+        self.assertEqual(
+            unlocks(),
+            {"intro-1": start_time, "main-3": start_time + timedelta(hours=24)},
+        )
+
+
+class ProgressTests(HuntTestCase):
+    def test_progress_invalidation(self):
+        self.assertEqual(self.team_b.progress.solves, {})
+        with self.captureOnCommitCallbacks(execute=True):
+            AnswerSubmission.objects.create(
+                team=self.team_b,
+                puzzle=self.sample_puzzle,
+                submitted_answer="WRONG",
+                is_correct=False,
+                used_free_answer=False,
+            )
+            AnswerSubmission.objects.create(
+                team=self.team_b,
+                puzzle=self.sample_puzzle,
+                submitted_answer="SAMPLEANSWER",
+                is_correct=True,
+                used_free_answer=False,
+            )
+
+        team = Team.objects.get(id=self.team_b.id)
+        self.assertEqual(list(team.progress.solves), [self.sample_puzzle.id])
+        self.assertEqual(team.num_wrong_guesses(self.sample_puzzle), 1)
+        self.assertEqual(list(team.solves.values()), [self.sample_puzzle])
+
+    def test_unlock_write_behind(self):
+        def request_context(now):
+            return SimpleNamespace(
+                team=self.team_a, now=now, unlock_writes={}, view_writes=set()
+            )
+
+        first = request_context(datetime(2025, 1, 1, tzinfo=UTC))
+        second = request_context(first.now + timedelta(seconds=1))
+        self.assertEqual(
+            progress.queue_unlock(first, self.sample_puzzle.id, first.now),
+            (first.now, True),
+        )
+        # A concurrent request coalesces onto the first one's write.
+        self.assertEqual(
+            progress.queue_unlock(second, self.sample_puzzle.id, second.now),
+            (first.now, False),
+        )
+        self.assertEqual(second.unlock_writes, {})
+        self.assertFalse(self.team_a.puzzleunlock_set.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            progress.flush_writes(first)
+            progress.queue_view(second, self.sample_puzzle.id)
+            progress.flush_writes(second)
+        unlock = self.team_a.puzzleunlock_set.get()
+        self.assertEqual(unlock.unlock_datetime, first.now)
+        self.assertEqual(unlock.view_datetime, second.now)
+
+    def test_team_puzzle_progress(self):
+        PuzzleUnlock.objects.create(
+            team=self.team_b,
+            puzzle=self.sample_puzzle,
+            unlock_datetime=HUNT_START_TIME,
+            view_datetime=HUNT_START_TIME,
+        )
+        Hint.objects.create(
+            team=self.team_b, puzzle=self.sample_puzzle, hint_question="?"
+        )
+        for answer, is_correct in (("WRONG", False), ("SAMPLEANSWER", True)):
+            AnswerSubmission.objects.create(
+                team=self.team_b,
+                puzzle=self.sample_puzzle,
+                submitted_answer=answer,
+                is_correct=is_correct,
+                used_free_answer=False,
+            )
+
+        row = TeamPuzzleProgress.objects.get(
+            team=self.team_b, puzzle=self.sample_puzzle
+        )
+        self.assertIsNotNone(row.solved_at)
+        self.assertEqual(row.unlocked_at, HUNT_START_TIME)
+        self.assertEqual((row.wrong_guesses, row.hints_requested), (1, 1))
+
+        rows = list(
+            TeamPuzzleProgress.objects.values_list(*TeamPuzzleProgress.DERIVED_FIELDS)
+        )
+        TeamPuzzleProgress.objects.all().delete()
+        call_command("rebuild_team_progress", verbosity=0)
+        self.assertEqual(
+            list(
+                TeamPuzzleProgress.objects.values_list(
+                    *TeamPuzzleProgress.DERIVED_FIELDS
+                )
+            ),
+            rows,
+        )
+
+        AnswerSubmission.objects.filter(team=self.team_b).delete()
+        row = TeamPuzzleProgress.objects.get(team=self.team_b)
+        self.assertEqual((row.solved_at, row.wrong_guesses), (None, 0))
+        Hint.objects.filter(team=self.team_b).delete()
+        PuzzleUnlock.objects.filter(team=self.team_b).delete()
+        self.assertFalse(TeamPuzzleProgress.objects.filter(team=self.team_b).exists())
+
+    def test_unlock_write_after_time_unlock(self):
+        solved_at = datetime(2025, 1, 1, tzinfo=UTC)
+        # The time unlock materializer got there first, with a later time.
+        PuzzleUnlock.objects.create(
+            team=self.team_a,
+            puzzle=self.sample_puzzle,
+            unlock_datetime=solved_at + timedelta(hours=1),
+        )
+        key = progress.pending_key("unlock", self.team_a.id, self.sample_puzzle.id)
+        cache.set(key, solved_at)
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.write_unlocks.call_local(
+                self.team_a.id, {self.sample_puzzle.id: solved_at}, [], None
+            )
+            # The pending write is only forgotten once it's committed.
+            self.assertEqual(cache.get(key), solved_at)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(self.team_a.puzzleunlock_set.get().unlock_datetime, solved_at)
+        self.assertEqual(
+            TeamPuzzleProgress.objects.get(team=self.team_a).unlocked_at, solved_at
+        )
+
+
+class CatalogTests(HuntTestCase):
+    def test_catalog(self):
+        hunt_catalog = catalog.get_catalog()
+        self.assertIs(catalog.get_catalog(), hunt_catalog)
+        self.assertEqual(
+            hunt_catalog.round_puzzles["sample"],
+            (self.sample_puzzle, self.sample_puzzle_2),
+        )
+
+        self.sample_puzzle_2.slug = "sample-2"
+        self.sample_puzzle_2.save()
+        hunt_catalog = catalog.get_catalog()
+        self.assertEqual(hunt_catalog.by_slug["sample-2"], self.sample_puzzle_2)
+        self.assertNotIn("sample-ii", hunt_catalog.by_slug)
+
+    def test_check_answer(self):
+        self.assertEqual(
+            catalog.get_catalog().check_answer(self.sample_puzzle.id, "sample answer"),
+            ("SAMPLEANSWER", True, None),
+        )
+        message = PuzzleMessage.objects.create(
+            puzzle=self.sample_puzzle, guess="Keep going", response="Almost!"
+        )
+        PuzzleMessage.objects.create(
+            puzzle=self.sample_puzzle, guess="KEEPGOING", response="Shadowed"
+        )
+        self.assertEqual(
+            catalog.get_catalog().check_answer(self.sample_puzzle.id, "keep-göing"),
+            ("KEEPGOING", False, message),
+        )
+        self.sample_puzzle.answer = "Keep going"
+        self.sample_puzzle.save()
+        self.assertTrue(
+            catalog.get_catalog().check_answer(self.sample_puzzle.id, "keepgoing")[1]
+        )
+
+
+class ContextTests(HuntTestCase):
+    @override_settings(CONTEXT_TIMING_ENABLED=True)
+    def test_context_timing(self):
+        c = Client()
+        c.login(username="b", password="password")
+
+        response = c.get(urls.reverse("team", args=(self.team_b.team_name,)))
+        metrics = [
+            metric.split(";")[0] for metric in response["Server-Timing"].split(", ")
+        ]
+        self.assertEqual(metrics[0], "total")
+        self.assertIn("context.team", metrics)
+        self.assertIn("team.solves", metrics)
+
+    def test_puzzle_submissions(self):
+        for puzzle, answer in (
+            (self.sample_puzzle, "WRONG"),
+            (self.sample_puzzle_2, "ALSOWRONG"),
+        ):
+            AnswerSubmission.objects.create(
+                team=self.team_a,
+                puzzle=puzzle,
+                submitted_answer=answer,
+                is_correct=False,
+                used_free_answer=False,
+            )
+
+        team = Team.objects.get(id=self.team_a.id)
+        submissions = team.puzzle_submissions(self.sample_puzzle)
+        self.assertEqual([s.submitted_answer for s in submissions], ["WRONG"])
+        self.assertNotIn("submissions", getattr(team, "_cache", {}))
+        # Once the full history is loaded, it's used instead.
+        self.assertEqual(len(team.submissions), 2)
+        self.assertIn(
+            team.puzzle_submissions(self.sample_puzzle_2)[0], team.submissions
+        )
+
+
+class ShortcutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("admin")
+        self.team = Team.objects.create(user=self.user, team_name="Admin")
+        self.puzzle = Puzzle.objects.create(
+            name="Puzzle",
+            slug="puzzle",
+            answer="ANSWER",
+            round=Round.objects.create(name="Round", slug="round"),
+        )
+
+    def context(self, puzzle=None, team=None):
+        return SimpleNamespace(
+            puzzle=puzzle,
+            team=team,
+            request_user=self.user,
+            now=timezone.now(),
+            catalog=catalog.get_catalog(),
+        )
+
+    def test_get_shortcuts(self):
+        def actions(context):
+            return [
+                entry.get("action", entry["name"])
+                for entry in shortcuts.get_shortcuts(context)
+            ]
+
+        # Without a team, the only thing to do is create one.
+        self.assertEqual(actions(self.context()), ["create_team"])
+        team_actions = actions(self.context(team=self.team))
+        self.assertIn("prerelease_testsolver", team_actions)
+        self.assertIn("set_offset_to_start_now", team_actions)
+        self.assertNotIn("create_team", team_actions)
+        self.assertNotIn("solve", team_actions)
+        puzzle_actions = actions(self.context(self.puzzle, self.team))
+        self.assertEqual(puzzle_actions[: len(team_actions)], team_actions)
+        # Headings are yielded with their (translated) name.
+        self.assertIn("Submit answer (this puzzle)", puzzle_actions)
+        self.assertIn("solve", puzzle_actions)
+        self.assertIn("delete_guesses", puzzle_actions)
+
+        # The shortcuts are filtered once per set of available parameters.
+        self.assertIs(
+            shortcuts.available_shortcuts(frozenset({"team", "now"})),
+            shortcuts.available_shortcuts(frozenset({"now", "team"})),
+        )
+
+    def test_dispatch_shortcut(self):
+        def request(**post):
+            return SimpleNamespace(
+                POST=post,
+                user=self.user,
+                context=self.context(team=self.team),
+            )
+
+        shortcuts.dispatch_shortcut(request(action="solve", puzzle="puzzle"))
+        submission = self.team.answersubmission_set.get()
+        self.assertTrue(submission.is_correct)
+        self.assertFalse(submission.used_free_answer)
+
+        with self.assertRaises(AssertionError):
+            shortcuts.dispatch_shortcut(request(action="nonexistent"))
+        with self.assertRaises(AssertionError):
+            shortcuts.dispatch_shortcut(request(action="solve", puzzle="missing"))
+
+
+class LeaderboardTests(HuntTestCase):
+    def test_team_standings(self):
+        # Only solves during the hunt count, by teams created before its end.
+        Team.objects.update(creation_time=HUNT_START_TIME)
+        call_command("rebuild_standings", verbosity=0)
+        with (
+            patch(
+                "django.utils.timezone.now",
+                return_value=HUNT_START_TIME + timedelta(hours=1),
+            ),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            AnswerSubmission.objects.create(
+                team=self.team_b,
+                puzzle=self.sample_puzzle,
+                submitted_answer="SAMPLEANSWER",
+                is_correct=True,
+                used_free_answer=False,
+            )
+
+        teams = list(Team.leaderboard(None))
+        self.assertEqual(
+            [team["id"] for team in teams], [self.team_b.id, self.team_a.id]
+        )
+        self.assertEqual(teams[0]["total_solves"], 1)
+        self.assertEqual(
+            list(TeamStanding.objects.order_by("rank").values_list("team_id")),
+            [(self.team_b.id,), (self.team_a.id,)],
+        )
+        call_command("rebuild_standings", check=True, verbosity=0)
+
+        # Solving a tiebreak milestone outranks a plain solve.
+        ripple = Puzzle.objects.create(
+            name="Ripple",
+            slug=MILESTONES["ripple_solve_time"],
+            answer="RIPPLE",
+            round=self.sample_round,
+        )
+        with (
+            patch(
+                "django.utils.timezone.now",
+                return_value=HUNT_START_TIME + timedelta(hours=2),
+            ),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            AnswerSubmission.objects.create(
+                team=self.team_a,
+                puzzle=ripple,
+                submitted_answer="RIPPLE",
+                is_correct=True,
+                used_free_answer=False,
+            )
+        self.assertEqual(
+            TeamStanding.objects.get(team=self.team_a).ripple_solve_time,
+            HUNT_START_TIME + timedelta(hours=2),
+        )
+        self.assertEqual(
+            [team["id"] for team in Team.leaderboard(None)],
+            [self.team_a.id, self.team_b.id],
+        )
+        call_command("rebuild_standings", check=True, verbosity=0)
+
+        # A solve edited into a wrong guess no longer counts.
+        with self.captureOnCommitCallbacks(execute=True):
+            solve = AnswerSubmission.objects.get(team=self.team_b)
+            solve.is_correct = False
+            solve.save()
+        self.assertEqual(TeamStanding.objects.get(team=self.team_b).total_solves, 0)
+        call_command("rebuild_standings", check=True, verbosity=0)
+
+        TeamStanding.objects.filter(team=self.team_a).update(total_solves=5)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_standings", check=True, verbosity=0)
+        call_command("rebuild_standings", verbosity=0)
+
+    def test_leaderboard_pages(self):
+        Team.objects.update(creation_time=HUNT_START_TIME)
+        call_command("rebuild_standings", verbosity=0)
+        c = Client()
+        c.login(username="b", password="password")
+
+        with patch.object(leaderboard, "PAGE_SIZE", 1):
+            response = c.get(urls.reverse("teams"))
+            [first] = response.context["teams"]
+            response = c.get(
+                urls.reverse("teams"), {"after": response.context["next_cursor"]}
+            )
+            [second] = response.context["teams"]
+            # Tied teams still get a position each.
+            self.assertEqual(
+                [(first["id"], first["rank"]), (second["id"], second["rank"])],
+                [(self.team_a.id, 1), (self.team_b.id, 2)],
+            )
+            self.assertIsNone(response.context["next_cursor"])
+
+            # A hidden team is spliced into the shared page for itself only.
+            Team.objects.filter(id=self.team_b.id).update(is_hidden=True)
+            call_command("rebuild_standings", verbosity=0)
+            response = c.get(urls.reverse("teams"))
+            self.assertEqual(
+                [(team["id"], team["rank"]) for team in response.context["teams"]],
+                [(self.team_a.id, 1), (self.team_b.id, 2)],
+            )
+            self.assertEqual(len(leaderboard.get_page()["teams"]), 1)
+
+
+class BigboardTests(HuntTestCase):
+    def test_bigboard(self):
+        for team, answer, is_correct in (
+            (self.team_a, "WRONG", False),
+            (self.team_b, "WRONG", False),
+            (self.team_b, "SAMPLEANSWER", True),
+        ):
+            AnswerSubmission.objects.create(
+                team=team,
+                puzzle=self.sample_puzzle,
+                submitted_answer=answer,
+                is_correct=is_correct,
+                used_free_answer=False,
+            )
+
+        # Solves after the hunt don't count towards the order.
+        response = Client().get(urls.reverse("bigboard") + "?1")
+        [row] = response.context["board"]
+        self.assertEqual(row["team"], self.team_a)
+        self.assertEqual(row["entries"][0].cls, "W")
+
+        response = Client().get(urls.reverse("bigboard"))
+        _, row = response.context["board"]
+        self.assertEqual(row["team"], self.team_b)
+        self.assertEqual(row["total_solves"], 1)
+        self.assertEqual(row["entries"][0].cls, "S P")
+        self.assertEqual(row["entries"][0].solve_position, 1)
+        self.assertEqual(row["entries"][0].wrong_guesses, 1)
+        sample, sample_2 = response.context["puzzles"]
+        self.assertEqual((sample["solves"], sample["total_guesses"]), (1, 3))
+        self.assertEqual(sample_2["total_guesses"], 0)
+
+        data = Client().get(urls.reverse("bigboard-data") + "?2").json()
+        self.assertEqual(
+            data["teams"]["name"], [self.team_a.team_name, self.team_b.team_name]
+        )
+        status = base64.b64decode(data["status"])
+        self.assertEqual(
+            [data["classes"][cell] for cell in status], ["W", "", "S P", ""]
+        )
+        self.assertEqual(data["solve_position"], [0, 0, 1, 0])
+        self.assertEqual(data["puzzles"]["solves"], [1, 0])
+        response = Client().get(urls.reverse("bigboard-grid"))
+        self.assertContains(response, urls.reverse("bigboard-data"))
+
+    def test_bigboard_changes(self):
+        AnswerSubmission.objects.create(
+            team=self.team_b,
+            puzzle=self.sample_puzzle,
+            submitted_answer="SAMPLEANSWER",
+            is_correct=True,
+            used_free_answer=False,
+        )
+        # The cursor includes the time in seconds.
+        with patch("puzzles.bigboard.time.time", return_value=1e9):
+            data = Client().get(urls.reverse("bigboard-data")).json()
+            cursor = data["cursor"]
+            self.assertEqual(
+                Client().get(urls.reverse("bigboard-data"), {"since": cursor}).json(),
+                {"cursor": cursor, "changes": None},
+            )
+
+        AnswerSubmission.objects.create(
+            team=self.team_a,
+            puzzle=self.sample_puzzle,
+            submitted_answer="SAMPLEANSWER",
+            is_correct=True,
+            used_free_answer=False,
+        )
+        response = Client().get(urls.reverse("bigboard-data"), {"since": cursor})
+        changes = response.json()["changes"]
+        self.assertEqual(changes["teams"]["id"], [self.team_a.id])
+        self.assertEqual(changes["teams"]["solves"], [1])
+        # counted among all teams, not just the ones that changed
+        self.assertEqual(changes["solve_position"], [2, 0])
+        self.assertEqual(changes["puzzles"]["id"], [self.sample_puzzle.id])
+        self.assertEqual(changes["puzzles"]["solves"], [2])
+        self.assertCountEqual(changes["order"], [self.team_a.id, self.team_b.id])
+
+        response = Client().get(urls.reverse("biggraph-data"), {"since": cursor})
+        [point] = response.json()["points"]
+        self.assertEqual(point[0], self.team_a.team_name)
+        response = Client().get(urls.reverse("bigboard-data"), {"since": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_biggraph_data(self):
+        for puzzle, answer in (
+            (self.sample_puzzle_2, "SAMPLE"),
+            (self.sample_puzzle, "SAMPLEANSWER"),
+        ):
+            AnswerSubmission.objects.create(
+                team=self.team_b,
+                puzzle=puzzle,
+                submitted_answer=answer,
+                is_correct=True,
+                used_free_answer=False,
+            )
+        first, second = TeamPuzzleProgress.objects.filter(team=self.team_b).order_by(
+            "solved_at"
+        )
+
+        response = Client().get(urls.reverse("biggraph-data"))
+        data = response.json()
+        self.assertEqual(data["puzzles"]["name"], ["Sample", "Sample II"])
+        [team] = [
+            team for team in data["teams"] if team["name"] == self.team_b.team_name
+        ]
+        self.assertEqual(team["puzzles"], [1, 0])
+        first_time = int(first.solved_at.timestamp() * 1000)
+        second_time = int(second.solved_at.timestamp() * 1000)
+        self.assertEqual(team["times"], [first_time, second_time - first_time])
+
+        response = Client().get(
+            urls.reverse("biggraph-data"), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+        # Post-hunt guesses don't bump the leaderboard version, so the series
+        # is only cached briefly, and a new one has a new ETag.
+        AnswerSubmission.objects.create(
+            team=self.team_b,
+            puzzle=self.sample_puzzle,
+            submitted_answer="WRONG",
+            is_correct=False,
+            used_free_answer=False,
+        )
+        cache.clear()
+        response = Client().get(
+            urls.reverse("biggraph-data"), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
+        response = Client().get(urls.reverse("biggraph-data") + "?1")
+        self.assertEqual(len(response.json()["teams"]), 1)
+        response = Client().get(urls.reverse("biggraph"))
+        self.assertContains(response, urls.reverse("biggraph-data"))
+
+
+class StatsTests(HuntTestCase):
+    def test_hunt_stats(self):
+        self.sample_puzzle_2.is_meta = True
+        self.sample_puzzle_2.save()
+        self.sample_round.meta = self.sample_puzzle_2
+        self.sample_round.save()
+        Hint.objects.create(
+            team=self.team_a,
+            puzzle=self.sample_puzzle,
+            hint_question="?",
+            status=Hint.ANSWERED,
+        )
+        for minutes, team, puzzle, answer, is_correct in (
+            (0, self.team_a, self.sample_puzzle, "SAMPLEANSWER", True),
+            (0, self.team_b, self.sample_puzzle, "SAMPLEANSWER", True),
+            (1, self.team_b, self.sample_puzzle_2, "WRONG", False),
+            (2, self.team_b, self.sample_puzzle_2, "SAMPLE", True),
+            (3, self.team_a, self.sample_puzzle_2, "WRONG", False),
+        ):
+            with patch(
+                "django.utils.timezone.now",
+                return_value=HUNT_START_TIME + timedelta(minutes=minutes),
+            ):
+                AnswerSubmission.objects.create(
+                    team=team,
+                    puzzle=puzzle,
+                    submitted_answer=answer,
+                    is_correct=is_correct,
+                    used_free_answer=False,
+                )
+
+        response = Client().get(urls.reverse("hunt-stats"))
+        self.assertEqual(response.context["total_guesses"], 5)
+        self.assertEqual(response.context["total_solves"], 3)
+        self.assertEqual(response.context["total_hints"], 1)
+        self.assertEqual(response.context["total_metas"], 1)
+        sample, sample_2 = response.context["data"]
+        # Team B solved it two minutes before the meta.
+        self.assertEqual(sample["numbers"], [2, 2, 1, 1, 0, 1, 0, 1, 0])
+        self.assertEqual(sample_2["numbers"], [1, 3, 0, 1, 1, 0, 0, 0, 1])
+
+    def test_frozen_stats(self):
+        def solve(team):
+            with patch(
+                "django.utils.timezone.now",
+                return_value=HUNT_START_TIME + timedelta(hours=1),
+            ):
+                AnswerSubmission.objects.create(
+                    team=team,
+                    puzzle=self.sample_puzzle,
+                    submitted_answer="SAMPLEANSWER",
+                    is_correct=True,
+                    used_free_answer=False,
+                )
+
+        solve(self.team_b)
+        call_command("freeze_stats", verbosity=0)
+        self.assertTrue(FrozenPayload.objects.filter(name="stats:sample").exists())
+        response = Client().get(urls.reverse("stats", args=("sample",)))
+        [solver] = response.context["solvers"]
+        self.assertEqual(solver["team_name"], self.team_b.team_name)
+        self.assertEqual(solver["solve_time"], HUNT_START_TIME + timedelta(hours=1))
+        self.assertEqual(Client().get(urls.reverse("finishers")).status_code, 200)
+        self.assertEqual(Client().get(urls.reverse("wrapup")).status_code, 200)
+
+        # Frozen payloads are served as they are...
+        solve(self.team_a)
+        response = Client().get(urls.reverse("hunt-stats"))
+        self.assertEqual(response.context["total_solves"], 1)
+        response = Client().get(urls.reverse("stats", args=("sample",)))
+        self.assertEqual(len(response.context["solvers"]), 1)
+
+        # ...until they're frozen again, or, for the ones with post-hunt
+        # data, once they're old enough to be refreshed.
+        with patch(
+            "django.utils.timezone.now",
+            return_value=timezone.now() + frozen.REFRESH_INTERVAL * 2,
+        ):
+            Client().get(urls.reverse("hunt-stats"))
+            response = Client().get(urls.reverse("hunt-stats"))
+        self.assertEqual(response.context["total_solves"], 2)
+        call_command("freeze_stats", verbosity=0)
+        response = Client().get(urls.reverse("stats", args=("sample",)))
+        self.assertEqual(len(response.context["solvers"]), 2)
+
+        # Hiding a team or deleting a submission refreshes them right away.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team_a.is_hidden = True
+            self.team_a.save()
+        response = Client().get(urls.reverse("stats", args=("sample",)))
+        self.assertEqual(len(response.context["solvers"]), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team_b.answersubmission_set.get().delete()
+        response = Client().get(urls.reverse("stats", args=("sample",)))
+        self.assertEqual(response.context["solvers"], [])
+
+    def test_wrapup_rollups(self):
+        start = HUNT_START_TIME + timedelta(hours=2)
+        PuzzleUnlock.objects.create(
+            team=self.team_b,
+            puzzle=self.sample_puzzle,
+            unlock_datetime=start - timedelta(minutes=30),
+            view_datetime=start - timedelta(minutes=30),
+        )
+        for minutes, team, answer, is_correct in (
+            (5, self.team_a, "WRONG", False),
+            (10, self.team_a, "SAMPLEANSWER", True),
+            (20, self.team_b, "SAMPLEANSWER", True),
+        ):
+            with patch(
+                "django.utils.timezone.now",
+                return_value=start + timedelta(minutes=minutes),
+            ):
+                AnswerSubmission.objects.create(
+                    team=team,
+                    puzzle=self.sample_puzzle,
+                    submitted_answer=answer,
+                    is_correct=is_correct,
+                    used_free_answer=False,
+                )
+                Hint.objects.create(
+                    team=team,
+                    puzzle=self.sample_puzzle,
+                    hint_question="?",
+                    status=Hint.ANSWERED,
+                    answered_datetime=start + timedelta(minutes=minutes + 6),
+                )
+
+        [rollup] = WrapupRollup.objects.all()
+        self.assertEqual(rollup.hour, start)
+        self.assertEqual(
+            (rollup.correct_guesses, rollup.wrong_guesses, rollup.hints), (2, 1, 3)
+        )
+        # Team A never viewed the puzzle.
+        self.assertEqual(rollup.fastest_solve, 50 * 60)
+        self.assertEqual(rollup.fastest_team, self.team_b)
+
+        # Team A views it, with an earlier unlock.
+        PuzzleUnlock.objects.create(
+            team=self.team_a,
+            puzzle=self.sample_puzzle,
+            unlock_datetime=start,
+            view_datetime=start,
+        )
+        rollups = list(WrapupRollup.objects.values_list())
+        call_command("rebuild_rollups", verbosity=0)
+        self.assertEqual(
+            [rollup[1:] for rollup in rollups],
+            [rollup[1:] for rollup in WrapupRollup.objects.values_list()],
+        )
+        [rollup] = WrapupRollup.objects.all()
+        self.assertEqual(rollup.fastest_team, self.team_a)
+
+        # Removing or moving submissions and hints updates their rows.
+        AnswerSubmission.objects.get(team=self.team_a, is_correct=True).delete()
+        wrong = AnswerSubmission.objects.get(is_correct=False)
+        wrong.is_message = True
+        wrong.save()
+        hint = Hint.objects.filter(team=self.team_a).first()
+        hint.answered_datetime = None
+        hint.save()
+        [rollup] = WrapupRollup.objects.all()
+        self.assertEqual(
+            (
+                rollup.correct_guesses,
+                rollup.partial_guesses,
+                rollup.wrong_guesses,
+                rollup.hints,
+                rollup.fastest_team,
+            ),
+            (1, 1, 0, 2, self.team_b),
+        )
+        rollups = list(WrapupRollup.objects.values_list())
+        call_command("rebuild_rollups", verbosity=0)
+        self.assertEqual(
+            [rollup[1:] for rollup in rollups],
+            [rollup[1:] for rollup in WrapupRollup.objects.values_list()],
+        )
+        # Put the hunt back for the wrap-up below.
+        with patch(
+            "django.utils.timezone.now",
+            return_value=start + timedelta(minutes=10),
+        ):
+            AnswerSubmission.objects.create(
+                team=self.team_a,
+                puzzle=self.sample_puzzle,
+                submitted_answer="SAMPLEANSWER",
+                is_correct=True,
+                used_free_answer=False,
+            )
+        hint.answered_datetime = hint.submitted_datetime + timedelta(minutes=6)
+        hint.save()
+        wrong.is_message = False
+        wrong.save()
+
+        context = stats.wrapup([self.sample_puzzle, self.sample_puzzle_2])
+        self.assertEqual(context["puzzle_guesses"]["correct"], [2, 0])
+        self.assertEqual(context["puzzle_guesses"]["incorrect"], [1, 0])
+        self.assertEqual(context["hints_per_puzzle"]["data"], [3, 0])
+        self.assertEqual(context["fastest_solves"]["tooltips"], ["Team A"])
+        self.assertEqual(context["fastest_solves"]["data"], [10])
+        [hints] = context["hints_per_hour"]
+        self.assertEqual(hints["y"], 3)
+        self.assertEqual(context["hint_latencies_per_hour"][0]["y"], 6)
+
+    def test_puzzle_stats(self):
+        Team.objects.filter(id=self.team_b.id).update(is_hidden=True)
+        self.team_b.refresh_from_db()
+        for minutes, team, answer, is_correct in (
+            (5, self.team_a, "WRONG", False),
+            (10, self.team_a, "SAMPLEANSWER", True),
+            (15, self.team_b, "WRONG", False),
+            (20, self.team_b, "SAMPLEANSWER", True),
+        ):
+            with patch(
+                "django.utils.timezone.now",
+                return_value=HUNT_START_TIME + timedelta(minutes=minutes),
+            ):
+                AnswerSubmission.objects.create(
+                    team=team,
+                    puzzle=self.sample_puzzle,
+                    submitted_answer=answer,
+                    is_correct=is_correct,
+                    used_free_answer=False,
+                )
+        for team in (self.team_a, self.team_b):
+            Hint.objects.create(team=team, puzzle=self.sample_puzzle, hint_question="?")
+
+        stats_row = PuzzleStats.objects.get(puzzle=self.sample_puzzle)
+        self.assertEqual((stats_row.solves, stats_row.guesses), (1, 2))
+        self.assertEqual(stats_row.hints, 1)
+        wrong_answers = list(
+            PuzzleWrongAnswer.objects.values_list("guess", "partial", "count")
+        )
+        self.assertEqual(wrong_answers, [("WRONG", False, 1)])
+        call_command("rebuild_puzzle_stats", verbosity=0)
+        rebuilt = PuzzleStats.objects.get(puzzle=self.sample_puzzle)
+        self.assertEqual(
+            (rebuilt.solves, rebuilt.guesses, rebuilt.teams, rebuilt.hints),
+            (1, 2, 1, 1),
+        )
+        self.assertEqual(
+            list(PuzzleWrongAnswer.objects.values_list("guess", "partial", "count")),
+            wrong_answers,
+        )
+
+        response = Client().get(urls.reverse("stats", args=("sample",)))
+        [solver] = response.context["solvers"]
+        self.assertEqual(solver["team_name"], "Team A")
+        self.assertEqual(solver["wrong_duration"], 5 * 60)
+        self.assertEqual(response.context["hint_count"], 1)
+
+        # The hidden team sees itself among the solvers.
+        c = Client()
+        c.login(username="b", password="password")
+        response = c.get(urls.reverse("stats", args=("sample",)))
+        self.assertEqual(len(response.context["solvers"]), 2)
+        self.assertEqual(response.context["guesses"], 4)
+        self.assertEqual(response.context["answers_tried"][0]["count"], 2)
+        self.assertEqual(response.context["hint_count"], 2)
+
+        # Edits and deletions move the counts.
+        wrong = AnswerSubmission.objects.get(team=self.team_a, is_correct=False)
+        wrong.is_message = True
+        wrong.save()
+        self.assertEqual(
+            list(PuzzleWrongAnswer.objects.filter(count__gt=0).values_list("partial")),
+            [(True,)],
+        )
+        wrong.delete()
+        stats_row = PuzzleStats.objects.get(puzzle=self.sample_puzzle)
+        self.assertEqual(
+            (stats_row.solves, stats_row.guesses, stats_row.teams), (1, 1, 1)
+        )
+        self.assertFalse(PuzzleWrongAnswer.objects.filter(count__gt=0).exists())
+
+    def test_puzzle_counters(self):
+        self.assertEqual(counters.get_counts(), {})
+        for minutes, team, answer, is_correct in (
+            (5, self.team_a, "WRONG", False),
+            (10, self.team_a, "SAMPLEANSWER", True),
+            (15, self.team_b, "WRONG", False),
+        ):
+            with (
+                patch(
+                    "django.utils.timezone.now",
+                    return_value=HUNT_START_TIME + timedelta(minutes=minutes),
+                ),
+                self.captureOnCommitCallbacks(execute=True),
+            ):
+                AnswerSubmission.objects.create(
+                    team=team,
+                    puzzle=self.sample_puzzle,
+                    submitted_answer=answer,
+                    is_correct=is_correct,
+                    used_free_answer=False,
+                )
+
+        counts = {self.sample_puzzle.id: {"correct": 1, "guesses": 3, "teams": 2}}
+        self.assertEqual(counters.get_counts(), counts)
+        # Solves after the hunt don't count.
+        with self.captureOnCommitCallbacks(execute=True):
+            AnswerSubmission.objects.create(
+                team=self.team_b,
+                puzzle=self.sample_puzzle,
+                submitted_answer="SAMPLEANSWER",
+                is_correct=True,
+                used_free_answer=False,
+            )
+        self.assertEqual(counters.get_counts(), counts)
+
+        PuzzleStats.objects.update(solves=0, guesses=0, teams=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_puzzle_stats", "--counts", verbosity=0)
+        self.assertEqual(counters.get_counts(), counts)
+
+    def test_survey_aggregates(self):
+        Team.objects.filter(id=self.team_b.id).update(is_hidden=True)
+        self.team_b.refresh_from_db()
+        Survey.objects.create(
+            team=self.team_a, puzzle=self.sample_puzzle, fun=4, difficulty=2
+        )
+        survey = Survey.objects.create(
+            team=self.team_b, puzzle=self.sample_puzzle, fun=6, difficulty=6
+        )
+        survey.fun = 2
+        survey.save()
+
+        self.assertEqual(
+            SurveyAggregate.averages(), {self.sample_puzzle.id: (2, [3, 4])}
+        )
+        self.assertEqual(
+            SurveyAggregate.averages(include_hidden=False),
+            {self.sample_puzzle.id: (1, [4, 2])},
+        )
+        rows = set(SurveyAggregate.objects.values_list("field", "total", "count"))
+        call_command("rebuild_survey_aggregates", verbosity=0)
+        self.assertEqual(
+            set(SurveyAggregate.objects.values_list("field", "total", "count")), rows
+        )
+
+        User.objects.filter(username="a").update(is_superuser=True)
+        c = Client()
+        c.login(username="a", password="secret")
+        response = c.get(urls.reverse("survey", args=("sample",)))
+        self.assertEqual(
+            [field["average"] for field in response.context["fields"]], [4, 2]
+        )
+        response = c.get(urls.reverse("survey-list"))
+        [puzzle] = response.context["puzzles"]
+        self.assertEqual(puzzle["count"], 2)
+
+        survey.delete()
+        self.assertEqual(
+            SurveyAggregate.averages(), {self.sample_puzzle.id: (1, [4, 2])}
+        )
@@ -0,0 +1,102 @@
+# Opt-in instrumentation for the request-scoped caches in context.py. When
+# CONTEXT_TIMING_ENABLED is set, every cached property of a Context or Team
+# that gets computed during a request is timed, along with the SQL queries it
+# ran and how many more times it was read from the cache. The results are sent
+# back in a Server-Timing header (which browsers show in their network panel)
+# and logged as one JSON line per request to the "puzzles.timing" logger, so
+# you can tell which properties dominate which pages without running silk.
+import contextvars
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger("puzzles.timing")
+
+_recorder = contextvars.ContextVar("context_timing_recorder", default=None)
+
+
+class Recorder:
+    def __init__(self):
+        self.queries = 0
+        # label -> {"ms": ..., "queries": ..., "hits": ...}, in the order
+        # properties finished computing
+        self.properties = {}
+
+    # Installed as a database execute wrapper for the request.
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def compute(self, label, fn, obj):
+        """
+        Computes a cached property, recording its time and queries. Both are
+        inclusive of any other properties it reads.
+        """
+
+        start = time.perf_counter()
+        queries = self.queries
+        try:
+            return fn(obj)
+        finally:
+            entry = self.properties.setdefault(
+                label, {"ms": 0.0, "queries": 0, "hits": 0}
+            )
+            entry["ms"] += (time.perf_counter() - start) * 1000
+            entry["queries"] += self.queries - queries
+
+    def hit(self, label):
+        entry = self.properties.get(label)
+        if entry is not None:
+            entry["hits"] += 1
+
+    def server_timing(self, total_ms):
+        metrics = [f'total;dur={total_ms:.1f};desc="{self.queries} queries"']
+        metrics.extend(
+            f"{label};dur={entry['ms']:.1f};"
+            f'desc="{entry["queries"]} queries, {entry["hits"]} hits"'
+            for label, entry in self.properties.items()
+        )
+        return ", ".join(metrics)
+
+
+def current():
+    """The recorder for the current request, or None if timing is off."""
+
+    return _recorder.get()
+
+
+def timing_middleware(get_response):
+    def middleware(request):
+        if not settings.CONTEXT_TIMING_ENABLED:
+            return get_response(request)
+
+        recorder = Recorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(recorder):
+                response = get_response(request)
+        finally:
+            _recorder.reset(token)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        response["Server-Timing"] = recorder.server_timing(total_ms)
+        match = request.resolver_match
+        logger.info(
+            json.dumps(
+                {
+                    "path": request.path,
+                    "url_name": match.view_name if match else None,
+                    "status": response.status_code,
+                    "ms": round(total_ms, 1),
+                    "queries": recorder.queries,
+                    "properties": recorder.properties,
+                }
+            )
+        )
+        return response
+
+    return middleware
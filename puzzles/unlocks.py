@@ -0,0 +1,195 @@
+# The unlock rules for every puzzle (unlock_hours, unlock_global and
+# unlock_local, plus the "a solved meta counts as progress" rule) only change
+# when someone edits a Puzzle, but the old implementation re-derived all of
+# them for every puzzle on every page view. UnlockEngine compiles the rules
+# for an ordered tuple of puzzles once into sorted threshold tables, so that
+# evaluating them for a team is a handful of bisects. On top of that, the
+# result only changes when the team solves something or a time trigger
+# passes, so evaluations are memoized on exactly that state.
+import bisect
+import collections
+import datetime
+
+from puzzles.hunt_config import INTRO_ROUND_SLUG
+
+# Evaluations are memoized per distinct (time, solves) state. Teams at the
+# same point of the hunt share entries, so this stays small in practice; the
+# cap just keeps a long-running worker from growing without bound.
+MAX_MEMOIZED_STATES = 4096
+
+
+class UnlockEngine:
+    def __init__(self, puzzles):
+        self.puzzles = tuple(puzzles)
+
+        time_triggers = sorted(
+            (datetime.timedelta(hours=puzzle.unlock_hours), index)
+            for index, puzzle in enumerate(self.puzzles)
+            if puzzle.unlock_hours >= 0
+        )
+        self.trigger_offsets = [offset for (offset, _) in time_triggers]
+        self.trigger_indices = [index for (_, index) in time_triggers]
+        # Puzzles with unlock_hours == 0 unlock at the start even for teams
+        # that have disabled time unlocks; they sort to the front.
+        self.num_start_triggers = bisect.bisect_right(
+            self.trigger_offsets, datetime.timedelta()
+        )
+
+        global_thresholds = sorted(
+            (puzzle.unlock_global, index)
+            for index, puzzle in enumerate(self.puzzles)
+            if puzzle.unlock_global >= 0
+        )
+        self.global_counts = [count for (count, _) in global_thresholds]
+        self.global_indices = [index for (_, index) in global_thresholds]
+
+        local_thresholds = collections.defaultdict(list)
+        for index, puzzle in enumerate(self.puzzles):
+            if puzzle.unlock_local >= 0:
+                local_thresholds[puzzle.round.slug].append((puzzle.unlock_local, index))
+        self.local_counts = {}
+        self.local_indices = {}
+        for slug, thresholds in local_thresholds.items():
+            thresholds.sort()
+            self.local_counts[slug] = [count for (count, _) in thresholds]
+            self.local_indices[slug] = [index for (_, index) in thresholds]
+
+        self.meta_indices = {
+            puzzle.id: index
+            for index, puzzle in enumerate(self.puzzles)
+            if puzzle.is_meta
+        }
+        self.indices = {puzzle.id: index for index, puzzle in enumerate(self.puzzles)}
+        self.round_slugs = {puzzle.id: puzzle.round.slug for puzzle in self.puzzles}
+        self.non_meta_ids = frozenset(
+            puzzle.id for puzzle in self.puzzles if not puzzle.is_meta
+        )
+
+        self._memo = {}
+
+    @staticmethod
+    def signature(puzzles):
+        """
+        Everything about an ordered sequence of puzzles that the compiled
+        tables depend on. Two sequences with the same signature can share an
+        engine.
+        """
+
+        return tuple(
+            (
+                puzzle.id,
+                puzzle.round.slug,
+                puzzle.is_meta,
+                puzzle.unlock_hours,
+                puzzle.unlock_global,
+                puzzle.unlock_local,
+            )
+            for puzzle in puzzles
+        )
+
+    def main_round_solves(self, solved_ids):
+        """
+        For unlocking purposes, a "main round solve" is a solve that is not a
+        meta or in the intro round. Returns (global_solves, local_solves),
+        where local_solves maps round slugs to solves in that round (which do
+        count the intro round).
+        """
+
+        global_solves = 0
+        local_solves = collections.defaultdict(int)
+        for puzzle_id in solved_ids:
+            if puzzle_id not in self.non_meta_ids:
+                continue
+            slug = self.round_slugs[puzzle_id]
+            local_solves[slug] += 1
+            if slug != INTRO_ROUND_SLUG:
+                global_solves += 1
+        return (global_solves, local_solves)
+
+    def num_time_triggers(self, elapsed, allow_time_unlocks):
+        passed = bisect.bisect_right(self.trigger_offsets, elapsed)
+        if not allow_time_unlocks:
+            passed = min(passed, self.num_start_triggers)
+        return passed
+
+    def evaluate(self, elapsed, allow_time_unlocks=True, solved_ids=None):
+        """
+        Returns a tuple of (index, offset) pairs, in puzzle order, for every
+        puzzle the rules unlock. offset is the time after the (team's) start
+        at which the puzzle unlocked, or None if it was unlocked by solves
+        (i.e. it unlocks "now").
+
+        solved_ids should be None when there's no team, in which case only
+        time triggers apply.
+        """
+
+        passed = self.num_time_triggers(elapsed, allow_time_unlocks)
+        if solved_ids is None:
+            key = (passed, None)
+        else:
+            global_solves, local_solves = self.main_round_solves(solved_ids)
+            first_meta = min(
+                (
+                    self.meta_indices[puzzle_id]
+                    for puzzle_id in solved_ids
+                    if puzzle_id in self.meta_indices
+                ),
+                default=len(self.puzzles),
+            )
+            key = (
+                passed,
+                global_solves,
+                tuple(sorted(local_solves.items())),
+                first_meta,
+            )
+        result = self._memo.get(key)
+        if result is None:
+            result = self._evaluate(key)
+            if len(self._memo) >= MAX_MEMOIZED_STATES:
+                self._memo.clear()
+            self._memo[key] = result
+        return result
+
+    def _evaluate(self, key):
+        unlocked = {}
+        passed = key[0]
+        for i in range(passed):
+            unlocked[self.trigger_indices[i]] = self.trigger_offsets[i]
+
+        if key[1] is not None:
+            _, global_solves, local_solves, first_meta = key
+            # Solve-based unlocks take precedence over time-based ones.
+            if global_solves:
+                count = bisect.bisect_right(self.global_counts, global_solves)
+                for index in self.global_indices[:count]:
+                    unlocked[index] = None
+            else:
+                # With no main round solves, a global threshold of 0 only
+                # counts once a meta earlier in the ordering is solved.
+                count = bisect.bisect_right(self.global_counts, 0)
+                for index in self.global_indices[:count]:
+                    if index > first_meta:
+                        unlocked[index] = None
+            local_solves = dict(local_solves)
+            for slug, counts in self.local_counts.items():
+                count = bisect.bisect_right(counts, local_solves.get(slug, 0))
+                for index in self.local_indices[slug][:count]:
+                    unlocked[index] = None
+
+        return tuple(sorted(unlocked.items()))
+
+
+_engines = {}
+
+
+def get_engine(puzzles):
+    """Returns a (shared) compiled engine for this ordered tuple of puzzles."""
+
+    signature = UnlockEngine.signature(puzzles)
+    engine = _engines.get(signature)
+    if engine is None:
+        # Puzzles are only edited before the hunt, so there's no point in
+        # keeping engines for old versions around.
+        _engines.clear()
+        engine = _engines[signature] = UnlockEngine(puzzles)
+    return engine
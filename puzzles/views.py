@@ -1,14 +1,12 @@
 import base64
-import builtins
 import csv
-import datetime
 import itertools
 import json
 import os
 import traceback
-from collections import Counter, OrderedDict, defaultdict
+from collections import OrderedDict
 from collections.abc import Callable
-from functools import wraps
+from functools import partial, wraps
 
 from django.conf import settings
 from django.contrib import messages
@@ -16,22 +14,37 @@ from django.contrib.auth import login, update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.models import User
 from django.contrib.auth.tokens import default_token_generator
-from django.db.models import Avg, Count, F, Q
+from django.core.cache import cache
+from django.db.models import Count, F
 from django.forms import formset_factory, modelformset_factory
-from django.http import Http404, HttpRequest, HttpResponse, HttpResponseBase
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBase,
+    JsonResponse,
+)
 from django.shortcuts import redirect, render
 from django.template import TemplateDoesNotExist
 from django.urls import reverse
-from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.html import escape
 from django.utils.http import urlsafe_base64_encode
-from django.utils.safestring import mark_safe
 from django.utils.translation import gettext as _
 from django.views.decorators.clickjacking import xframe_options_sameorigin
-from django.views.decorators.http import require_GET, require_POST
+from django.views.decorators.http import etag, require_GET, require_POST
 from django.views.static import serve
 
+from puzzles import catalog, counters, frozen, leaderboard, progress
+from puzzles.bigboard import (
+    Board,
+    board_changes,
+    current_cursor,
+    format_cursor,
+    graph_points,
+    graph_series,
+    parse_cursor,
+)
 from puzzles.forms import (
     AnswerHintForm,
     HintClaimerForm,
@@ -62,18 +75,17 @@ from puzzles.messaging import (
 )
 from puzzles.models import (
     AnswerSubmission,
-    CannedHint,
     Hint,
     HintClaimer,
-    Puzzle,
-    PuzzleMessage,
-    PuzzleUnlock,
-    Round,
+    PuzzleStats,
     Survey,
+    SurveyAggregate,
     Team,
     TeamMember,
+    TeamPuzzleProgress,
 )
 from puzzles.shortcuts import dispatch_shortcut
+from puzzles.stats import from_timestamp, puzzle_stats
 from puzzles.tasks import send_mail_wrapper
 
 ViewFunc = Callable[..., HttpResponseBase]
@@ -90,7 +102,7 @@ def validate_puzzle(require_team=False) -> ViewDecorator:
     def decorator(f) -> ViewFunc:
         @wraps(f)
         def inner(request, slug):
-            puzzle = Puzzle.objects.select_related().filter(slug=slug).first()
+            puzzle = request.context.catalog.by_slug.get(slug)
             request.context.puzzle = puzzle
             if not puzzle or puzzle not in request.context.unlocks:
                 messages.error(request, _("Invalid puzzle name."))
@@ -99,7 +111,7 @@ def validate_puzzle(require_team=False) -> ViewDecorator:
                 unlock = request.context.team.db_unlocks.get(puzzle.id)
                 if unlock and not unlock.view_datetime:
                     unlock.view_datetime = request.context.now
-                    unlock.save()
+                    progress.queue_view(request.context, puzzle.id)
             elif require_team:
                 messages.error(
                     request,
@@ -306,69 +318,54 @@ def password_reset(request):
     return render(request, "password_reset.html", {"form": form})
 
 
-def team(request, team_name):
-    """List stats for a single team."""
-    user_team = request.context.team
+# The page payload depends on the current time only after the hunt ends,
+# through where the chart stops; it's fine for that to lag a little.
+TEAM_PAGE_TIMEOUT = 5 * 60
 
-    is_own_team = user_team is not None and user_team.team_name == team_name
-    if request.method == "POST":
-        if not is_own_team:
-            raise Http404
-        user_team.allow_time_unlocks = request.POST.get("enable") == "true"
-        user_team.save()
-        return redirect("team", team_name)
-    can_view_info = is_own_team or request.context.is_superuser
-    team_query = Team.objects.filter(team_name=team_name)
-    if not can_view_info:
-        team_query = team_query.exclude(is_hidden=True)
-    team = team_query.first()
-    if not team:
-        messages.error(request, _("Team “{}” not found.").format(team_name))
-        return redirect("teams")
 
-    # This Team.leaderboard_teams() call is expensive, but is
-    # the only way right now to calculate rank accurately.
-    # Hopefully it is not an issue in practice (especially
-    # after all this database optimization --beta)
-    leaderboard_ids = Team.leaderboard_teams(user_team).values_list("id", flat=True)
-    rank = None
-    for i, leaderboard_id in enumerate(leaderboard_ids):
-        if team.id == leaderboard_id:
-            rank = i + 1  # ranks are 1-indexed
-            break
-
-    guesses = defaultdict(int)
-    correct: dict[int, dict] = {}
-    unlock_time_map = {
-        puzzle_id: unlock.unlock_datetime
-        for (puzzle_id, unlock) in team.db_unlocks.items()
-    }
+def team_page_payload(team_id, now):
+    """
+    Builds the solves table and chart of a team page from the team's
+    TeamPuzzleProgress rows. Puzzles are referred to by id, so that the
+    payload can be cached.
+    """
+
+    submissions = [
+        {
+            "puzzle_id": puzzle_id,
+            "guesses": wrong_guesses + partial_guesses,
+            "unlock_time": unlocked_at,
+            "solve_time": solved_at,
+            "open_duration": (
+                (solved_at - unlocked_at).total_seconds() if unlocked_at else None
+            ),
+            "used_free_answer": used_free_answer,
+        }
+        for (
+            puzzle_id,
+            unlocked_at,
+            solved_at,
+            used_free_answer,
+            wrong_guesses,
+            partial_guesses,
+        ) in (
+            TeamPuzzleProgress.objects.filter(team_id=team_id, solved_at__isnull=False)
+            .order_by("solved_at")
+            .values_list(
+                "puzzle_id",
+                "unlocked_at",
+                "solved_at",
+                "used_free_answer",
+                "wrong_guesses",
+                "partial_guesses",
+            )
+        )
+    ]
+    meta_ids = catalog.get_catalog().meta_ids
 
-    for submission in team.submissions:
-        if submission.is_correct:
-            correct[submission.puzzle_id] = {
-                "submission": submission,
-                "unlock_time": unlock_time_map.get(submission.puzzle_id),
-                "solve_time": submission.submitted_datetime,
-                "open_duration": (
-                    (
-                        submission.submitted_datetime
-                        - unlock_time_map[submission.puzzle_id]
-                    ).total_seconds()
-                    if submission.puzzle_id in unlock_time_map
-                    else None
-                ),
-            }
-        else:
-            guesses[submission.puzzle_id] += 1
-    submissions = []
-    for puzzle, data in correct.items():
-        data["guesses"] = guesses[puzzle]
-        submissions.append(data)
-    submissions.sort(key=lambda s: s["solve_time"])
     solves = [HUNT_START_TIME] + [s["solve_time"] for s in submissions]
     if solves[-1] >= HUNT_END_TIME:
-        solves.append(min(request.context.now, HUNT_CLOSE_TIME))
+        solves.append(min(now, HUNT_CLOSE_TIME))
     else:
         solves.append(HUNT_END_TIME)
     chart = {
@@ -383,10 +380,54 @@ def team(request, team_name):
         "metas": [
             (s["solve_time"] - HUNT_START_TIME).total_seconds()
             for s in submissions
-            if s["submission"].puzzle.is_meta
+            if s["puzzle_id"] in meta_ids
         ],
         "end": (HUNT_END_TIME - HUNT_START_TIME).total_seconds(),
     }
+    return {"submissions": submissions, "chart": chart}
+
+
+def team(request, team_name):
+    """List stats for a single team."""
+    user_team = request.context.team
+
+    is_own_team = user_team is not None and user_team.team_name == team_name
+    if request.method == "POST":
+        if not is_own_team:
+            raise Http404
+        user_team.allow_time_unlocks = request.POST.get("enable") == "true"
+        user_team.save()
+        return redirect("team", team_name)
+    can_view_info = is_own_team or request.context.is_superuser
+    team_query = Team.objects.filter(team_name=team_name)
+    if not can_view_info:
+        team_query = team_query.exclude(is_hidden=True)
+    team = team_query.first()
+    if not team:
+        messages.error(request, _("Team “{}” not found.").format(team_name))
+        return redirect("teams")
+
+    # Public teams' ranks are kept in their standings. Anyone else (hidden
+    # teams looking at their own page) is ranked among the public teams and
+    # the viewing team, like on the leaderboard they see.
+    standing = getattr(team, "standing", None)
+    if standing and standing.rank and not (user_team and user_team.is_hidden):
+        rank = standing.rank
+    else:
+        team_ids = list(Team.leaderboard_teams(user_team).values_list("id", flat=True))
+        rank = team_ids.index(team.id) + 1 if team.id in team_ids else None
+
+    payload = progress.get_cached(
+        "team-page",
+        team.id,
+        partial(team_page_payload, team.id, request.context.now),
+        timeout=TEAM_PAGE_TIMEOUT,
+    )
+    by_id = request.context.catalog.by_id
+    submissions = [
+        {**solve, "puzzle": by_id[solve["puzzle_id"]]}
+        for solve in payload["submissions"]
+    ]
 
     return render(
         request,
@@ -394,10 +435,8 @@ def team(request, team_name):
         {
             "view_team": team,
             "submissions": submissions,
-            "chart": chart,
-            "solves": sum(
-                1 for s in submissions if not s["submission"].used_free_answer
-            ),
+            "chart": payload["chart"],
+            "solves": sum(1 for s in submissions if not s["used_free_answer"]),
             "modify_info_available": is_own_team and not request.context.hunt_is_closed,
             "view_info_available": can_view_info,
             "rank": rank,
@@ -410,12 +449,36 @@ def teams_generic(request, hide_hidden):
     # team_name = request.GET.get('team')
     user_team = request.context.team
 
+    if hide_hidden:
+        after = leaderboard.parse_cursor(request.GET.get("after"))
+        page = leaderboard.get_page(after)
+        teams = page["teams"]
+        # Teams that aren't public still see themselves.
+        if user_team and (
+            user_team.is_hidden or user_team.creation_time >= HUNT_END_TIME
+        ):
+            row = leaderboard.team_row(user_team.id)
+            if row and row["rank"] is None:
+                teams = leaderboard.splice(page, after, row)
+        next_cursor = page["next"]
+    else:
+        # Only admins see hidden teams, so this isn't worth sharing.
+        teams = [
+            {**team, "rank": rank}
+            for (rank, team) in enumerate(
+                Team.leaderboard(user_team, hide_hidden=False), 1
+            )
+        ]
+        after = next_cursor = None
+
     return render(
         request,
         "teams.html",
         {
-            "teams": Team.leaderboard(user_team, hide_hidden=hide_hidden),
+            "teams": teams,
             "current_team": user_team,
+            "is_first_page": after is None,
+            "next_cursor": next_cursor,
         },
     )
 
@@ -508,7 +571,7 @@ def puzzles(request):
 
 @require_GET
 def round(request, slug):
-    round = Round.objects.filter(slug=slug).first()
+    round = request.context.catalog.rounds_by_slug.get(slug)
     if round:
         rounds = render_puzzles(request)
         if slug in rounds:
@@ -553,32 +616,18 @@ def render_puzzles(request):
     hints = {}
     if team is not None:
         solved = team.solves
-        hints = Counter(hint.puzzle_id for hint in team.asked_hints)
+        hints = team.progress.hints
 
-    correct = defaultdict(int)
-    guesses = defaultdict(int)
-    teams = defaultdict(set)
+    solve_stats = {}
     full_stats = request.context.is_superuser or request.context.hunt_is_over
     if full_stats or INITIAL_STATS_AVAILABLE:
-        for submission in AnswerSubmission.objects.filter(
-            used_free_answer=False,
-            team__is_hidden=False,
-            submitted_datetime__lt=HUNT_END_TIME,
-        ):
-            if submission.is_correct:
-                correct[submission.puzzle_id] += 1
-            guesses[submission.puzzle_id] += 1
-            teams[submission.puzzle_id].add(submission.team_id)
+        solve_stats = counters.get_counts()
 
     fields = Survey.fields()
-    survey_averages = {}  # puzzle.id -> [average rating for field in fields]
+    # puzzle.id -> (count, [average rating for field in fields])
+    survey_averages = {}
     if request.context.is_superuser:
-        surveyed_puzzles = Puzzle.objects.annotate(
-            **{field.name: Avg("survey__" + field.name) for field in fields}
-        ).values_list("id", *(field.name for field in fields))
-        for sp in surveyed_puzzles:
-            if all(a is not None for a in sp[1:]):
-                survey_averages[sp[0]] = sp[1:]
+        survey_averages = SurveyAggregate.averages()
 
     rounds = OrderedDict()
     for puzzle in request.context.unlocks:
@@ -605,12 +654,8 @@ def render_puzzles(request):
         if puzzle.id in hints:
             data["hints"] = hints[puzzle.id]
         data["full_stats"] = full_stats
-        if puzzle.id in guesses:
-            data["solve_stats"] = {
-                "correct": correct[puzzle.id],
-                "guesses": guesses[puzzle.id],
-                "teams": len(teams[puzzle.id]),
-            }
+        if puzzle.id in solve_stats:
+            data["solve_stats"] = solve_stats[puzzle.id]
         if puzzle.id in survey_averages:
             data["survey_stats"] = [
                 {
@@ -619,7 +664,7 @@ def render_puzzles(request):
                     "max_rating": field.max_rating,
                 }
                 for (field, average) in zip(
-                    fields, survey_averages[puzzle.id], strict=False
+                    fields, survey_averages[puzzle.id][1], strict=False
                 )
             ]
         data["new"] = (
@@ -657,7 +702,7 @@ def puzzle(request):
                 "keywords": canned.keywords,
                 "content": canned.content.replace("\\r", "").replace("\\n", "\n"),
             }
-            for canned in CannedHint.objects.filter(puzzle=puzzle).order_by("order")
+            for canned in request.context.catalog.canned_hints.get(puzzle.id, ())
         ]
 
     HEPHAESTUS_DATA = {
@@ -751,18 +796,13 @@ def solve(request):
             messages.error(request, _("You have no more guesses for this puzzle!"))
             return redirect("solve", puzzle.slug)
 
-        semicleaned_guess = PuzzleMessage.semiclean_guess(request.POST.get("answer"))
-        normalized_answer = Puzzle.normalize_answer(request.POST.get("answer"))
-        puzzle_messages = [
-            message
-            for message in puzzle.puzzlemessage_set.all()
-            if semicleaned_guess == message.semicleaned_guess
-        ]
+        normalized_answer, is_correct, puzzle_message = (
+            request.context.catalog.check_answer(puzzle.id, request.POST.get("answer"))
+        )
         tried_before = any(
             normalized_answer == submission.submitted_answer
             for submission in request.context.puzzle_submissions
         )
-        is_correct = normalized_answer == puzzle.normalized_answer
 
         form = SubmitAnswerForm(request.POST)
 
@@ -786,8 +826,8 @@ def solve(request):
                 puzzle=puzzle,
                 submitted_answer=normalized_answer,
                 is_correct=is_correct,
-                is_message=bool(puzzle_messages),
-                response=puzzle_messages[0].response if puzzle_messages else "",
+                is_message=puzzle_message is not None,
+                response=puzzle_message.response if puzzle_message else "",
                 used_free_answer=False,
             ).save()
 
@@ -904,7 +944,7 @@ def post_hunt_solve(request):
                 message.response.replace("\\n", "\n").encode("utf-8")
             ).decode("utf-8"),
         ]
-        for message in puzzle.puzzlemessage_set.all()
+        for message in request.context.catalog.messages.get(puzzle.id, ())
     ]
     data["form"] = SubmitAnswerForm()
 
@@ -917,20 +957,17 @@ def survey_list(request):
     """For admins. See survey results."""
 
     fields = Survey.fields()
+    averages = SurveyAggregate.averages()
     puzzles = []
-    for puzzle in Puzzle.objects.annotate(
-        Count("survey"), *[Avg("survey__" + field.name) for field in fields]
-    ):
-        if puzzle.survey__count == 0:  # type: ignore
+    for puzzle in request.context.all_puzzles:
+        if puzzle.id not in averages:
             continue
+        count, puzzle_averages = averages[puzzle.id]
         ratings = [
-            {
-                "avg": getattr(puzzle, f"survey__{field.name}__avg"),
-                "max": field.max_rating,
-            }
-            for field in fields
+            {"avg": average, "max": field.max_rating}
+            for (field, average) in zip(fields, puzzle_averages, strict=True)
         ]
-        puzzles.append({"puzzle": puzzle, "ratings": ratings})
+        puzzles.append({"puzzle": puzzle, "count": count, "ratings": ratings})
     return render(request, "survey_list.html", {"fields": fields, "puzzles": puzzles})
 
 
@@ -940,24 +977,26 @@ def survey_list(request):
 def survey(request):
     """For admins. See survey results."""
 
+    puzzle = request.context.puzzle
+    survey_fields = Survey.fields()
     surveys = [
-        {"survey": survey, "ratings": []}
-        for survey in request.context.puzzle.survey_set.select_related("team").order_by(
-            "id"
-        )
+        {
+            "survey": survey,
+            "ratings": [
+                (field.value_from_object(survey), field.max_rating)
+                for field in survey_fields
+            ],
+        }
+        for survey in puzzle.survey_set.select_related("team").order_by("id")
     ]
+    # Only public teams count towards the averages.
+    _, averages = SurveyAggregate.averages([puzzle.id], include_hidden=False).get(
+        puzzle.id, (0, [0] * len(survey_fields))
+    )
     fields = [
-        {"field": field, "total": 0, "count": 0, "max": field.max_rating}
-        for field in Survey.fields()
+        {"field": field, "average": average, "max": field.max_rating}
+        for (field, average) in zip(survey_fields, averages, strict=True)
     ]
-    for field in fields:
-        for survey in surveys:
-            rating = field["field"].value_from_object(survey["survey"])
-            if not survey["survey"].team.is_hidden:
-                field["total"] += rating
-                field["count"] += 1
-            survey["ratings"].append((rating, field["field"].max_rating))
-        field["average"] = field["total"] / field["count"] if field["count"] else 0
     return render(request, "survey.html", {"fields": fields, "surveys": surveys})
 
 
@@ -1008,7 +1047,7 @@ def hint_list(request):
             hints = hints.filter(team=team)
             query_description += _(" from {}").format(team.team_name)
         if "puzzle" in request.GET:
-            puzzle = Puzzle.objects.get(id=request.GET["puzzle"])
+            puzzle = request.context.catalog.by_id[int(request.GET["puzzle"])]
             hints = hints.filter(puzzle=puzzle)
             query_description += _(" on {}").format(puzzle.name)
         return render(
@@ -1037,7 +1076,7 @@ def hint_list(request):
                 "-count", "display_name"
             )
         )
-        puzzles = {puzzle.id: puzzle for puzzle in request.context.all_puzzles}
+        puzzles = request.context.catalog.by_id
         for aggregate in popular:
             aggregate["puzzle"] = puzzles[aggregate["puzzle_id"]]
 
@@ -1062,17 +1101,13 @@ def hints(request):
     team = request.context.team
     open_hints = []
     if ONE_HINT_AT_A_TIME:
-        open_hints = [
-            hint for hint in team.asked_hints if hint.status == Hint.NO_RESPONSE
-        ]
+        open_hints = team.progress.open_hints
     relevant_hints_remaining = (
         team.num_hints_remaining
         if puzzle.round.slug == INTRO_ROUND_SLUG
         else team.num_nonintro_hints_remaining
     )
-    puzzle_hints = [
-        hint for hint in reversed(team.asked_hints) if hint.puzzle == puzzle
-    ]
+    puzzle_hints = list(team.hint_set.filter(puzzle=puzzle).order_by("-id"))
     can_followup = bool(puzzle_hints) and puzzle_hints[0].status == Hint.ANSWERED
 
     error = None
@@ -1089,7 +1124,7 @@ def hints(request):
                 "You already have a hint open (on %s)! "
                 "You can have one hint open at a time."
             )
-            % open_hints[0].puzzle
+            % request.context.catalog.by_id[open_hints[0]]
         )
         can_followup = False
 
@@ -1129,10 +1164,8 @@ def hints(request):
             "hints": puzzle_hints,
             "error": error,
             "form": form,
-            "intro_count": sum(
-                1
-                for p in request.context.all_puzzles
-                if p.round.slug == INTRO_ROUND_SLUG
+            "intro_count": len(
+                request.context.catalog.round_puzzles.get(INTRO_ROUND_SLUG, ())
             ),
             "relevant_hints_remaining": relevant_hints_remaining,
             "can_followup": can_followup,
@@ -1237,7 +1270,7 @@ def hint(request, id):
         .exclude(team=hint.team)
         .order_by("-answered_datetime")
     )[:limit]
-    canned = CannedHint.objects.filter(puzzle=hint.puzzle)
+    canned = request.context.catalog.canned_hints.get(hint.puzzle_id, ())
     form["status"].field.widget.is_followup = hint.is_followup
     request.context.puzzle = hint.puzzle
     return render(
@@ -1259,112 +1292,17 @@ def hint(request, id):
 def hunt_stats(request):
     """After hunt ends, view stats for the entire hunt."""
 
-    total_teams = Team.objects.exclude(is_hidden=True).count()
-    total_participants = TeamMember.objects.exclude(team__is_hidden=True).count()
-
-    def is_forward_solve(puzzle, team_id):
-        return puzzle.is_meta or solve_times[puzzle.id, team_id] <= solve_times[
-            puzzle.round.meta_id, team_id
-        ] - datetime.timedelta(minutes=5)
-
-    total_hints = 0
-    hints_by_puzzle = defaultdict(int)
-    hint_counts = defaultdict(int)
-    for hint in Hint.objects.exclude(team__is_hidden=True):
-        total_hints += 1
-        hints_by_puzzle[hint.puzzle_id] += 1
-        if hint.consumes_hint:
-            hint_counts[hint.puzzle_id, hint.team_id] += 1
-
-    total_guesses = 0
-    total_solves = 0
-    total_metas = 0
-    guesses_by_puzzle = defaultdict(int)
-    solves_by_puzzle = defaultdict(int)
-    guess_teams = defaultdict(set)
-    solve_teams = defaultdict(set)
-    solve_times = defaultdict(lambda: HUNT_CLOSE_TIME)
-    for submission in AnswerSubmission.objects.filter(
-        used_free_answer=False,
-        team__is_hidden=False,
-        submitted_datetime__lt=HUNT_END_TIME,
-    ):
-        total_guesses += 1
-        guesses_by_puzzle[submission.puzzle_id] += 1
-        guess_teams[submission.puzzle_id].add(submission.team_id)
-        if submission.is_correct:
-            total_solves += 1
-            solves_by_puzzle[submission.puzzle_id] += 1
-            solve_teams[submission.puzzle_id].add(submission.team_id)
-            solve_times[submission.puzzle_id, submission.team_id] = (
-                submission.submitted_datetime
-            )
-
-    data = []
-    for puzzle in request.context.all_puzzles:
-        if puzzle.is_meta:
-            total_metas += solves_by_puzzle[puzzle.id]
-        data.append(
-            {
-                "puzzle": puzzle,
-                "numbers": [
-                    solves_by_puzzle[puzzle.id],
-                    guesses_by_puzzle[puzzle.id],
-                    hints_by_puzzle[puzzle.id],
-                    len(
-                        [
-                            1
-                            for team_id in solve_teams[puzzle.id]
-                            if is_forward_solve(puzzle, team_id)
-                        ]
-                    ),
-                    len(
-                        [
-                            1
-                            for team_id in solve_teams[puzzle.id]
-                            if is_forward_solve(puzzle, team_id)
-                            and hint_counts[puzzle.id, team_id] < 1
-                        ]
-                    ),
-                    len(
-                        [
-                            1
-                            for team_id in solve_teams[puzzle.id]
-                            if is_forward_solve(puzzle, team_id)
-                            and hint_counts[puzzle.id, team_id] == 1
-                        ]
-                    ),
-                    len(
-                        [
-                            1
-                            for team_id in solve_teams[puzzle.id]
-                            if is_forward_solve(puzzle, team_id)
-                            and hint_counts[puzzle.id, team_id] > 1
-                        ]
-                    ),
-                    len(
-                        [
-                            1
-                            for team_id in solve_teams[puzzle.id]
-                            if not is_forward_solve(puzzle, team_id)
-                        ]
-                    ),
-                    len(guess_teams[puzzle.id] - solve_teams[puzzle.id]),
-                ],
-            }
-        )
-
+    puzzles = request.context.all_puzzles
+    totals = frozen.get("hunt-stats", puzzles)
+    numbers = dict(totals["numbers"])
     return render(
         request,
         "hunt_stats.html",
         {
-            "total_teams": total_teams,
-            "total_participants": total_participants,
-            "total_hints": total_hints,
-            "total_guesses": total_guesses,
-            "total_solves": total_solves,
-            "total_metas": total_metas,
-            "data": data,
+            **totals,
+            "data": [
+                {"puzzle": puzzle, "numbers": numbers[puzzle.id]} for puzzle in puzzles
+            ],
         },
     )
 
@@ -1377,93 +1315,36 @@ def stats(request):
 
     puzzle = request.context.puzzle
     team = request.context.team
-    q = Q(team__is_hidden=False)
-    if team:
-        q |= Q(team__id=team.id)
-    puzzle_submissions = (
-        puzzle.answersubmission_set.filter(
-            q, used_free_answer=False, submitted_datetime__lt=HUNT_END_TIME
-        )
-        .order_by("submitted_datetime")
-        .select_related("team")
-    )
-
-    solve_time_map = {}
-    total_guesses_map = defaultdict(int)
-    solvers_map = {}
-    unlock_time_map = {
-        unlock.team_id: unlock.unlock_datetime
-        for unlock in puzzle.puzzleunlock_set.exclude(view_datetime=None).all()
-    }
-    partial_guesses = Counter()
-    incorrect_guesses = Counter()
-    guess_time_map = {}
-    for submission in puzzle_submissions:
-        team_id = submission.team_id
-        total_guesses_map[team_id] += 1
-        if submission.is_correct:
-            solve_time_map[team_id] = submission.submitted_datetime
-            solvers_map[team_id] = submission.team
-        elif submission.is_message:
-            partial_guesses[submission.submitted_answer] += 1
-            guess_time_map[team_id, submission.submitted_answer] = (
-                submission.submitted_datetime
-            )
-        else:
-            incorrect_guesses[submission.submitted_answer] += 1
-            guess_time_map[team_id, submission.submitted_answer] = (
-                submission.submitted_datetime
-            )
-
-    all_not_correct_guesses = partial_guesses + incorrect_guesses
-
-    wrong_answers = []
-    for guess, count in partial_guesses.most_common():
-        wrong_answers.append({"guess": guess, "count": count, "partial": True})
-
-    for guess, count in incorrect_guesses.most_common():
-        wrong_answers.append({"guess": guess, "count": count, "partial": False})
-
-    wrong = "(?)"
-    if all_not_correct_guesses:
-        ((wrong, _),) = all_not_correct_guesses.most_common(1)
+    # These include activity after the hunt, so they're never frozen.
+    unlock_count, hint_count = (
+        PuzzleStats.objects.filter(puzzle_id=puzzle.id)
+        .values_list("unlocks", "hints")
+        .first()
+    ) or (0, 0)
+    if team and team.is_hidden:
+        payload = puzzle_stats(puzzle, team)
+        hint_count += puzzle.hint_set.filter(team_id=team.id).count()
+    else:
+        payload = frozen.get(f"stats:{puzzle.slug}", request.context.all_puzzles)
 
     solvers = [
         {
-            "team": solver,
-            "is_current": solver == team,
-            "unlock_time": unlock_time_map.get(solver.id),
-            "solve_time": solve_time_map[solver.id],
-            "open_duration": (
-                (solve_time_map[solver.id] - unlock_time_map[solver.id]).total_seconds()
-                if solver.id in unlock_time_map
-                else None
-            ),
-            "wrong_duration": (
-                (
-                    solve_time_map[solver.id] - guess_time_map[solver.id, wrong]
-                ).total_seconds()
-                if (solver.id, wrong) in guess_time_map
-                else None
-            ),
-            "total_guesses": total_guesses_map[solver.id] - 1,
+            **solver,
+            "is_current": team is not None and solver["team_id"] == team.id,
+            "unlock_time": from_timestamp(solver["unlock_time"]),
+            "solve_time": from_timestamp(solver["solve_time"]),
         }
-        for solver in solvers_map.values()
+        for solver in payload["solvers"]
     ]
-    solvers.sort(key=lambda d: d["solve_time"])
-
     return render(
         request,
         "stats.html",
         {
+            **payload,
             "solvers": solvers,
-            "solves": len(solvers_map),
-            "guesses": sum(total_guesses_map.values()),
-            "answers_tried": wrong_answers,
-            "unlock_count": len(unlock_time_map),
-            "hint_count": puzzle.hint_set.filter(q).count(),
+            "unlock_count": unlock_count,
+            "hint_count": hint_count,
             "answer": puzzle.answer,
-            "wrong": wrong,
         },
     )
 
@@ -1541,195 +1422,29 @@ def wrapup(request):
     if not WRAPUP_PAGE_VISIBLE and not request.context.is_superuser:
         raise Http404
 
-    puzzles = list(Puzzle.objects.order_by("order"))
-
-    q = Q(team__is_hidden=False)
-    puzzle_submissions = list(
-        AnswerSubmission.objects.filter(
-            q,
-            used_free_answer=False,
-            submitted_datetime__lt=HUNT_END_TIME,
-        )
-        .order_by("submitted_datetime")
-        .select_related("team", "puzzle")
-    )
-
-    top_meta_solves = (
-        AnswerSubmission.objects.filter(
-            q,
-            puzzle__name="Hephaestus",
-            is_correct=True,
-            used_free_answer=False,
-            submitted_datetime__lt=HUNT_END_TIME,
-        )
-        .select_related("team", "puzzle")
-        .order_by("submitted_datetime")[:10]
-    )
-
-    team_leaderboard = {sub.team.team_name: [] for sub in top_meta_solves}
-
-    unlock_time_map = {
-        (unlock.team_id, unlock.puzzle_id): unlock.unlock_datetime
-        for unlock in PuzzleUnlock.objects.exclude(view_datetime=None)
-    }
-
-    fastest_solves_data = {}
-    solves_map = defaultdict(int)
-    message_map = defaultdict(int)
-    wrong_guess_map = defaultdict(int)
-    for sub in puzzle_submissions:
-        puzzle_name = sub.puzzle.name
-        if not sub.is_correct:
-            if sub.is_message:
-                message_map[puzzle_name] += 1
-            else:
-                wrong_guess_map[puzzle_name] += 1
-            continue
-        solves_map[puzzle_name] += 1
-
-        if puzzle_name in ("Ripple Effect", "Melody Medley", "Mark of the Demon"):
-            continue
-
-        unlock_time = unlock_time_map.get((sub.team_id, sub.puzzle_id))
-        if not unlock_time:
-            continue
-
-        if sub.team.team_name in team_leaderboard:
-            team_leaderboard[sub.team.team_name].append(
-                {
-                    "solve_count": len(team_leaderboard[sub.team.team_name]),
-                    "is_meta": sub.puzzle.is_meta,
-                    "tooltip_label": puzzle_name,
-                    "datetime": (
-                        timezone.localtime(
-                            sub.submitted_datetime, settings.PY_TIME_ZONE
-                        ).isoformat()
-                    ),
-                }
-            )
-
-        open_duration = sub.submitted_datetime - unlock_time
-        if (
-            puzzle_name not in fastest_solves_data
-            or open_duration < fastest_solves_data[puzzle_name][1]
-        ):
-            fastest_solves_data[puzzle_name] = (sub.team.team_name, open_duration)
-
-    fastest_solves_data = {
-        "labels": [p.name for p in puzzles if p.name in fastest_solves_data and p.name],
-        "tooltips": [
-            fastest_solves_data[p.name][0]
-            for p in puzzles
-            if p.name in fastest_solves_data
-        ],
-        "data": [
-            fastest_solves_data[p.name][1].total_seconds() / 60
-            for p in puzzles
-            if p.name in fastest_solves_data
-        ],
-    }
-
-    hints = list(
-        Hint.objects.exclude(answered_datetime=None)
-        .order_by("answered_datetime")
-        .select_related("puzzle")
-    )
-
-    hint_latencies_per_hour = []
-    hints_per_hour = []
-    hints_per_puzzle = {p.name: 0 for p in puzzles}
-    for hour, hint_group in itertools.groupby(
-        hints, lambda h: h.submitted_datetime.replace(minute=0, second=0, microsecond=0)
-    ):
-        hint_lst = list(hint_group)
-        avg_latency = sum(
-            (h.answered_datetime - h.submitted_datetime).total_seconds() / 60
-            for h in hint_lst
-        ) / len(hint_lst)
-
-        hint_latencies_per_hour.append(
-            {
-                "x": timezone.localtime(hour, settings.PY_TIME_ZONE).isoformat(),
-                "y": builtins.round(avg_latency, 2),
-            }
-        )
-        hints_per_hour.append(
-            {
-                "x": timezone.localtime(hour, settings.PY_TIME_ZONE).isoformat(),
-                "y": len(hint_lst),
-            }
-        )
-
-        for h in hint_lst:
-            hints_per_puzzle[h.puzzle.name] += 1
-
-    puzzle_guess_data = {
-        "correct": [solves_map[p.name] for p in puzzles],
-        "partial": [message_map[p.name] for p in puzzles],
-        "incorrect": [wrong_guess_map[p.name] for p in puzzles],
-        "puzzles": [p.name for p in puzzles],
-    }
-    hints_per_puzzle_data = {
-        "labels": [p.name for p in puzzles],
-        "data": [hints_per_puzzle[p.name] for p in puzzles],
-    }
-    team_leaderboard_data = [
-        {"team_name": k, "data": v} for k, v in team_leaderboard.items()
-    ]
-
     return render(
-        request,
-        "wrapup.html",
-        {
-            "fastest_solves": fastest_solves_data,
-            "hint_latencies_per_hour": hint_latencies_per_hour,
-            "hints_per_hour": hints_per_hour,
-            "hints_per_puzzle": hints_per_puzzle_data,
-            "team_leaderboard": team_leaderboard_data,
-            "puzzle_guesses": puzzle_guess_data,
-        },
+        request, "wrapup.html", frozen.get("wrapup", request.context.all_puzzles)
     )
 
 
 @require_GET
 @require_after_hunt_end_or_finished
 def finishers(request):
-    unlocks = OrderedDict()
-    solves = {}
-
-    for submission in AnswerSubmission.objects.filter(
-        puzzle__slug=META_META_SLUG,
-        team__is_hidden=False,
-        is_correct=True,
-        submitted_datetime__lt=HUNT_END_TIME,
-    ).order_by("submitted_datetime"):
-        unlocks[submission.team_id] = None
-        solves[submission.team_id] = submission
-    for unlock in (
-        PuzzleUnlock.objects.select_related()
-        .filter(
-            team__id__in=unlocks,
-            puzzle__slug=META_META_SLUG,
-        )
-        .prefetch_related("team__teammember_set")
-    ):
-        unlocks[unlock.team_id] = unlock
-
-    data = []
-    for team_id, unlock in unlocks.items():
-        data.append(
-            {
-                "team": unlock.team,
-                "unlock_time": unlock.unlock_datetime,
-                "solve_time": solves[team_id].submitted_datetime,
-                "total_time": (
-                    (
-                        solves[team_id].submitted_datetime - unlock.unlock_datetime
-                    ).total_seconds()
-                ),
-            }
-        )
+    data = [
+        {
+            **finisher,
+            "unlock_time": from_timestamp(finisher["unlock_time"]),
+            "solve_time": from_timestamp(finisher["solve_time"]),
+        }
+        for finisher in frozen.get("finishers", request.context.all_puzzles)
+    ]
     if request.context.is_superuser:
+        teams = Team.objects.filter(
+            id__in=[finisher["team_id"] for finisher in data]
+        ).prefetch_related("teammember_set")
+        emails = {team.id: team.get_emails() for team in teams}
+        for finisher in data:
+            finisher["emails"] = emails.get(finisher["team_id"], [])
         data.reverse()
     return render(request, "finishers.html", {"data": data})
 
@@ -1751,167 +1466,42 @@ def bridge(request):
     )
 
 
-def bigboard_generic(request, hide_hidden):
-    puzzles = request.context.all_puzzles
-    puzzle_map = {}
-    puzzle_metas = {}
-    meta_meta_id = None
-    for puzzle in puzzles:
-        puzzle_map[puzzle.id] = puzzle
-        if puzzle.slug == META_META_SLUG:
-            meta_meta_id = puzzle.id
-        if not puzzle.is_meta:
-            puzzle_metas[puzzle.id] = puzzle.round.meta_id
-
-    wrong_guesses_map = defaultdict(int)  # key (team, puzzle)
-    wrong_guesses_by_team_map = defaultdict(int)  # key team
-    solve_position_map = (
-        {}
-    )  # key (team, puzzle); value n if team is nth to solve this puzzle
-    solve_count_map = defaultdict(int)  # puzzle -> number of counts
-    total_guess_map = defaultdict(int)  # puzzle -> number of guesses
-    used_hints_map = defaultdict(int)  # (team, puzzle) -> number of hints
-    used_hints_by_team_map = defaultdict(int)  # team -> number of hints
-    used_hints_by_puzzle_map = defaultdict(int)  # puzzle -> number of hints
-    meta_solves_map = defaultdict(int)  # team -> number of meta solves
-    solve_time_map = defaultdict(dict)  # team -> {puzzle id -> solve time}
-    during_hunt_solve_time_map = defaultdict(dict)  # team -> {puzzle id -> solve time}
-    free_answer_map = defaultdict(set)  # team -> {puzzle id}
-    free_answer_by_puzzle_map = defaultdict(int)  # puzzle -> number of free answers
-
-    correct_q = Q(is_correct=True)
-    incorrect_q = Q(is_correct=False)
-    if hide_hidden:
-        correct_q &= Q(team__is_hidden=False)
-        incorrect_q &= Q(team__is_hidden=False)
+# The base payload of the bigboard grid, with the cursor it's current as of.
+# Clients poll for changes after that (with ?since=<cursor>), so it only needs
+# to be fresh enough that a reload doesn't replay much.
+BIGBOARD_SNAPSHOT_TIMEOUT = 15
 
-    for team_id, puzzle_id, used_free_answer, submitted_datetime in (
-        AnswerSubmission.objects.filter(correct_q)
-        .order_by("submitted_datetime")
-        .values_list("team_id", "puzzle_id", "used_free_answer", "submitted_datetime")
-    ):
-        total_guess_map[puzzle_id] += 1
-        if used_free_answer:
-            free_answer_map[team_id].add(puzzle_id)
-            free_answer_by_puzzle_map[puzzle_id] += 1
-        else:
-            solve_count_map[puzzle_id] += 1
-            solve_position_map[(team_id, puzzle_id)] = solve_count_map[puzzle_id]
-            solve_time_map[team_id][puzzle_id] = submitted_datetime
-            if submitted_datetime < HUNT_END_TIME:
-                during_hunt_solve_time_map[team_id][puzzle_id] = submitted_datetime
-        if puzzle_id not in puzzle_metas:
-            meta_solves_map[team_id] += 1
-
-    for aggregate in (
-        AnswerSubmission.objects.filter(incorrect_q)
-        .values("team_id", "puzzle_id")
-        .annotate(count=Count("*"))
-    ):
-        team_id = aggregate["team_id"]
-        puzzle_id = aggregate["puzzle_id"]
-        total_guess_map[puzzle_id] += aggregate["count"]
-        wrong_guesses_map[(team_id, puzzle_id)] += aggregate["count"]
-        wrong_guesses_by_team_map[team_id] += aggregate["count"]
-
-    for aggregate in (
-        Hint.objects.filter(status=Hint.ANSWERED, is_followup=False)
-        .values("team_id", "puzzle_id")
-        .annotate(count=Count("*"))
-    ):
-        team_id = aggregate["team_id"]
-        puzzle_id = aggregate["puzzle_id"]
-        used_hints_map[(team_id, puzzle_id)] += aggregate["count"]
-        used_hints_by_team_map[team_id] += aggregate["count"]
-        used_hints_by_puzzle_map[puzzle_id] += aggregate["count"]
 
+def bigboard_teams(hide_hidden):
+    teams = Team.objects.all()
     if hide_hidden:
-        teams = Team.objects.filter(is_hidden=False)
-    else:
-        teams = Team.objects.all()
-
-    # Reproduce Team.leaderboard behavior for ignoring solves after hunt end,
-    # but not _teams_ created after hunt end. They'll just all be at the bottom.
-    leaderboard = sorted(
-        teams,
-        key=lambda team: (
-            during_hunt_solve_time_map[team.id].get(meta_meta_id, HUNT_END_TIME),
-            -len(during_hunt_solve_time_map[team.id]),
-            team.last_solve_time or team.creation_time,
-        ),
-    )
+        teams = teams.filter(is_hidden=False)
+    # Same order as the leaderboard, but teams created after the hunt ended
+    # are included too.
+    return Team.with_standings(teams)
+
+
+def bigboard_limit(request, default=0):
     limit = request.META.get("QUERY_STRING", "")
-    limit = int(limit) if limit.isdigit() else 0
-    if limit:
-        leaderboard = leaderboard[:limit]
-    unlocks = set(PuzzleUnlock.objects.values_list("team_id", "puzzle_id"))
-    unlock_count_map = defaultdict(int)
-
-    def classes_of(team_id, puzzle_id):
-        unlocked = (team_id, puzzle_id) in unlocks
-        if unlocked:
-            unlock_count_map[puzzle_id] += 1
-        solve_time = solve_time_map[team_id].get(puzzle_id)
-        if puzzle_id in free_answer_map[team_id]:
-            yield "F"  # free answer
-        elif solve_time:
-            yield "S"  # solved
-        elif wrong_guesses_map.get((team_id, puzzle_id)):
-            yield "W"  # wrong
-        elif unlocked:
-            yield "U"  # unlocked
-        if used_hints_map.get((team_id, puzzle_id)):
-            yield "H"  # hinted
-        if solve_time and solve_time > HUNT_END_TIME:
-            yield "P"  # post-hunt solve
-        if solve_time and puzzle_id in puzzle_metas:
-            meta_time = solve_time_map[team_id].get(puzzle_metas[puzzle_id])
-            if meta_time and solve_time > meta_time - datetime.timedelta(minutes=5):
-                yield "B"  # backsolved
-
-    board = [
-        {
-            "team": team,
-            "last_solve_time": max(
-                [team.creation_time, *solve_time_map[team.id].values()]
-            ),
-            "total_solves": len(solve_time_map[team.id]),
-            "free_solves": len(free_answer_map[team.id]),
-            "wrong_guesses": wrong_guesses_by_team_map[team.id],
-            "used_hints": used_hints_by_team_map[team.id],
-            "finished": solve_position_map.get((team.id, meta_meta_id)),
-            "meta_solves": meta_solves_map[team.id],
-            "entries": [
-                {
-                    "wrong_guesses": wrong_guesses_map[(team.id, puzzle.id)],
-                    "solve_position": solve_position_map.get((team.id, puzzle.id)),
-                    "hints": used_hints_map[(team.id, puzzle.id)],
-                    "cls": " ".join(classes_of(team.id, puzzle.id)),
-                }
-                for puzzle in puzzles
-            ],
-        }
-        for team in leaderboard
-    ]
+    if not limit.isdigit():
+        limit = request.GET.get("limit", "")
+    return int(limit) if limit.isdigit() else default
 
-    annotated_puzzles = [
-        {
-            "puzzle": puzzle,
-            "solves": solve_count_map[puzzle.id],
-            "free_solves": free_answer_by_puzzle_map[puzzle.id],
-            "total_guesses": total_guess_map[puzzle.id],
-            "total_unlocks": unlock_count_map[puzzle.id],
-            "hints": used_hints_by_puzzle_map[puzzle.id],
-        }
-        for puzzle in puzzles
-    ]
+
+def load_bigboard(request, hide_hidden):
+    board = Board.load(bigboard_teams(hide_hidden), request.context.all_puzzles)
+    return (board, bigboard_limit(request))
+
+
+def bigboard_generic(request, hide_hidden):
+    board, limit = load_bigboard(request, hide_hidden)
 
     return render(
         request,
         "bigboard.html",
         {
-            "board": board,
-            "puzzles": annotated_puzzles,
+            "board": list(board.team_rows(limit)),
+            "puzzles": board.puzzle_totals(),
         },
     )
 
@@ -1928,64 +1518,139 @@ def bigboard_unhidden(request):
     return bigboard_generic(request, hide_hidden=False)
 
 
+def bigboard_data_generic(request, hide_hidden):
+    """
+    The bigboard as JSON (see Board.as_json), plus the cursor it's current as
+    of, or with ?since=<cursor>, only the changes after that cursor (see
+    bigboard.board_changes).
+    """
+
+    limit = bigboard_limit(request)
+    if "since" in request.GET:
+        since = parse_cursor(request.GET["since"])
+        if since is None:
+            return JsonResponse({"error": "invalid cursor"}, status=400)
+        cursor = current_cursor()
+        changes = board_changes(
+            since, bigboard_teams(hide_hidden), request.context.all_puzzles, limit
+        )
+        return JsonResponse({"cursor": format_cursor(cursor), "changes": changes})
+
+    key = f"bigboard:{int(hide_hidden)}:{limit}"
+    data = cache.get(key)
+    if data is None:
+        # before loading, so that nothing in between gets lost
+        cursor = current_cursor()
+        board, limit = load_bigboard(request, hide_hidden)
+        data = {**board.as_json(limit), "cursor": format_cursor(cursor)}
+        cache.set(key, data, timeout=BIGBOARD_SNAPSHOT_TIMEOUT)
+    return JsonResponse(data)
+
+
+@require_GET
+@require_after_hunt_end_or_admin
+def bigboard_data(request):
+    return bigboard_data_generic(request, hide_hidden=True)
+
+
+@require_GET
+@require_admin
+def bigboard_unhidden_data(request):
+    return bigboard_data_generic(request, hide_hidden=False)
+
+
+@require_GET
+@require_after_hunt_end_or_admin
+def bigboard_grid(request):
+    """
+    The bigboard as a virtualized grid, rendered in the browser from
+    bigboard_data and kept up to date by polling it for changes, for when
+    there are too many teams for the table.
+    """
+
+    return render(
+        request,
+        "bigboard_grid.html",
+        {"data_url": reverse("bigboard-data")},
+    )
+
+
+@require_GET
+@require_admin
+def bigboard_unhidden_grid(request):
+    return render(
+        request,
+        "bigboard_grid.html",
+        {"data_url": reverse("bigboard-unhidden-data")},
+    )
+
+
 @require_GET
 @require_after_hunt_end_or_finished
 def biggraph(request):
-    puzzles = request.context.all_puzzles
-    puzzle_map = {}
-    meta_meta_id = None
-    for puzzle in puzzles:
-        puzzle_map[puzzle.id] = puzzle
-        if puzzle.slug == META_META_SLUG:
-            meta_meta_id = puzzle.id
-
-    during_hunt_solve_time_map = defaultdict(dict)  # team -> {puzzle id -> solve time}
-    team_point_changes = defaultdict(list)
-    team_score = defaultdict(int)  # ???
-
-    for team_id, puzzle_id, submitted_datetime in (
-        AnswerSubmission.objects.filter(
-            is_correct=True, team__is_hidden=False, used_free_answer=False
-        )
-        .order_by("submitted_datetime")
-        .values_list("team_id", "puzzle_id", "submitted_datetime")
-    ):
-        team_score[team_id] += 1
-        puzzle = puzzle_map[puzzle_id]
-        team_point_changes[team_id].append(
-            (
-                submitted_datetime.timestamp() * 1000,
-                team_score[team_id],
-                puzzle.name,
-                puzzle.is_meta,
-            )
-        )
-        if submitted_datetime < HUNT_END_TIME:
-            during_hunt_solve_time_map[team_id][puzzle_id] = submitted_datetime
-
-    teams = Team.objects.filter(is_hidden=False)
-    leaderboard = sorted(
-        teams,
-        key=lambda team: (
-            during_hunt_solve_time_map[team.id].get(meta_meta_id, HUNT_END_TIME),
-            -len(during_hunt_solve_time_map[team.id]),
-            team.last_solve_time or team.creation_time,
-        ),
+    return render(
+        request,
+        "biggraph.html",
+        {"data_url": reverse("biggraph-data")},
     )
 
-    limit = request.META.get("QUERY_STRING", "")
-    limit = int(limit) if limit.isdigit() else 10
-    if limit:
-        leaderboard = leaderboard[:limit]
-
-    for team in leaderboard:
-        nh = 0
-        for c in team.team_name:
-            nh = (31 * nh + ord(c)) & 0xFFFFFFFF
-        team.color = f"hsl({nh % 360}, {77 + nh % 23}%, {41 + nh % 19}%)"  # type: ignore
-        team.graph_data = team_point_changes[team.id]  # type: ignore
-
-    return render(request, "biggraph.html", {"teams": leaderboard})
+
+# The series change with every solve, but only scoring solves bump the
+# leaderboard version (see tasks.rank_standings), and biggraph is shown after
+# the hunt, so they're only cached briefly.
+BIGGRAPH_TIMEOUT = 60
+
+
+def biggraph_key(request):
+    limit = bigboard_limit(request, default=10)
+    return f"biggraph:{leaderboard.get_version()}:{limit}"
+
+
+def biggraph_etag(request):
+    # The ETag is the cursor of the cached series, so a 304 always means the
+    # browser has the same one.
+    if "since" in request.GET:
+        return None
+    data = cache.get(biggraph_key(request))
+    return None if data is None else f'"{data["cursor"]}"'
+
+
+@require_GET
+@require_after_hunt_end_or_finished
+@etag(biggraph_etag)
+def biggraph_data(request):
+    """
+    The solve time series of the top teams (see bigboard.graph_series), plus
+    the cursor it's current as of, or with ?since=<cursor>, only the points
+    of the solves after that cursor (see bigboard.graph_points).
+    """
+
+    if "since" in request.GET:
+        since = parse_cursor(request.GET["since"])
+        if since is None:
+            return JsonResponse({"error": "invalid cursor"}, status=400)
+        cursor = current_cursor()
+        points = graph_points(since, Team.objects.filter(is_hidden=False))
+        return JsonResponse({"cursor": format_cursor(cursor), "points": points})
+
+    limit = bigboard_limit(request, default=10)
+    key = biggraph_key(request)
+    data = cache.get(key)
+    if data is None:
+        # before loading, so that nothing in between gets lost
+        cursor = current_cursor()
+        teams = Team.with_standings(Team.objects.filter(is_hidden=False))
+        data = {
+            **graph_series(
+                teams[:limit] if limit else teams, request.context.all_puzzles
+            ),
+            "cursor": format_cursor(cursor),
+        }
+        cache.set(key, data, timeout=BIGGRAPH_TIMEOUT)
+    response = JsonResponse(data)
+    # on a miss, biggraph_etag didn't have a cursor yet
+    response["ETag"] = f'"{data["cursor"]}"'
+    return response
 
 
 @require_GET
@@ -0,0 +1,77 @@
+"""
+Benchmarks the overhead of puzzles.context.context_processor.
+
+Renders base.html for an anonymous request against an empty in-memory
+database, and also times the context processor on its own. Run from the
+repository root as:
+
+python scripts/bench_context_processor.py [--renders N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+import django
+
+
+def main(renders):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gph.settings.dev")
+    django.setup()
+
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.DATABASES["default"]["NAME"] = ":memory:"
+    call_command("migrate", verbosity=0)
+
+    from django.contrib.auth.models import AnonymousUser
+    from django.contrib.messages.storage.fallback import FallbackStorage
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory
+
+    from puzzles.context import Context, context_processor
+
+    def make_request():
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        request.context = Context(request)
+        return request
+
+    request = make_request()
+
+    def processor():
+        # This is what Django does with the result for every render.
+        {}.update(context_processor(request))
+
+    def processor_fresh():
+        request.context = Context(request)
+        {}.update(context_processor(request))
+
+    def render():
+        render_to_string("base.html", request=request)
+
+    def render_fresh():
+        render_to_string("base.html", request=make_request())
+
+    for name, fn in (
+        ("context_processor (same request)", processor),
+        ("context_processor (new request)", processor_fresh),
+        ("render base.html (same request)", render),
+        ("render base.html (new request)", render_fresh),
+    ):
+        fn()
+        best = min(timeit.repeat(fn, number=renders, repeat=5)) / renders
+        print(f"{name}: {best * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=500)
+    args = parser.parse_args()
+    main(args.renders)